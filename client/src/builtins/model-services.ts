@@ -54,6 +54,20 @@ const modelServices: ModelService[] = [{
   // id: 'LabelSpreading-81419641',
   // api: `${ALGORITHM_URL}/model/LabelSpreading`,
   // isLocal: true,
+}, {
+  type: 'LabelSpreadingKNN',
+  label: 'LabelSpreading k-NN Graph (Semi-Supervised)',
+  objectId: (new ObjectId('LabelSprdKNN')).toHexString(),
+  isBuiltIn: true,
+  isServerless: false,
+  isValidSampler: true,
+}, {
+  type: 'SGD',
+  label: 'SGD (Supervised, Incremental)',
+  objectId: (new ObjectId('SGD000000000')).toHexString(),
+  isBuiltIn: true,
+  isServerless: false,
+  isValidSampler: true,
 }];
 
 export default modelServices;
@@ -0,0 +1,9 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmarks of the handlers,
+run from the server directory as, e.g.,
+`python -m benchmarks.tiered_multi_argmax`.
+Each benchmark prints the table quoted in the docstring of the benchmarked function.
+"""
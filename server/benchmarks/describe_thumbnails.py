@@ -0,0 +1,92 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of the cached thumbnails of the image LDA.
+
+Prints the time of image_lda.extract_features on JPEG images
+given as data urls or as blob references: with an empty cache,
+with the thumbnails cached, and with one image appended to a cached dataset.
+
+Usage: python -m benchmarks.describe_thumbnails [--n_images=50000] [--size=96]
+"""
+
+import argparse
+import base64
+from functools import partial
+import tempfile
+from typing import List
+from unittest import mock
+
+import cv2 as cv
+import numpy as np
+
+from handlers.feature_extraction import image_lda
+from handlers.feature_extraction.utils import DescriptorCache, image_batch
+from handlers.types import DataObject
+from handlers.utils import blob_store
+from .utils import best_time, format_time, print_table, random_images
+
+
+def make_data_objects(imgs: List[np.ndarray], as_blobs: bool) -> List[DataObject]:
+    """
+    Encode the images as JPEG data urls or blob references.
+    """
+
+    data_objects = []
+    for i, img in enumerate(imgs):
+        _, buffer = cv.imencode('.jpg', img)
+        if as_blobs:
+            content = f'{blob_store.BLOB_PREFIX}{blob_store.put_blob(buffer.tobytes())}'
+        else:
+            content = 'data:image/jpeg;base64,' + base64.b64encode(buffer.tobytes()).decode()
+        data_objects.append({'uuid': str(i), 'type': 'image', 'content': content})
+    return data_objects
+
+
+def time_row(data_objects: List[DataObject],
+             labels: np.ndarray,
+             statuses: np.ndarray) -> List[str]:
+    """
+    Time the LDA features with an empty and a warm cache.
+    """
+
+    extract = partial(image_lda.extract_features, data_objects, labels, statuses)
+    with mock.patch.object(image_batch, 'THUMBNAIL_CACHE', DescriptorCache(disk_dir=None)):
+        uncached = best_time(extract, repeat=1)
+        cached = best_time(extract, repeat=3)
+        appended = best_time(partial(image_lda.extract_features,
+                                     data_objects + data_objects[:1],
+                                     np.append(labels, labels[0]),
+                                     np.append(statuses, statuses[0])),
+                             repeat=3)
+    return [format_time(uncached), format_time(cached), format_time(appended)]
+
+
+def main():
+    """
+    Print the times of the LDA features with data urls and blob references.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_images', type=int, default=50000)
+    parser.add_argument('--size', type=int, default=96)
+    args = parser.parse_args()
+
+    imgs = random_images(args.n_images, args.size, args.size)
+    rng = np.random.RandomState(0)
+    labels = rng.choice(['a', 'b', 'c', 'd'], args.n_images)
+    statuses = np.where(rng.rand(args.n_images) < 0.1, 'Labeled', 'New')
+
+    rows = []
+    with tempfile.TemporaryDirectory() as blob_dir:
+        blob_store.BLOB_DIR = blob_dir
+        for content, as_blobs in [('data urls', False), ('blob references', True)]:
+            data_objects = make_data_objects(imgs, as_blobs)
+            rows.append([content, *time_row(data_objects, labels, statuses)])
+    print(f'{args.n_images} JPEG images of {args.size} x {args.size} pixels')
+    print_table(['content', 'uncached', 'cached', '1 image appended'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of the reduced-resolution decoding of get_image.
+
+Prints the images per second, the decoded size and the growth of the peak
+resident memory (peak RSS) while decoding JPEG photos of --height x --width pixels
+(12 MP by default) at full size and with min_size hints.
+The images are stored as blobs, such that the encoded content is memory mapped,
+and each mode runs in a fresh process, such that the peak RSS of a mode
+is neither hidden by the peak of a previous mode nor by the request body.
+
+Usage: python -m benchmarks.get_image [--n_images=20] [--height=3000] [--width=4000]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import resource
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+import cv2 as cv
+
+from handlers.feature_extraction.utils import THUMBNAIL_MIN_SIZE, get_image
+from handlers.utils import blob_store
+from .utils import print_table, random_images
+
+
+def make_blobs(n_images: int, height: int, width: int) -> List[str]:
+    """
+    Store smooth random JPEG photos as blobs and return the blob ids.
+    """
+
+    blob_ids = []
+    for img in random_images(n_images, height // 8, width // 8):
+        img = cv.resize(img, (width, height), interpolation=cv.INTER_CUBIC)
+        _, buffer = cv.imencode('.jpg', img, [cv.IMWRITE_JPEG_QUALITY, 90])
+        blob_ids.append(blob_store.put_blob(buffer.tobytes()))
+    return blob_ids
+
+
+def decode(blob_dir: str,
+           blob_ids: List[str],
+           min_size: Optional[int]) -> Tuple[float, Tuple[int, ...], float]:
+    """
+    Decode the images of the blobs in the current process.
+
+    Returns
+    -------
+    images_per_second : float
+        The throughput.
+    shape : Tuple[int, ...]
+        The shape of the decoded images.
+    peak_rss_growth : float
+        The growth of the peak resident memory while decoding in MB.
+    """
+
+    blob_store.BLOB_DIR = blob_dir
+    data_objects = [{'uuid': str(i), 'type': 'image', 'content': f'blob:{blob_id}'}
+                    for i, blob_id in enumerate(blob_ids)]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    shape = None
+    for data_object in data_objects:
+        shape = get_image(data_object, min_size).shape
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+    return len(data_objects) / seconds, shape, growth
+
+
+def main():
+    """
+    Print the throughput and peak memory of decoding at full and reduced sizes.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_images', type=int, default=20)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--width', type=int, default=4000)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as blob_dir:
+        blob_store.BLOB_DIR = blob_dir
+        blob_ids = make_blobs(args.n_images, args.height, args.width)
+        for min_size in [None, 1024, THUMBNAIL_MIN_SIZE]:
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=get_context('spawn')) as pool:
+                images_per_second, shape, growth = pool.submit(
+                    decode, blob_dir, blob_ids, min_size).result()
+            rows.append([min_size, f'{images_per_second:.1f}',
+                         f'{shape[0]} x {shape[1]}', f'+{growth:.0f} MB'])
+    print(f'{args.n_images} JPEG images of {args.height} x {args.width} pixels')
+    print_table(['min_size', 'images / s', 'decoded size', 'peak RSS'], rows)
+
+
+if __name__ == '__main__':
+    main()
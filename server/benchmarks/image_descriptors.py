@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of the batched color and edge descriptors of the BoW features.
+
+Prints the throughput of the per-image functions (color_descriptors_single,
+edge_descriptors_single) and of the batched functions (color_descriptors,
+edge_descriptors), with the color conversions precomputed,
+and checks that the batched features equal the per-image features.
+
+Usage: python -m benchmarks.image_descriptors [--n_images=40] [--size=250]
+"""
+
+import argparse
+
+import numpy as np
+
+from handlers.feature_extraction.image_bow import (
+    color_descriptors,
+    color_descriptors_single,
+    edge_descriptors,
+    edge_descriptors_single,
+)
+from handlers.feature_extraction.utils import ImageBatch
+from .utils import best_time, print_table, random_images
+
+
+def main():
+    """
+    Print the images per second of the per-image and batched descriptors.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_images', type=int, default=40)
+    parser.add_argument('--size', type=int, default=250)
+    args = parser.parse_args()
+
+    # odd sizes and a gray image, besides the square color images
+    imgs = random_images(args.n_images - 2, args.size, args.size)\
+        + random_images(1, args.size + 1, args.size - 3, random_state=1)\
+        + [random_images(1, args.size, args.size, random_state=2)[0][:, :, 0]]
+    batch = ImageBatch(imgs)
+    # precompute the color conversions shared by the descriptors
+    _ = batch.color, batch.gray, batch.hsv
+
+    def color_single():
+        return np.array([color_descriptors_single(img, False, img_gray, img_hsv)
+                         for img, img_gray, img_hsv in zip(batch.color, batch.gray, batch.hsv)])
+
+    def edge_single():
+        return np.array([edge_descriptors_single(img, False) for img in batch.gray])
+
+    rows = []
+    for name, single, batched in [
+            ('color', color_single, lambda: color_descriptors(batch)[0]),
+            ('edge', edge_single, lambda: edge_descriptors(batch)[0])]:
+        assert np.array_equal(single(), batched()), f'the {name} features differ'
+        rows.append([f'{name}_descriptors_single per image',
+                     f'{len(imgs) / best_time(single, repeat=3):.0f}'])
+        rows.append([f'{name}_descriptors',
+                     f'{len(imgs) / best_time(batched, repeat=3):.0f}'])
+    print(f'{len(imgs)} images of ~{args.size} x {args.size} pixels, '
+          'the batched features equal the per-image features')
+    print_table(['implementation', 'images / s'], rows)
+
+
+if __name__ == '__main__':
+    main()
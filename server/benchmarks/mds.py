@@ -0,0 +1,61 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of the MDS projection with appended rows.
+
+Prints the time and peak memory (traced numpy allocations, excluding X)
+of the landmark MDS, and the time of triangulating 1% of appended rows
+against the landmark MDS of the leading rows, for Gaussian blobs of float32 features.
+Then prints the time of SMACOF on the largest pool it is used for.
+
+Usage: python -m benchmarks.mds [--n_pools 10000 100000 1000000]
+    [--n_features=128] [--smacof_samples=5000]
+"""
+
+import argparse
+from functools import partial
+import tracemalloc
+
+from handlers.projection import mds
+from .utils import best_time, format_time, make_blobs, print_table
+
+
+def main():
+    """
+    Print the times of the landmark MDS, the triangulation and SMACOF.
+    """
+    # pylint: disable=invalid-name
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_pools', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--n_features', type=int, default=128)
+    parser.add_argument('--smacof_samples', type=int, default=mds.EXACT_MAX_SAMPLES)
+    args = parser.parse_args()
+
+    rows = []
+    for n_pool in args.n_pools:
+        X = make_blobs(n_pool, args.n_features)
+        tracemalloc.start()
+        landmark = best_time(partial(mds.extend_projection, X, 2), repeat=1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        n_projected = n_pool - n_pool // 100
+        previous = mds.extend_projection(X[:n_projected], 2)
+        appending = best_time(partial(mds.extend_projection, X, 2, (n_projected, previous)),
+                              repeat=3)
+        rows.append([f'{n_pool:,}', format_time(landmark),
+                     f'{peak / 2 ** 20:.0f} MB', format_time(appending)])
+        del X, previous
+    print(f'Gaussian blobs of {args.n_features} float32 features')
+    print_table(['n_pool', 'landmark MDS', 'peak memory', 'appending 1% rows'], rows)
+
+    X = make_blobs(args.smacof_samples, args.n_features)
+    smacof = best_time(partial(mds.extend_projection, X, 2), repeat=1)
+    print(f'SMACOF took {format_time(smacof)} for {args.smacof_samples:,} rows.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of the shared mongo clients of data_persistence.
+
+Prints the latency per call of saving, and of checking and loading
+(the calls of load_estimator in a selection request),
+with a new client per call as before and with the shared client.
+By default the database is the in-process stand-in mongomock,
+which has no network handshake, so the gap it shows is a lower bound;
+the column 'client setup' adds the construction and closing
+of a pymongo.MongoClient, which the former code paid on every call
+(before any connection is opened).
+Give --url to run against a real mongod instead.
+
+Usage: python -m benchmarks.mongo_client [--url=mongodb://localhost:27017]
+"""
+
+import argparse
+import pickle
+from typing import List, Optional
+from unittest import mock
+
+from bson.objectid import ObjectId
+import numpy as np
+import pymongo
+
+from handlers.utils.data_persistence import close_clients
+from handlers.utils.data_persistence.data_persistence import (
+    is_saved_in_db,
+    load_from_db,
+    save_to_db,
+)
+from .utils import best_time, format_time, print_table
+
+
+DB_NAME = 'benchmark'
+COLLECTION_NAME = 'data'
+
+
+def former_save(data: object, url: Optional[str], inserted_id: ObjectId) -> None:
+    """
+    The former save_to_db, connecting on every call.
+    """
+
+    client = pymongo.MongoClient(url)
+    client[DB_NAME][COLLECTION_NAME].update_one(
+        {'_id': inserted_id},
+        {'$set': {'data': pickle.dumps(data), 'name': None}}, upsert=True)
+
+
+def former_load(url: Optional[str], inserted_id: ObjectId) -> object:
+    """
+    The former is_saved_in_db and load_from_db, connecting on every call.
+    """
+
+    client = pymongo.MongoClient(url)
+    client[DB_NAME][COLLECTION_NAME].find_one({'_id': inserted_id})
+    client = pymongo.MongoClient(url)
+    data = client[DB_NAME][COLLECTION_NAME].find_one({'_id': inserted_id})
+    return pickle.loads(data['data'])
+
+
+def shared_save(data: object, url: Optional[str], inserted_id: ObjectId) -> None:
+    """
+    Save with the shared client.
+    """
+
+    save_to_db(data, None, url, DB_NAME, COLLECTION_NAME, inserted_id)
+
+
+def shared_load(url: Optional[str], inserted_id: ObjectId) -> object:
+    """
+    Check and load with the shared client.
+    """
+
+    is_saved_in_db(inserted_id, url, DB_NAME, COLLECTION_NAME)
+    return load_from_db(inserted_id, url, DB_NAME, COLLECTION_NAME)
+
+
+def time_rows(url: Optional[str], client_setup: float) -> List[List[str]]:
+    """
+    Time saving and loading payloads of different sizes.
+    """
+
+    rows = []
+    for n_bytes in [1 << 10, 1 << 20]:
+        data = np.zeros(n_bytes // 8)
+        inserted_id = ObjectId()
+        size = f'{n_bytes >> 10} KB' if n_bytes < 1 << 20 else f'{n_bytes >> 20} MB'
+        calls = [
+            ('save', 1, lambda func, data=data, inserted_id=inserted_id:
+             func(data, url, inserted_id), former_save, shared_save),
+            ('is_saved + load', 2, lambda func, inserted_id=inserted_id:
+             func(url, inserted_id), former_load, shared_load),
+        ]
+        for name, n_clients, call, former, shared in calls:
+            before = best_time(lambda call=call, former=former: call(former), repeat=20)
+            after = best_time(lambda call=call, shared=shared: call(shared), repeat=20)
+            rows.append([f'{name}, {size}', format_time(before),
+                         format_time(before + n_clients * client_setup)
+                         if client_setup else '-',
+                         format_time(after)])
+    return rows
+
+
+def measure_client_setup() -> float:
+    """
+    Time the construction and closing of a pymongo client, without connecting.
+    """
+
+    def setup():
+        pymongo.MongoClient('mongodb://localhost:27017', connect=False).close()
+    return best_time(setup, repeat=20)
+
+
+def main():
+    """
+    Print the latency per call before and after sharing the clients.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', type=str, default=None)
+    args = parser.parse_args()
+
+    header = ['call', 'new client', 'new client + client setup', 'shared client']
+    if args.url is not None:
+        rows = time_rows(args.url, 0)
+    else:
+        # mongomock is only needed without a real mongod
+        import mongomock  # pylint: disable=import-outside-toplevel
+        from mongomock.store import ServerStore  # pylint: disable=import-outside-toplevel
+
+        client_setup = measure_client_setup()
+        store = ServerStore()
+        with mock.patch('pymongo.MongoClient',
+                        lambda url=None, **kwargs: mongomock.MongoClient(
+                            url, _store=store, **kwargs)):
+            rows = time_rows(None, client_setup)
+    close_clients()
+    print_table(header, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of parallel_describe, the parallel BoW image descriptors.
+
+Prints the time to describe random images serially
+and with process pools of 1 to --max_workers workers (the number of processors by default),
+together with the speed-up over the serial description.
+The pool is started before timing, such that spawning the workers is not counted.
+
+Usage: python -m benchmarks.parallel_describe [--n_images=64] [--size=250]
+"""
+
+import argparse
+import base64
+import importlib
+import os
+import time
+from typing import List
+from unittest import mock
+
+import cv2 as cv
+
+from handlers.feature_extraction.image_bow import describe_data_objects
+from handlers.types import DataObject
+from .utils import format_time, print_table, random_images
+
+# the module, shadowed by the function of the same name in the package
+module = importlib.import_module('handlers.feature_extraction.utils.parallel_describe')
+
+
+def make_data_objects(n_images: int, size: int) -> List[DataObject]:
+    """
+    Create data objects with smoothed random PNG images as data urls.
+    """
+
+    data_objects = []
+    for i, img in enumerate(random_images(n_images, size, size)):
+        _, buffer = cv.imencode('.png', img)
+        content = 'data:image/png;base64,' + base64.b64encode(buffer.tobytes()).decode()
+        data_objects.append({'uuid': str(i), 'type': 'image', 'content': content})
+    return data_objects
+
+
+def time_describe(data_objects: List[DataObject], n_workers: int) -> float:
+    """
+    Time parallel_describe with a pool of n_workers workers, 0 for serial.
+    """
+
+    if n_workers == 0:
+        start = time.perf_counter()
+        describe_data_objects(data_objects)
+        return time.perf_counter() - start
+
+    module.shutdown_pool()
+    module.N_WORKERS = n_workers
+    # start the workers before timing
+    with module.use_pool() as pool:
+        list(pool.map(abs, range(n_workers)))
+    # use the pool even with 1 worker, to measure its overhead
+    with mock.patch.object(module, 'can_parallelize', lambda n_items: True):
+        start = time.perf_counter()
+        module.parallel_describe(describe_data_objects, data_objects)
+        seconds = time.perf_counter() - start
+    module.shutdown_pool()
+    return seconds
+
+
+def main():
+    """
+    Print the time to describe the images with 1 to --max_workers workers.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_images', type=int, default=64)
+    parser.add_argument('--size', type=int, default=250)
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    data_objects = make_data_objects(args.n_images, args.size)
+    serial = time_describe(data_objects, 0)
+    rows = [['serial', format_time(serial), '1.00']]
+    n_workers = 1
+    while n_workers <= args.max_workers:
+        seconds = time_describe(data_objects, n_workers)
+        rows.append([f'pool, {n_workers}', format_time(seconds),
+                     f'{serial / seconds:.2f}'])
+        n_workers *= 2
+    if n_workers // 2 != args.max_workers:
+        seconds = time_describe(data_objects, args.max_workers)
+        rows.append([f'pool, {args.max_workers}', format_time(seconds),
+                     f'{serial / seconds:.2f}'])
+    print(f'{args.n_images} images of {args.size} x {args.size} pixels, '
+          f'{os.cpu_count()} processors')
+    print_table(['workers', 'time', 'speed-up'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The accuracy-vs-speed benchmark of the fast texture descriptors.
+
+Prints the time per image of texture_descriptors for 24 crops of the photos
+of skimage.data resized to each size, in the exact mode (256 gray levels,
+full image) and in fast modes, with the accuracy of each fast mode
+against the exact mode at the same size:
+- lbp, glcm, local: the median over the columns of each group
+  (local binary pattern, co-occurrence properties, local entropy)
+  of the correlation of the column across the images;
+- distances: the Spearman correlation of the pairwise distances
+  of the images on the standardized features.
+
+Usage: python -m benchmarks.texture_descriptors [--sizes 512 1024 2048]
+"""
+
+import argparse
+import time
+from typing import List, Optional, Tuple
+import warnings
+
+import cv2 as cv
+import numpy as np
+from scipy.spatial.distance import pdist
+from scipy.stats import spearmanr
+import skimage.data
+
+from handlers.feature_extraction.image_bow import texture_descriptors
+from .utils import format_time, print_table
+
+
+# pylint: disable=pointless-string-statement
+"""
+The photos of skimage.data the crops are taken from.
+"""
+PHOTOS = ['astronaut', 'coffee', 'chelsea', 'rocket', 'camera', 'coins',
+          'brick', 'grass', 'gravel', 'hubble_deep_field', 'immunohistochemistry', 'moon']
+
+"""
+The fast modes (gray_levels, max_size) benchmarked at each size.
+"""
+FAST_MODES: List[Tuple[int, Optional[int]]] = [(32, None), (256, 512), (256, 1024)]
+
+"""
+The prefixes of the feature names of the groups whose accuracy is reported.
+"""
+GROUPS = {
+    'lbp': ['texture-lbp'],
+    'glcm': ['texture-contrast', 'texture-dissimilarity', 'texture-homogeneity',
+             'texture-energy', 'texture-correlation'],
+    'local': ['texture-localentropy'],
+}
+
+
+def make_crops(size: int) -> List[np.ndarray]:
+    """
+    Crop the left and right squares of the photos and resize them to size x size.
+    """
+
+    imgs = []
+    for name in PHOTOS:
+        img = getattr(skimage.data, name)()
+        img = img if img.ndim == 2 else cv.cvtColor(img[:, :, :3], cv.COLOR_RGB2BGR)
+        side = min(img.shape[:2])
+        for left in [0, img.shape[1] - side]:
+            crop = np.ascontiguousarray(img[:side, left:left + side])
+            imgs.append(cv.resize(crop, (size, size), interpolation=cv.INTER_CUBIC))
+    return imgs
+
+
+def column_correlations(X_exact: np.ndarray, X_fast: np.ndarray) -> np.ndarray:
+    """
+    Compute the correlation of each column of the exact and fast features
+    across the images, nan for the constant columns.
+    """
+    # pylint: disable=invalid-name
+
+    exact = X_exact - X_exact.mean(axis=0)
+    fast = X_fast - X_fast.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (exact * fast).sum(axis=0)\
+            / np.sqrt((exact ** 2).sum(axis=0) * (fast ** 2).sum(axis=0))
+
+
+def distance_correlation(X_exact: np.ndarray, X_fast: np.ndarray) -> float:
+    """
+    Compute the Spearman correlation of the pairwise distances
+    of the images on the standardized exact and fast features.
+    """
+    # pylint: disable=invalid-name
+
+    def standardize(X):
+        std = X.std(axis=0)
+        std[std == 0] = 1
+        return (X - X.mean(axis=0)) / std
+    return spearmanr(pdist(standardize(X_exact)), pdist(standardize(X_fast)))[0]
+
+
+def time_texture(imgs: List[np.ndarray],
+                 gray_levels: int,
+                 max_size: Optional[int]) -> Tuple[np.ndarray, List[str], float]:
+    """
+    Compute the texture descriptors and the time per image.
+    """
+
+    start = time.perf_counter()
+    X, feature_names = texture_descriptors(imgs, gray_levels, max_size)  # pylint: disable=invalid-name
+    return X, feature_names, (time.perf_counter() - start) / len(imgs)
+
+
+def main():
+    """
+    Print the time per image and the accuracy of the fast modes.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[512, 1024, 2048])
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    rows = []
+    for size in args.sizes:
+        imgs = make_crops(size)
+        X_exact, feature_names, seconds = time_texture(imgs, 256, None)  # pylint: disable=invalid-name
+        rows.append([size, 256, None, format_time(seconds), '(exact)', '', '', ''])
+        for gray_levels, max_size in FAST_MODES:
+            if max_size is not None and max_size >= size:
+                continue
+            X_fast, _, seconds = time_texture(imgs, gray_levels, max_size)  # pylint: disable=invalid-name
+            correlations = column_correlations(X_exact, X_fast)
+            accuracies = [np.nanmedian(correlations[[
+                any(name.startswith(prefix + '[') for prefix in prefixes)
+                for name in feature_names]]) for prefixes in GROUPS.values()]
+            rows.append([size, gray_levels, max_size, format_time(seconds),
+                         *[f'{d:.2f}' for d in accuracies],
+                         f'{distance_correlation(X_exact, X_fast):.2f}'])
+    print(f'{len(PHOTOS) * 2} crops of the photos of skimage.data')
+    print_table(['size', 'gray_levels', 'max_size', 'time', *GROUPS, 'distances'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of tiered_multi_argmax, the selection of the entropy sampling.
+
+Prints the time per call with n_instances = 20 for pool sizes from 10k to 10M
+and the three tie breaking modes,
+and the time of the former per-index loop mapping the subset indices back
+(skipped above --max_loop_pool rows, as it grows with the pool size).
+
+Usage: python -m benchmarks.tiered_multi_argmax [--max_pool=10000000]
+"""
+
+import argparse
+from typing import List
+
+import numpy as np
+
+from handlers.data_object_selection.utils.masked_multi_argmax import multi_argmax
+from handlers.data_object_selection.utils.tiered_multi_argmax import tiered_multi_argmax
+from handlers.types import StatusType
+from .utils import best_time, format_time, print_table
+
+
+def loop_index_in_all(index_in_subset: int, mask_subset: np.ndarray) -> int:
+    """
+    The former mapping of an index in the subset to the index in the whole set,
+    looping over the mask.
+    """
+    # pylint: disable=consider-using-enumerate
+
+    index_in_all = index_in_subset
+    for i in range(len(mask_subset)):
+        if not mask_subset[i] and i <= index_in_all:
+            index_in_all += 1
+        if i > index_in_all:
+            break
+    return index_in_all
+
+
+def loop_selection(values: np.ndarray, statuses: np.ndarray, n_instances: int) -> np.ndarray:
+    """
+    The former selection of the New data objects with the loop mapping.
+    """
+
+    mask = statuses == StatusType.New
+    indices = multi_argmax(values[mask], n_instances=n_instances, kind='fast')
+    return np.array([loop_index_in_all(idx, mask) for idx in indices])
+
+
+def time_row(n_pool: int,
+             n_instances: int,
+             max_loop_pool: int,
+             rng: np.random.RandomState) -> List[str]:
+    """
+    Time the selection in a pool of random values and statuses.
+    """
+
+    statuses = rng.choice(np.array([StatusType.New, StatusType.Skipped,
+                                    StatusType.Labeled], dtype=object), n_pool)
+    values = rng.rand(n_pool)
+    row = [f'{n_pool // 1000}k' if n_pool < 1_000_000 else f'{n_pool // 1_000_000}M']
+    for kind in ['fast', 'random', 'stable']:
+        row.append(format_time(best_time(lambda kind=kind: tiered_multi_argmax(
+            values, statuses, n_instances, kind=kind, random_state=0))))
+    row.append(format_time(best_time(
+        lambda: loop_selection(values, statuses, n_instances), repeat=1))
+        if n_pool <= max_loop_pool else '-')
+    return row
+
+
+def main():
+    """
+    Print the time per call for pool sizes from 10k to --max_pool.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max_pool', type=int, default=10_000_000)
+    parser.add_argument('--max_loop_pool', type=int, default=1_000_000)
+    parser.add_argument('--n_instances', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    rows = [time_row(n_pool, args.n_instances, args.max_loop_pool, rng)
+            for n_pool in [10_000, 100_000, 1_000_000, 10_000_000]
+            if n_pool <= args.max_pool]
+    print_table(['n_pool', 'fast', 'random', 'stable', 'former loop'], rows)
+
+if __name__ == '__main__':
+    main()
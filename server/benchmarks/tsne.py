@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The benchmark of the TSNE projection with appended rows.
+
+Prints the time of the full TSNE, of placing 1% of appended rows
+against the embedding of the leading rows, and of the cache key,
+for Gaussian blobs of float32 features.
+The placement does not depend on the values of the embedding,
+thus the leading rows are given a random embedding and the PCA of a subsample,
+such that pools too large for the full TSNE can be measured.
+
+Usage: python -m benchmarks.tsne [--n_pools 10000 100000 1000000]
+    [--n_features=256] [--full_max=10000]
+"""
+
+import argparse
+from functools import partial
+
+import numpy as np
+from sklearn.decomposition import PCA
+
+from handlers.projection import tsne
+from handlers.projection.utils import ProjectionCache
+from .utils import best_time, format_time, make_blobs, print_table
+
+
+def make_previous(X: np.ndarray, n_embedded: int) -> tsne.Embedding:
+    """
+    Create a stand-in embedding of the leading rows,
+    with the PCA fitted on a subsample as in tsne.reduce_dimensions.
+    """
+    # pylint: disable=invalid-name
+
+    rng = np.random.RandomState(0)
+    sample = rng.choice(n_embedded, min(n_embedded, 10000), replace=False)
+    pca = PCA(n_components=tsne.PCA_COMPONENTS,
+              svd_solver='randomized',
+              random_state=0).fit(X[sample])
+    return {'pca': pca, 'embedding': rng.rand(n_embedded, 2)}
+
+
+def main():
+    """
+    Print the times of the full TSNE, the placement and the cache key.
+    """
+    # pylint: disable=invalid-name
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_pools', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--n_features', type=int, default=256)
+    parser.add_argument('--full_max', type=int, default=10000,
+                        help='the largest pool for which the full TSNE is run')
+    args = parser.parse_args()
+
+    rows = []
+    for n_pool in args.n_pools:
+        X = make_blobs(n_pool, args.n_features)
+        full = '-'
+        if n_pool <= args.full_max:
+            full = format_time(best_time(partial(tsne.extend_embedding, X, 2), repeat=1))
+
+        n_embedded = n_pool - n_pool // 100
+        previous = make_previous(X, n_embedded)
+        placing = best_time(partial(tsne.extend_embedding, X, 2, (n_embedded, previous)),
+                            repeat=3)
+        key = best_time(partial(ProjectionCache.get_key, X, 'tsne-2'), repeat=3)
+        rows.append([f'{n_pool:,}', full, format_time(placing), format_time(key)])
+        del X, previous
+    print(f'Gaussian blobs of {args.n_features} float32 features')
+    print_table(['n_pool', 'full TSNE', 'placing 1% rows', 'cache key'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The timing and printing utilities shared by the benchmarks.
+"""
+
+import timeit
+from typing import Callable, List, Sequence
+
+import cv2 as cv
+import numpy as np
+
+
+def best_time(func: Callable[[], object], repeat: int = 5) -> float:
+    """
+    Time a function with the best of several runs.
+
+    Args
+    ----
+    func : Callable[[], object]
+        The function to time.
+    repeat : int, optional (default=5)
+        The number of runs.
+
+    Returns
+    -------
+    seconds : float
+        The time of the fastest run in seconds.
+    """
+
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def format_time(seconds: float) -> str:
+    """
+    Format a duration in seconds or milliseconds.
+
+    Args
+    ----
+    seconds : float
+        The duration in seconds.
+
+    Returns
+    -------
+    text : str
+        The formatted duration, e.g., '23.6 ms'.
+    """
+
+    if seconds >= 1:
+        return f'{seconds:.2f} s'
+    return f'{seconds * 1000:.3g} ms'
+
+
+def make_blobs(n_samples: int, n_features: int, n_centers: int = 10) -> np.ndarray:
+    """
+    Create Gaussian blobs of float32 features without float64 copies.
+
+    Args
+    ----
+    n_samples : int
+        The number of rows.
+    n_features : int
+        The number of features.
+    n_centers : int, optional (default=10)
+        The number of blobs.
+
+    Returns
+    -------
+    X : np.ndarray of float32 values, shape = (n_samples, n_features)
+        The features.
+    """
+    # pylint: disable=invalid-name
+
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-10, 10, (n_centers, n_features)).astype(np.float32)
+    X = rng.standard_normal((n_samples, n_features), dtype=np.float32)
+    X += centers[rng.integers(n_centers, size=n_samples)]
+    return X
+
+
+def print_table(header: Sequence[str], rows: List[Sequence[str]]) -> None:
+    """
+    Print a table in the reStructuredText simple table format of the docstrings.
+
+    Args
+    ----
+    header : Sequence[str]
+        The column names.
+    rows : List[Sequence[str]]
+        The cells of the rows.
+    """
+
+    widths = [max(len(str(cell)) for cell in column) + 2
+              for column in zip(header, *rows)]
+    rule = '  '.join('=' * width for width in widths)
+    print(rule)
+    print('  '.join(str(cell).ljust(width) for cell, width in zip(header, widths)).rstrip())
+    print(rule)
+    for row in rows:
+        print('  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)).rstrip())
+    print(rule)
+
+
+def random_images(n_images: int,
+                  height: int = 250,
+                  width: int = 250,
+                  random_state: int = 0) -> List[np.ndarray]:
+    """
+    Create smoothed random BGR images, standing in for photos.
+
+    Args
+    ----
+    n_images : int
+        The number of images.
+    height : int, optional (default=250)
+        The height of the images in pixels.
+    width : int, optional (default=250)
+        The width of the images in pixels.
+    random_state : int, optional (default=0)
+        The seed of the random number generator.
+
+    Returns
+    -------
+    imgs : List[np.ndarray]
+        The images, shape = (height, width, 3), dtype = uint8.
+    """
+
+    rng = np.random.RandomState(random_state)
+    return [cv.GaussianBlur(rng.randint(0, 256, (height, width, 3), dtype=np.uint8),
+                            (9, 9), 0)
+            for _ in range(n_images)]
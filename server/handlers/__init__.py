@@ -1,12 +1,16 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+from .blob_store_handler import BlobStoreHandler
 from .compile_handler import CompileHandler
+from .dataset_session_handler import DatasetSessionHandler
 from .model_training_handler import ModelTrainingHandler
 from .image_processing_handler import ImageProcessingHandler
 
 __all__ = [
+    "BlobStoreHandler",
     "CompileHandler",
+    "DatasetSessionHandler",
     "ModelTrainingHandler",
     "ImageProcessingHandler",
 ]
@@ -0,0 +1,81 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The handler of the blob store, where the clients upload the images once
+and reference them from the data objects instead of sending data urls.
+"""
+
+from typing import List, Optional
+
+import tornado.web
+
+from .utils.blob_store import BLOB_PREFIX, BlobWriter, has_blob
+from .utils.wire_format import CorsRequestHandler, parse_body, write_body
+
+
+@tornado.web.stream_request_body
+class BlobStoreHandler(CorsRequestHandler):
+    """
+    The handler for the blob store.
+
+    - POST /blobs/missing with {blobIds} returns the ids not stored yet,
+      such that the client only uploads the missing blobs;
+    - POST /blobs/upload with the raw blob as body stores the blob,
+      streamed to disk without buffering the body in memory,
+      and returns {blobId, content} where content references the blob
+      and can replace the data url in the data objects.
+    """
+
+    def initialize(self):
+        """Start with no blob being written."""
+        self.writer: Optional[BlobWriter] = None
+        self.chunks: List[bytes] = []
+
+    def prepare(self):
+        if self.request.method == 'POST' and self.path_args[0] == 'upload':
+            self.writer = BlobWriter()
+
+    def data_received(self, chunk: bytes):
+        if self.writer is not None:
+            self.writer.write(chunk)
+        else:
+            self.chunks.append(chunk)
+
+    def on_finish(self):
+        # the upload failed when the blob is not stored yet
+        if self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+
+    def on_connection_close(self):
+        self.on_finish()
+
+    def post(self, key: str):
+        """Report the missing blobs or store an uploaded blob."""
+        self.set_header('Access-Control-Allow-Origin', '*')
+
+        if key not in ['missing', 'upload']:
+            # The service is not found.
+            self.send_error(404)
+            return
+
+        if key == 'upload':
+            blob_id = self.writer.close()
+            self.writer = None
+            write_body(self, {
+                'blobId': blob_id,
+                'content': f'{BLOB_PREFIX}{blob_id}',
+            })
+            return
+
+        # process input: (blobIds)
+        self.request.body = b''.join(self.chunks)
+        json_data = parse_body(self.request)
+        blob_ids: List[str] = json_data['blobIds']
+        try:
+            missing = [d for d in blob_ids if not has_blob(d)]
+        except ValueError:
+            self.send_error(400)
+            return
+        write_body(self, {'blobIds': missing})
@@ -6,11 +6,12 @@ import shutil
 import subprocess
 
 import dotenv
-import tornado.web
+
+from .utils.wire_format import CorsRequestHandler
 
 CLIENT_CODEBASE_PATH = '../client'
 
-class CompileHandler(tornado.web.RequestHandler):
+class CompileHandler(CorsRequestHandler):
     """
     The handler for compilation.
     """
@@ -1,19 +1,18 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
-from typing import List
 
 import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.neighbors import KernelDensity
-from tornado.web import RequestHandler
 
-from .utils import masked_multi_argmax
-from ..types import DataObject, Status, StatusType
+from .utils import tiered_multi_argmax
+from ..utils.dataset_session import resolve_dataset
+from ..utils.executor import run_in_executor
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
 
 
-def density_sampling(data_objects: List[DataObject],
+def density_sampling(features: np.ndarray,
                      statuses: np.ndarray,
                      n_batch: int) -> np.ndarray:
     """
@@ -24,8 +23,8 @@ def density_sampling(data_objects: List[DataObject],
 
     Args
     ----
-    data_objects : np.ndarray or list of any values, length = n_pool
-        The whole list of data objects, no matter labeled or unlabeled.
+    features : np.ndarray of any values, length = n_pool
+        The features of data objects, no matter labeled or unlabeled.
     statuses : np.ndarray of any values, dtype = objects, shape = (n_pool,)
         The label statuses of the data objects.
         Each entry takes value in
@@ -42,9 +41,7 @@ def density_sampling(data_objects: List[DataObject],
     def scotts_factor(n_samples: int, n_features: int) -> float:
         return n_samples**(-1.0 / (n_features + 4))
 
-    mask_new = statuses == StatusType.New
-    new_indices = np.where(mask_new)[0]
-    X = np.array([data_object['features'] for data_object in data_objects])
+    X = features
 
     n_samples, n_features = X.shape
     n_components = min(2, n_features)
@@ -54,51 +51,33 @@ def density_sampling(data_objects: List[DataObject],
     kde = KernelDensity(bandwidth=bandwidth).fit(X_pca)
     log_density = kde.score_samples(X_pca)
 
-    if len(new_indices) <= n_batch:
-        query_indices = new_indices
-        mask_skipped = statuses == StatusType.Skipped
-        skipped_indices = np.where(mask_skipped)[0]
-        n_residue = n_batch - len(query_indices)
-        if len(skipped_indices) <= n_residue:
-            query_indices_skipped = skipped_indices
-        else:
-            query_indices_skipped = masked_multi_argmax(
-                values=log_density,
-                mask=mask_skipped,
-                n_instances=n_residue,
-            )
-        query_indices = np.concatenate((query_indices, query_indices_skipped))
-        return query_indices
-
-    query_indices = masked_multi_argmax(
+    query_indices = tiered_multi_argmax(
         values=log_density,
-        mask=mask_new,
+        statuses=statuses,
         n_instances=n_batch,
     )
     return query_indices
 
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for data object selection - dense areas.
     """
 
-    def post(self):
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # process input: (dataObjects, statues, nBatch)
-        data_objects: List[DataObject] = json_data['dataObjects']
-        statuses: List[Status] = json_data['statuses']
+        # process input: (dataObjects | sessionId, statues, nBatch)
+        dataset = resolve_dataset(json_data)
+        features = dataset['features']
+        statuses = dataset['statuses']
         n_batch: int = json_data['nBatch']
 
-        # data structure transformation
-        statuses = np.array([d['value'] for d in statuses], dtype=str)
+        assert len(features) == len(statuses),\
+            'len(features) != len(statuses)'
 
-        assert len(data_objects) == len(statuses),\
-            'len(data_objects) != len(statuses)'
+        query_indices = await run_in_executor(
+            self.request.path, density_sampling, features, statuses, n_batch)
 
-        query_indices = density_sampling(data_objects, statuses, n_batch)
-        query_indices = query_indices.tolist()
-
-        self.write({'queryIndices': query_indices})
+        write_body(self, {'queryIndices': query_indices})
@@ -1,37 +1,30 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
-from typing import List
-
-import numpy as np
-from tornado.web import RequestHandler
 
 from .utils import random_sampling
-from ..types import DataObject, Status
+from ..utils.dataset_session import resolve_dataset
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
 
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for data object selection - random.
     """
 
     def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # process input: (dataObjects, statues, nBatch)
-        data_objects: List[DataObject] = json_data['dataObjects']
-        statuses: List[Status] = json_data['statuses']
+        # process input: (dataObjects | sessionId, statues, nBatch)
+        dataset = resolve_dataset(json_data, with_features=False)
+        uuids = dataset['uuids']
+        statuses = dataset['statuses']
         n_batch: int = json_data['nBatch']
 
-        # data structure transformation
-        statuses = np.array([d['value'] for d in statuses], dtype=str)
-
-        assert len(data_objects) == len(statuses),\
-            'len(data_objects) != len(statuses)'
+        assert len(uuids) == len(statuses),\
+            'len(uuids) != len(statuses)'
 
-        query_indices = random_sampling(data_objects, statuses, n_batch)
-        query_indices = query_indices.tolist()
+        query_indices = random_sampling(uuids, statuses, n_batch)
 
-        self.write({'queryIndices': query_indices})
+        write_body(self, {'queryIndices': query_indices})
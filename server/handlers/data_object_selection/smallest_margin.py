@@ -1,26 +1,22 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
-from typing import List, Union
+from typing import Union
 
 from modAL.uncertainty import classifier_margin
 import numpy as np
 from sklearn.base import BaseEstimator
 from sklearn.exceptions import NotFittedError
-from tornado.web import RequestHandler
 
 from .utils import (
-    masked_multi_argmax,
     random_sampling,
+    tiered_multi_argmax,
 )
-from ..types import (
-    DataObject,
-    Model,
-    Status,
-    StatusType,
-)
+from ..types import Model
+from ..utils.dataset_session import resolve_dataset
+from ..utils.executor import run_in_executor
 from ..utils.load_estimator import load_estimator
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
 
 
 def margin_sampling(features: np.ndarray,
@@ -52,76 +48,53 @@ def margin_sampling(features: np.ndarray,
         The indices of the sampled data objects in the whole list.
     """
 
-    mask_new = statuses == StatusType.New
-    new_indices = np.where(mask_new)[0]
-
     if estimator is None:
         return random_sampling(features, statuses, n_batch)
 
     neg_margin = -classifier_margin(estimator, features)
 
-    if len(new_indices) <= n_batch:
-        query_indices = new_indices
-        mask_skipped = statuses == StatusType.Skipped
-        skipped_indices = np.where(mask_skipped)[0]
-        n_residue = n_batch - len(query_indices)
-        if len(skipped_indices) <= n_residue:
-            query_indices_skipped = skipped_indices
-        else:
-            query_indices_skipped = masked_multi_argmax(
-                values=neg_margin,
-                mask=mask_skipped,
-                n_instances=n_residue,
-            )
-        query_indices = np.concatenate((query_indices, query_indices_skipped))
-        return query_indices
-
-    query_indices = masked_multi_argmax(
+    query_indices = tiered_multi_argmax(
         values=neg_margin,
-        mask=mask_new,
+        statuses=statuses,
         n_instances=n_batch,
     )
     return query_indices
 
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for data object selection - smallest margin.
     """
 
-    def post(self):
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
-
-        # process input: (labels, features, model)
-        data_objects: List[DataObject] = json_data['dataObjects']
-        
-        features = np.array([data_object['features']
-                             for data_object in data_objects])
-        statuses: List[Status] = json_data['statuses']
+        json_data = parse_body(self.request)
+
+        # process input: (dataObjects | sessionId, statuses, nBatch, model)
+        dataset = resolve_dataset(json_data)
+        features = dataset['features']
+        statuses = dataset['statuses']
         n_batch: int = json_data['nBatch']
         model: Union[Model, None] = json_data['model']\
             if 'model' in json_data else None
 
-        # data structure transformation
-        statuses = np.array([d['value'] for d in statuses], dtype=str)
-
         assert len(features) == len(statuses),\
             'len(features) != len(statuses)'
 
         if model is None:
             query_indices = random_sampling(features, statuses, n_batch)
         else:
-            assert model['type'] in ['LogisticRegression', 'LabelSpreading'],\
+            assert model['type'] in ['LogisticRegression', 'LabelSpreading',
+                                     'LabelSpreadingKNN', 'SGD'],\
                 'provided model cannot be used for sampling'
             sampler = load_estimator(model)
             try:
-                query_indices = margin_sampling(
+                query_indices = await run_in_executor(
+                    self.request.path, margin_sampling,
                     features, statuses, n_batch, sampler)
             except NotFittedError:
                 query_indices = random_sampling(
                     features, statuses, n_batch)
 
-        query_indices = query_indices.tolist()
 
-        self.write({'queryIndices': query_indices})
+        write_body(self, {'queryIndices': query_indices})
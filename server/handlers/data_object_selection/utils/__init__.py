@@ -3,8 +3,10 @@
 
 from .masked_multi_argmax import masked_multi_argmax
 from .random_sampling import random_sampling
+from .tiered_multi_argmax import tiered_multi_argmax
 
 __all__ = [
     "masked_multi_argmax",
     "random_sampling",
+    "tiered_multi_argmax",
 ]
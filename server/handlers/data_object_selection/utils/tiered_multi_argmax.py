@@ -0,0 +1,94 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The selection of the data objects with the largest scores,
+New data objects first and Skipped data objects afterwards.
+"""
+
+from typing import Union
+
+import numpy as np
+
+from .masked_multi_argmax import masked_multi_argmax
+from ...types import StatusType
+
+
+def tiered_multi_argmax(values: np.ndarray,
+                        statuses: np.ndarray,
+                        n_instances: int,
+                        kind: str = 'fast',
+                        random_state: Union[int, np.random.RandomState, None] = None,
+                        ) -> np.ndarray:
+    """
+    Select the indices of the data objects with the largest values,
+    where New data objects are selected first and Skipped data objects afterwards.
+    Data objects with other statuses are never selected.
+
+    Args
+    ----
+    values : np.ndarray of float values, shape = (n_pool,)
+        The scores of the data objects, larger scores are selected first.
+    statuses : np.ndarray of any values, dtype = objects, shape = (n_pool,)
+        The label statuses of the data objects.
+        Each entry takes value in
+        [StatusType.New, StatusType.Viewed, StatusType.Skipped, StatusType.Labeled].
+    n_instances : int
+        The number of data objects to select.
+        Fewer data objects are returned when
+        the number of New and Skipped data objects is less than n_instances.
+    kind : {'fast', 'random', 'stable'}, optional
+        The tie breaking mode, see multi_argmax.
+    random_state : Union[int, np.random.RandomState, None], optional (default=None)
+        The random number generator, see multi_argmax.
+
+    Returns
+    -------
+    query_indices : np.ndarray of int values, shape = (n_instances,)
+        The indices of the selected data objects in the whole list,
+        the New ones followed by the Skipped ones, each sorted by decreasing values.
+
+    Examples
+    --------
+    >>> n_pool = 1000000
+    >>> statuses = np.random.choice(['New', 'Skipped', 'Labeled'], n_pool)
+    >>> values = np.random.rand(n_pool)
+    >>> %timeit tiered_multi_argmax(values, statuses, n_instances=20)
+    37 ms per loop
+
+    Time per call with n_instances = 20 for different pool sizes,
+    measured by `python -m benchmarks.tiered_multi_argmax`,
+    with the former loop mapping the subset indices back for reference:
+
+    ========  ==========  =========  ==========  =============
+    n_pool    fast        random     stable      former loop
+    ========  ==========  =========  ==========  =============
+    10k       0.364 ms    0.62 ms    0.583 ms    32.5 ms
+    100k      3.46 ms     4.21 ms    7.67 ms     311 ms
+    1M        37 ms       45.7 ms    92 ms       3.17 s
+    10M       351 ms      513 ms     1.04 s      -
+    ========  ==========  =========  ==========  =============
+    """
+
+    assert len(values) == len(statuses),\
+        'len(values) != len(statuses)'
+
+    query_indices = []
+    n_residue = n_instances
+    for status in [StatusType.New, StatusType.Skipped]:
+        if n_residue == 0:
+            break
+        mask = statuses == status
+        n_tier = min(n_residue, int(np.count_nonzero(mask)))
+        query_indices.append(masked_multi_argmax(
+            values=values,
+            mask=mask,
+            n_instances=n_tier,
+            kind=kind,
+            random_state=random_state,
+        ))
+        n_residue -= n_tier
+
+    if len(query_indices) == 0:
+        return np.array([], dtype=int)
+    return np.concatenate(query_indices)
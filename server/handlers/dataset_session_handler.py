@@ -0,0 +1,62 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The handler registering, updating and removing the dataset sessions,
+see handlers.utils.dataset_session.
+"""
+
+from typing import List
+
+from .types import DataObject, Label, Status
+from .utils.dataset_session import (
+    append_to_session,
+    get_session,
+    register_session,
+    remove_session,
+)
+from .utils.wire_format import CorsRequestHandler, parse_body, write_body
+
+
+class DatasetSessionHandler(CorsRequestHandler):
+    """
+    The handler for dataset sessions.
+    """
+
+    def post(self, key: str):
+        """Register, update or remove a dataset session."""
+        self.set_header('Access-Control-Allow-Origin', '*')
+        json_data = parse_body(self.request)
+
+        if key not in ['register', 'update', 'remove']:
+            # The service is not found.
+            self.send_error(404)
+            return
+
+        if key == 'register':
+            # process input: (dataObjects, statuses?, labels?)
+            data_objects: List[DataObject] = json_data['dataObjects']
+            session_id = register_session(data_objects)
+        else:
+            session_id: str = json_data['sessionId']
+
+        if key == 'remove':
+            remove_session(session_id)
+            write_body(self, {'sessionId': session_id})
+            return
+
+        # process input: (dataObjects?, statuses?, labels?, clearedLabels?)
+        if key == 'update' and 'dataObjects' in json_data:
+            data_objects: List[DataObject] = json_data['dataObjects']
+            session = append_to_session(session_id, data_objects)
+        else:
+            session = get_session(session_id)
+        statuses: List[Status] = json_data.get('statuses')
+        labels: List[Label] = json_data.get('labels')
+        cleared_labels: List[str] = json_data.get('clearedLabels')
+        session.update(statuses, labels, cleared_labels)
+
+        write_body(self, {
+            'sessionId': session_id,
+            'nDataObjects': len(session.uuids),
+        })
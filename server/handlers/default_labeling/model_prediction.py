@@ -1,25 +1,26 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
 from typing import List
 
 import numpy as np
+from sklearn.base import BaseEstimator
 from sklearn.exceptions import NotFittedError
-from tornado.web import RequestHandler
 
-from ..types import DataObject, Label, Model
+from ..types import Label, Model
+from ..utils.dataset_session import resolve_dataset
+from ..utils.executor import run_in_executor
 from ..utils.load_estimator import load_estimator
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
 
 from .null import get_default_label as default_label_null
 from .random import get_default_label as default_label_random
 
-def get_default_label(model: Model,
+def get_default_label(predictor: BaseEstimator,
                       features: np.ndarray,
                       uuids: List[str],
                       categories: List[str],
                       unlabeled_mark: str) -> List[Label]:
-    predictor = load_estimator(model)
     try:
         labels = predictor.predict(features).tolist()
         labels = [
@@ -36,26 +37,27 @@ def get_default_label(model: Model,
         raise ValueError(
             'Model not fitted, categories and unlabeled mark not provided')
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for default labeling - model prediction.
     """
 
-    def post(self):
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # input: (dataObjects, features, model, categories, unlabeledMark)
-        data_objects: List[DataObject] = json_data['dataObjects']
-        uuids = [(d['uuid'] if 'uuid' in d else None) for d in data_objects]
-        features = np.array([(d['features'] if 'features' in d else None)
-                             for d in data_objects])
+        # input: (dataObjects | sessionId, model, categories, unlabeledMark)
+        dataset = resolve_dataset(json_data)
+        uuids = dataset['uuids']
+        features = dataset['features']
         model: Model = json_data['model']
         categories: List[str] = json_data['categories']
         unlabeled_mark: str = json_data['unlabeledMark']
         
-        labels = get_default_label(
-            model, features, uuids, categories, unlabeled_mark)
+        predictor = load_estimator(model)
+        labels = await run_in_executor(
+            self.request.path, get_default_label,
+            predictor, features, uuids, categories, unlabeled_mark)
 
-        self.write({'labels': labels})
+        write_body(self, {'labels': labels})
 
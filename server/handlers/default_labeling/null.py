@@ -4,9 +4,8 @@
 import json
 from typing import List
 
-from tornado.web import RequestHandler
-
 from ..types import DataObject, Label
+from ..utils.wire_format import CorsRequestHandler
 
 
 def get_default_label(uuids: List[str],
@@ -18,7 +17,7 @@ def get_default_label(uuids: List[str],
     return labels
 
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for default labeling - null.
     """
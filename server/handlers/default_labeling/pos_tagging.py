@@ -6,9 +6,10 @@ from typing import List, TypedDict
 import uuid
 
 import nltk
-from tornado.web import RequestHandler
 
 from ..types import Label, LabelSpan
+from ..utils.executor import run_in_executor
+from ..utils.wire_format import CorsRequestHandler
 
 
 class DataObject(TypedDict):
@@ -47,18 +48,19 @@ def get_default_label(data_objects: List[DataObject]) -> List[Label]:
     return labels
 
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for default labeling - pos tagging.
     """
 
-    def post(self):
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
         json_data = json.loads(self.request.body)
 
         # input: (dataObjects)
         data_objects: List[DataObject] = json_data['dataObjects']
         
-        labels = get_default_label(data_objects)
+        labels = await run_in_executor(
+            self.request.path, get_default_label, data_objects)
 
         self.write({'labels': labels})
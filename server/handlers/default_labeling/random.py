@@ -5,9 +5,9 @@ import json
 from typing import List
 
 import numpy as np
-from tornado.web import RequestHandler
 
 from ..types import DataObject, Label
+from ..utils.wire_format import CorsRequestHandler
 
 
 def get_default_label(uuids: List[str],
@@ -24,7 +24,7 @@ def get_default_label(uuids: List[str],
     return labels
 
 
-class Handler(RequestHandler):
+class Handler(CorsRequestHandler):
     """
     The handler for default labeling - random.
     """
@@ -1,8 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from typing import List, Tuple
-import json
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union
 
 import cv2 as cv
 import numpy as np
@@ -17,13 +17,73 @@ from skimage.filters.rank import entropy
 from skimage.measure import shannon_entropy
 from skimage.morphology import disk
 from sklearn import decomposition
-from tornado.web import RequestHandler
 
 from ..types import DataObject
-from .utils import get_image, resize_SVD
+from ..utils.executor import run_in_executor
+from ..utils.streaming import accepts_ndjson, stream_features
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
+from .utils import (
+    FIT_MAX_SAMPLES,
+    DescriptorCache,
+    ImageBatch,
+    fit_SVD,
+    get_image,
+    get_image_key,
+    get_reducer,
+    parallel_describe,
+    reduce_SVD,
+    to_image_batch,
+)
 
 
-def raw_flatten(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+# pylint: disable=pointless-string-statement
+"""
+The version of the per-image descriptors, part of the cache keys.
+Should be changed whenever the computation of a descriptor changes.
+"""
+DESCRIPTOR_VERSION = 'bow-1'
+
+"""
+The cache of the per-image descriptors, keyed by the image content.
+"""
+DESCRIPTOR_CACHE = DescriptorCache()
+
+"""
+The number of dimensions the hog descriptors are reduced to.
+"""
+N_HOG_COMPONENTS = 50
+
+"""
+The computation of the texture descriptors:
+- 'exact': the grey level co-occurrence matrix of 256 levels,
+  the local binary pattern and local entropy on the full image;
+- 'fast': the grey level co-occurrence matrix of TEXTURE_GRAY_LEVELS levels,
+  the local binary pattern and local entropy on the image downscaled
+  to at most TEXTURE_MAX_SIZE pixels per side.
+The features of both modes have the same names and layout.
+The fast mode trades the accuracy of the local descriptors of large images
+for time, see texture_descriptors.
+"""
+TEXTURE_MODE = 'exact'
+
+"""
+The number of gray levels of the co-occurrence matrix in fast mode,
+a power of 2 dividing 256.
+Fewer levels barely change the features but save no time.
+"""
+TEXTURE_GRAY_LEVELS = 256
+
+"""
+The maximum side length of the image in pixels for the local binary pattern
+and local entropy in fast mode.
+At 1024, the images of 2048 pixels are described 3.3 times faster
+with a median correlation of 0.83 of the local binary pattern to the exact mode,
+and the images up to 1024 pixels get the exact features.
+"""
+TEXTURE_MAX_SIZE = 1024
+
+
+def raw_flatten(imgs: Union[ImageBatch, List[np.ndarray]]) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for each image by simply flattening the normalized image.
 
@@ -45,13 +105,7 @@ def raw_flatten(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
 
     # normalized the images to gray scale 8 x 8
     h, w = 8, 8
-    X_raw_normalized = []
-    for img in imgs:
-        img_gray = img if len(img.shape) == 2 else cv.cvtColor(
-            img, cv.COLOR_BGR2GRAY)
-        img_resized = cv.resize(img_gray, (h, w), interpolation=cv.INTER_AREA)
-        X_raw_normalized.append(img_resized)
-    X_raw_normalized = np.array(X_raw_normalized)
+    X_raw_normalized = to_image_batch(imgs).gray8
 
     # simply flatten the image
     X = X_raw_normalized.reshape((-1, h * w))
@@ -61,6 +115,8 @@ def raw_flatten(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
 
 def color_descriptors_single(img: np.ndarray,
                              return_feature_names: bool = True,
+                             img_gray: Optional[np.ndarray] = None,
+                             img_hsv: Optional[np.ndarray] = None,
                              ) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for a single image by handcrafted color features.
@@ -73,6 +129,10 @@ def color_descriptors_single(img: np.ndarray,
         The image to extract features.
     return_feature_names : bool
         Whether to return feature names.
+    img_gray : np.ndarray, optional
+        The image in gray scale, computed when not given.
+    img_hsv : np.ndarray, optional
+        The image in HSV color, computed when not given.
 
     Returns
     -------
@@ -87,9 +147,12 @@ def color_descriptors_single(img: np.ndarray,
     img_color = img if len(img.shape) == 3 else cv.cvtColor(
         img, cv.COLOR_GRAY2BGR)
 
-    img_hsv = cv.cvtColor(img_color, cv.COLOR_BGR2HSV)
+    if img_hsv is None:
+        img_hsv = cv.cvtColor(img_color, cv.COLOR_BGR2HSV)
+    if img_gray is None:
+        img_gray = cv.cvtColor(img_color, cv.COLOR_BGR2GRAY)
     channels = {
-        'gray': cv.cvtColor(img_color, cv.COLOR_BGR2GRAY),
+        'gray': img_gray,
         'b': img_color[:, :, 0],
         'g': img_color[:, :, 1],
         'r': img_color[:, :, 2],
@@ -127,11 +190,53 @@ def color_descriptors_single(img: np.ndarray,
     return x
 
 
-def color_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+def _uint8_statistics(counts: np.ndarray,
+                      n_hist_bins: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the histogram, median and mean of uint8 values from their counts.
+
+    The statistics are exact and equal to those computed by
+    np.histogram(range=(0, 256)), np.median and np.mean on the values.
+
+    Args
+    ----
+    counts : np.ndarray, shape = (..., 256)
+        The number of occurrences of each value.
+    n_hist_bins : int
+        The number of histogram bins, a divisor of 256.
+
+    Returns
+    -------
+    hist : np.ndarray, shape = (..., n_hist_bins)
+        The histograms normalized by the number of values.
+    median : np.ndarray, shape = (...)
+        The medians.
+    mean : np.ndarray, shape = (...)
+        The means.
+    """
+
+    n_values = counts.sum(axis=-1)
+    hist = counts.reshape((*counts.shape[:-1], n_hist_bins, 256 // n_hist_bins)).sum(axis=-1)\
+        / n_values[..., None]
+    mean = (counts @ np.arange(256)) / n_values
+
+    # the k-th smallest value is the number of values whose cumulative count <= k
+    cumulative = counts.cumsum(axis=-1)
+    lower = (cumulative <= ((n_values - 1) // 2)[..., None]).sum(axis=-1)
+    upper = (cumulative <= (n_values // 2)[..., None]).sum(axis=-1)
+    median = (lower + upper) / 2
+    return hist, median, mean
+
+
+def color_descriptors(imgs: Union[ImageBatch, List[np.ndarray]]
+                      ) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for each image by handcrafted color features.
 
     The images are normalized by converting to color image.
+    The features equal those of color_descriptors_single,
+    with the histograms, medians and means of all the channels of the batch
+    derived at once from the per-channel value counts.
 
     Args
     ----
@@ -144,13 +249,45 @@ def color_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
         The extracted feature values.
     feature_names : List[str]
         The names of features.
+
+    Examples
+    --------
+    >>> %timeit color_descriptors(ImageBatch(imgs))
+
+    Throughput for 40 images of ~250 x 250 pixels on a single processor,
+    with the color conversions precomputed,
+    measured by `python -m benchmarks.image_descriptors`,
+    which also checks that the features equal the per-image features:
+
+    ====================================  ============
+    implementation                        images / s
+    ====================================  ============
+    color_descriptors_single per image    43
+    color_descriptors                     337
+    edge_descriptors_single per image     151
+    edge_descriptors                      302
+    ====================================  ============
+
+    The edge features are dominated by the Sobel filter.
     """
     # pylint: disable=invalid-name
 
-    X = np.array([color_descriptors_single(img, False) for img in imgs])
-
+    batch = to_image_batch(imgs)
     channels = ['gray', 'b', 'g', 'r', 'h', 's', 'v']
     n_hist_bins = 16
+
+    counts = np.empty((len(batch), len(channels), 256), dtype=np.int64)
+    std = np.empty((len(batch), len(channels)))
+    for i, (img_color, img_gray, img_hsv) in enumerate(zip(batch.color, batch.gray, batch.hsv)):
+        img_channels = [img_gray, *np.moveaxis(img_color, 2, 0), *np.moveaxis(img_hsv, 2, 0)]
+        for j, img_channel in enumerate(img_channels):
+            counts[i, j] = np.bincount(img_channel.ravel(), minlength=256)
+            # the std is computed by numpy as before for the same rounding
+            std[i, j] = np.std(img_channel)
+    hist, median, mean = _uint8_statistics(counts, n_hist_bins)
+    X = np.concatenate([hist, median[..., None], mean[..., None], std[..., None]],
+                       axis=-1).reshape((len(batch), len(channels) * (n_hist_bins + 3)))
+
     dims = [f'hist[{i}]' for i in range(
         n_hist_bins)] + ['median', 'mean', 'std']
     feature_names = [
@@ -214,11 +351,14 @@ def edge_descriptors_single(img: np.ndarray,
     return x
 
 
-def edge_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+def edge_descriptors(imgs: Union[ImageBatch, List[np.ndarray]]
+                     ) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for each image by handcrafted edge features.
 
     The images are normalized by converting to color image.
+    The features equal those of edge_descriptors_single,
+    with the histograms counted by np.bincount instead of np.histogram.
 
     Args
     ----
@@ -234,9 +374,26 @@ def edge_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
     """
     # pylint: disable=invalid-name
 
-    X = np.array([edge_descriptors_single(img, False) for img in imgs])
-
+    batch = to_image_batch(imgs)
     n_hist_bins = 16
+
+    counts = np.empty((len(batch), n_hist_bins), dtype=np.int64)
+    n_values = np.empty(len(batch), dtype=np.int64)
+    moments = np.empty((len(batch), 3))
+    for i, img_gray in enumerate(batch.gray):
+        img_edge = sobel(img_gray)
+        # The bin edges of np.histogram(range=(0, 1)) are multiples of 1 / n_hist_bins,
+        # thus the bin of a value on [0, 1] is exactly floor(value * n_hist_bins),
+        # with the value 1 in the last bin.
+        values = img_edge.ravel()
+        values = values[(values >= 0) & (values <= 1)]
+        bins = np.minimum((values * n_hist_bins).astype(np.intp), n_hist_bins - 1)
+        counts[i] = np.bincount(bins, minlength=n_hist_bins)
+        n_values[i] = img_edge.size
+        moments[i] = np.median(img_edge), np.mean(img_edge), np.std(img_edge)
+    hist = counts / n_values[:, None]
+    X = np.hstack([hist, moments])
+
     dims = [f'hist[{i}]' for i in range(
         n_hist_bins)] + ['median', 'mean', 'std']
     feature_names = [f'edge-{dim}' for dim in dims]
@@ -271,7 +428,8 @@ def edge_direction_descriptors_single(img: np.ndarray,
     h, w = 96, 96
     img_color = img if len(img.shape) == 3 else cv.cvtColor(
         img, cv.COLOR_GRAY2BGR)
-    img_resized = cv.resize(img_color, (h, w), interpolation=cv.INTER_AREA)
+    img_resized = img_color if img_color.shape[:2] == (h, w)\
+        else cv.resize(img_color, (h, w), interpolation=cv.INTER_AREA)
 
     # hog descriptor of size (96/6, 96/6, 1, 1, 8) and then flattened
     x = hog(img_resized, orientations=8, pixels_per_cell=(6, 6),
@@ -284,7 +442,8 @@ def edge_direction_descriptors_single(img: np.ndarray,
     return x
 
 
-def edge_direction_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+def edge_direction_descriptors(imgs: Union[ImageBatch, List[np.ndarray]]
+                               ) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for each image by handcrafted edge features.
 
@@ -305,16 +464,63 @@ def edge_direction_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]
     # pylint: disable=invalid-name
 
     X = np.array([edge_direction_descriptors_single(img, False)
-                  for img in imgs])
+                  for img in to_image_batch(imgs).color96])
+    return reduce_hog(X)
 
-    # reduce the dimension of hog features to save space
-    n_components = 50
+
+def fit_hog(X: np.ndarray) -> decomposition.TruncatedSVD:
+    """
+    Fit the SVD reducing the hog descriptors of the images.
+
+    Args
+    ----
+    X : np.ndarray
+        The hog descriptors of the images.
+
+    Returns
+    -------
+    reducer : decomposition.TruncatedSVD
+        The fitted reducer.
+    """
+    # pylint: disable=invalid-name
 
     n_samples, n_features = X.shape
-    n_components_actual = min(n_samples, n_features, n_components)
+    n_components_actual = min(n_samples, n_features, N_HOG_COMPONENTS)
+    return decomposition.TruncatedSVD(n_components=n_components_actual,
+                                      random_state=0).fit(X)
 
-    reducer = decomposition.TruncatedSVD(n_components=n_components_actual)
-    X_proj = reducer.fit_transform(X)
+
+def reduce_hog(X: np.ndarray,
+               reducer: Optional[decomposition.TruncatedSVD] = None,
+               ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the dimension of the hog descriptors of the images with SVD.
+
+    Args
+    ----
+    X : np.ndarray
+        The hog descriptors of the images.
+    reducer : decomposition.TruncatedSVD, optional
+        The reducer fitted by fit_hog, e.g., on a previous pool.
+        When None, the reducer is fitted on the given images.
+
+    Returns
+    -------
+    x : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+    # pylint: disable=invalid-name
+
+    # reduce the dimension of hog features to save space
+    n_components = N_HOG_COMPONENTS
+
+    if reducer is None:
+        reducer = fit_hog(X)
+    X_proj = reducer.transform(X)
+
+    n_samples, n_components_actual = X_proj.shape
     if n_components > n_components_actual:
         zeros = np.zeros((n_samples, n_components -
                          n_components_actual), dtype=float)
@@ -325,7 +531,10 @@ def edge_direction_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]
 
 
 def texture_descriptors_single(img: np.ndarray,
-                               return_feature_names: bool = True) -> Tuple[np.ndarray, List[str]]:
+                               return_feature_names: bool = True,
+                               gray_levels: int = 256,
+                               max_size: Optional[int] = None,
+                               ) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for a single image by handcrafted texture features.
 
@@ -337,6 +546,15 @@ def texture_descriptors_single(img: np.ndarray,
         The image to extract features.
     return_feature_names : bool
         Whether to return feature names.
+    gray_levels : int, optional (default=256)
+        The number of gray levels of the co-occurrence matrix,
+        a power of 2 dividing 256.
+        The contrast and dissimilarity are rescaled to 256 levels.
+    max_size : int, optional (default=None)
+        The maximum side length of the image for the local binary pattern
+        and local entropy. Larger images are downscaled,
+        and the histogram counts are rescaled to the original image size.
+        When None, the full image is used.
 
     Returns
     -------
@@ -351,20 +569,36 @@ def texture_descriptors_single(img: np.ndarray,
     img_gray = img if len(img.shape) == 2 else cv.cvtColor(
         img, cv.COLOR_BGR2GRAY)
 
+    # the gray image for the local descriptors,
+    # downscaled when larger than max_size
+    h, w = img_gray.shape
+    img_local = img_gray
+    if max_size is not None and max(h, w) > max_size:
+        scale = max_size / max(h, w)
+        img_local = cv.resize(img_gray, (max(round(w * scale), 1), max(round(h * scale), 1)),
+                              interpolation=cv.INTER_AREA)
+    count_scale = (h * w) / img_local.size
+
     # local binary pattern
     radius = 3
     n_points = 8 * radius
     img_lbp = local_binary_pattern(
-        img_gray, n_points, radius, method='uniform')
+        img_local, n_points, radius, method='uniform')
     lbp_hist, _ = np.histogram(img_lbp, bins=n_points+1, range=(0, n_points+1))
+    if count_scale != 1:
+        lbp_hist = lbp_hist * count_scale
 
     # grey level co-occurrence matrix
     distances = [1, 2]
     angles = [0, np.pi/4, np.pi/2, 3*np.pi/4]
-    glcm = greycomatrix(img_gray, distances, angles,
-                        256, symmetric=True, normed=True)
-    contrast = greycoprops(glcm, 'contrast').reshape(-1)
-    dissimilarity = greycoprops(glcm, 'dissimilarity').reshape(-1)
+    level_scale = 256 // gray_levels
+    img_quantized = img_gray if level_scale == 1\
+        else img_gray >> int(np.log2(level_scale))
+    glcm = greycomatrix(img_quantized, distances, angles,
+                        gray_levels, symmetric=True, normed=True)
+    contrast = greycoprops(glcm, 'contrast').reshape(-1) * level_scale ** 2
+    dissimilarity = greycoprops(
+        glcm, 'dissimilarity').reshape(-1) * level_scale
     homogeneity = greycoprops(glcm, 'homogeneity').reshape(-1)
     energy = greycoprops(glcm, 'energy').reshape(-1)
     correlation = greycoprops(glcm, 'correlation').reshape(-1)
@@ -375,11 +609,13 @@ def texture_descriptors_single(img: np.ndarray,
     # local entropy
     n_hist_bins = 20
     mask = disk(7)
-    local_entropy = entropy(img_gray, mask)
+    local_entropy = entropy(img_local, mask)
     # for images with value range [0, 255], the maximum local entropy is 8
     entropy_upper_bound = 8
     local_entropy_hist, _ = np.histogram(
         local_entropy, bins=n_hist_bins, range=(0, entropy_upper_bound))
+    if count_scale != 1:
+        local_entropy_hist = local_entropy_hist * count_scale
 
     x = [*lbp_hist, *contrast, *dissimilarity, *homogeneity, *
          energy, *correlation, global_entropy, *local_entropy_hist]
@@ -397,7 +633,10 @@ def texture_descriptors_single(img: np.ndarray,
     return x
 
 
-def texture_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+def texture_descriptors(imgs: Union[ImageBatch, List[np.ndarray]],
+                        gray_levels: int = 256,
+                        max_size: Optional[int] = None,
+                        ) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for each image by handcrafted edge features.
 
@@ -407,6 +646,11 @@ def texture_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
     ----
     img : np.ndarray
         The image to extract features.
+    gray_levels : int, optional (default=256)
+        The number of gray levels of the co-occurrence matrix.
+    max_size : int, optional (default=None)
+        The maximum side length of the image for the local binary pattern
+        and local entropy.
 
     Returns
     -------
@@ -414,10 +658,45 @@ def texture_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
         The extracted feature values.
     feature_names : List[str]
         The names of features.
+
+    Examples
+    --------
+    >>> %timeit texture_descriptors(imgs)
+    >>> %timeit texture_descriptors(imgs, TEXTURE_GRAY_LEVELS, TEXTURE_MAX_SIZE)
+
+    Time per image on a single processor for 24 crops of the photos of
+    skimage.data resized to the given size, and the accuracy of the fast mode
+    against the exact mode: the median over the columns of each group of
+    the correlation across the images, and the Spearman correlation of
+    the pairwise distances of the images on the standardized features,
+    measured with `python -m benchmarks.texture_descriptors`:
+
+    ======  =============  ==========  ========  =========  ======  =======  ===========
+    size    gray_levels    max_size    time      lbp        glcm    local    distances
+    ======  =============  ==========  ========  =========  ======  =======  ===========
+    512     256            None        551 ms    (exact)
+    512     32             None        548 ms    1.00       1.00    1.00     0.97
+    1024    256            None        1.96 s    (exact)
+    1024    32             None        1.85 s    1.00       1.00    1.00     0.98
+    1024    256            512         577 ms    0.79       1.00    0.87     0.96
+    2048    256            None        6.44 s    (exact)
+    2048    32             None        6.38 s    1.00       0.98    1.00     0.98
+    2048    256            512         727 ms    0.42       1.00    0.59     0.93
+    2048    256            1024        1.97 s    0.83       1.00    0.86     0.98
+    ======  =============  ==========  ========  =========  ======  =======  ===========
+
+    The quantization of the gray levels saves no time, thus is off by default.
+    The downscaling bounds the time of the local descriptors at the cost of
+    their accuracy: the local binary pattern and local entropy are computed
+    at a coarser scale, and their histograms drift from the exact ones
+    the more the image is downscaled (0.42 for the local binary pattern
+    of 2048 pixel images downscaled to 512, 0.83 downscaled to 1024).
+    The images up to TEXTURE_MAX_SIZE get the exact features.
     """
     # pylint: disable=invalid-name
 
-    X = np.array([texture_descriptors_single(img, False) for img in imgs])
+    X = np.array([texture_descriptors_single(img, False, gray_levels, max_size)
+                  for img in to_image_batch(imgs).gray])
 
     feature_names = [f'texture-lbp[{i}]' for i in range(25)]\
         + [f'texture-contrast[{i}]' for i in range(8)]\
@@ -430,44 +709,240 @@ def texture_descriptors(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
     return X, feature_names
 
 
-def extract_features(data_objects: List[DataObject]
-                     ) -> Tuple[List[List[float]], List[str]]:
+def describe_images(imgs: List[np.ndarray],
+                    texture_gray_levels: int = 256,
+                    texture_max_size: Optional[int] = None,
+                    ) -> Dict[str, np.ndarray]:
+    """
+    Compute the per-image descriptors, which don't depend on the other images.
+    The normalized images (gray, HSV, 8 x 8 gray, 96 x 96 color)
+    are computed once and shared by the extractors.
+
+    Args
+    ----
+    imgs : np.ndarray
+        The images to extract features.
+    texture_gray_levels : int, optional (default=256)
+        The number of gray levels of the co-occurrence matrix.
+    texture_max_size : int, optional (default=None)
+        The maximum side length of the image for the local texture descriptors.
+
+    Returns
+    -------
+    descriptors : Dict[str, np.ndarray]
+        The descriptors of the images stacked by name,
+        i.e., 'raw', 'color', 'edge', 'hog' and 'texture'.
+    """
+
+    batch = ImageBatch(imgs)
+    return {
+        'raw': raw_flatten(batch)[0],
+        'color': color_descriptors(batch)[0],
+        'edge': edge_descriptors(batch)[0],
+        'hog': np.array([edge_direction_descriptors_single(img, False)
+                         for img in batch.color96]),
+        'texture': texture_descriptors(batch, texture_gray_levels, texture_max_size)[0],
+    }
+
+
+def describe_data_objects(data_objects: List[DataObject],
+                          texture_gray_levels: int = 256,
+                          texture_max_size: Optional[int] = None,
+                          ) -> Dict[str, np.ndarray]:
+    """
+    Decode the images and compute the per-image descriptors.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+    texture_gray_levels : int, optional (default=256)
+        The number of gray levels of the co-occurrence matrix.
+    texture_max_size : int, optional (default=None)
+        The maximum side length of the image for the local texture descriptors.
+
+    Returns
+    -------
+    descriptors : Dict[str, np.ndarray]
+        The descriptors of the images stacked by name.
+    """
+
     imgs = [get_image(data_object) for data_object in data_objects]
+    return describe_images(imgs, texture_gray_levels, texture_max_size)
+
+
+def get_descriptors(data_objects: List[DataObject]) -> Dict[str, np.ndarray]:
+    """
+    Get the per-image descriptors from the cache,
+    and only decode and describe the images not cached.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+
+    Returns
+    -------
+    descriptors : Dict[str, np.ndarray]
+        The descriptors of the images stacked by name.
+    """
+
+    # The texture parameters are passed to the workers explicitly,
+    # as the spawned workers don't see changes to the module constants.
+    if TEXTURE_MODE == 'fast':
+        describe = partial(describe_data_objects,
+                           texture_gray_levels=TEXTURE_GRAY_LEVELS,
+                           texture_max_size=TEXTURE_MAX_SIZE)
+        namespace = f'{DESCRIPTOR_VERSION}-texture-{TEXTURE_GRAY_LEVELS}-{TEXTURE_MAX_SIZE}'
+    else:
+        describe = describe_data_objects
+        namespace = DESCRIPTOR_VERSION
+    keys = [get_image_key(d, namespace) for d in data_objects]
+    descriptors = [DESCRIPTOR_CACHE.get(key) for key in keys]
+
+    missing = [i for i, d in enumerate(descriptors) if d is None]
+    if len(missing) != 0:
+        batch = parallel_describe(describe, [data_objects[i] for i in missing])
+        for j, i in enumerate(missing):
+            # copy the rows such that the cached values don't hold the batch
+            descriptors[i] = {name: values[j].copy()
+                              for name, values in batch.items()}
+            DESCRIPTOR_CACHE.put(keys[i], descriptors[i])
+
+    return {name: np.array([d[name] for d in descriptors])
+            for name in descriptors[0]}
+
+
+def fit_reducer(data_objects: List[DataObject]) -> Dict[str, decomposition.TruncatedSVD]:
+    """
+    Fit the dataset-level reducers on the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+
+    Returns
+    -------
+    reducer : Dict[str, decomposition.TruncatedSVD]
+        The reducers of the 'raw' and 'hog' descriptors.
+    """
+
+    descriptors = get_descriptors(data_objects)
+    return {
+        'raw': fit_SVD(descriptors['raw']),
+        'hog': fit_hog(descriptors['hog']),
+    }
+
 
-    extractors = [
-        raw_flatten,
-        resize_SVD,
-        color_descriptors,
-        edge_descriptors,
-        edge_direction_descriptors,
-        texture_descriptors,
-    ]
+def assemble_features(descriptors: Dict[str, np.ndarray],
+                      reducer: Optional[Dict[str, decomposition.TruncatedSVD]] = None,
+                      ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the dataset-level descriptors and assemble the features.
 
-    X = None
-    feature_names = []
-    for extractor in extractors:
-        X_tmp, feature_names_tmp = extractor(imgs)
-        X = np.hstack((X, X_tmp)) if X is not None else X_tmp
-        feature_names = feature_names + feature_names_tmp\
-            if feature_names is not None else feature_names_tmp
-    return X.tolist(), feature_names
+    Args
+    ----
+    descriptors : Dict[str, np.ndarray]
+        The per-image descriptors of all the images stacked by name.
+    reducer : Dict[str, decomposition.TruncatedSVD], optional
+        The reducers fitted by fit_reducer, e.g., on a previous pool.
+        When None, the reducers are fitted on the given descriptors.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+    # pylint: disable=invalid-name
+
+    h, w = 8, 8
+    X_raw = descriptors['raw']
+    if reducer is None:
+        reducer = {'raw': None, 'hog': None}
+    X_svd, feature_names_svd = reduce_SVD(X_raw, reducer['raw'])
+    X_hog, feature_names_hog = reduce_hog(descriptors['hog'], reducer['hog'])
+
+    X = np.hstack((
+        X_raw,
+        X_svd,
+        descriptors['color'],
+        descriptors['edge'],
+        X_hog,
+        descriptors['texture'],
+    ))
+    feature_names = [f'raw[{i}][{j}]' for i in range(h) for j in range(w)]\
+        + feature_names_svd\
+        + color_descriptors([])[1]\
+        + edge_descriptors([])[1]\
+        + feature_names_hog\
+        + texture_descriptors([])[1]
+    return X, feature_names
 
 
-class Handler(RequestHandler):
+def extract_features(data_objects: List[DataObject],
+                     reducer: Optional[Dict[str, decomposition.TruncatedSVD]] = None,
+                     ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Extract the bag of words features of the images of the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+    reducer : Dict[str, decomposition.TruncatedSVD], optional
+        The reducers fitted by fit_reducer.
+        When None, the reducers are fitted on the given images.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+
+    return assemble_features(get_descriptors(data_objects), reducer)
+
+
+class Handler(CorsRequestHandler):
     """
     The handler for feature extraction - image bag of words.
+    With 'reducerId', the SVD of the raw pixels and hog descriptors
+    are fitted once and persisted, and refitted by the '/refit' endpoint.
     """
 
-    def post(self):
+    def initialize(self, refit: bool = False):
+        """Configure the route to refit the persisted reducer."""
+        self.refit = refit
+
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # process input: (dataObjects)
+        # process input: (dataObjects, reducerId?)
         data_objects: List[DataObject] = json_data['dataObjects']
+        reducer_id: Optional[str] = json_data.get('reducerId')
+        if self.refit and reducer_id is None:
+            self.send_error(400)
+            return
+
+        reducer = await get_reducer(self.request.path, reducer_id, self.refit,
+                                    fit_reducer, data_objects,
+                                    max_samples=FIT_MAX_SAMPLES)
+
+        if accepts_ndjson(self.request):
+            await stream_features(self, data_objects, get_descriptors,
+                                  partial(assemble_features, reducer=reducer),
+                                  reduce_chunks=reducer is not None)
+            return
 
-        features, feature_names = extract_features(data_objects)
+        features, feature_names = await run_in_executor(
+            self.request.path, extract_features, data_objects, reducer)
 
-        self.write({
+        write_body(self, {
             'features': features,
             'featureNames': feature_names,
         })
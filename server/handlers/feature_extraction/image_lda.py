@@ -1,15 +1,13 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from typing import List, Tuple
-import json
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union
 
-import cv2 as cv
 import numpy as np
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 from sklearn.preprocessing import LabelEncoder
 from sklearn.random_projection import GaussianRandomProjection
-from tornado.web import RequestHandler
 
 from ..types import (
     DataObject,
@@ -17,10 +15,26 @@ from ..types import (
     Status,
     StatusType,
 )
-from .utils import get_image
+from ..utils.executor import run_in_executor
+from ..utils.streaming import accepts_ndjson, stream_features
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
+from .utils import (
+    ImageBatch,
+    describe_thumbnails,
+    get_labels_key,
+    get_reducer,
+    to_image_batch,
+)
+
+
+# pylint: disable=pointless-string-statement
+"""
+The number of dimensions of the features.
+"""
+N_COMPONENTS = 5
 
 
-def resize_LDA(imgs: np.ndarray,
+def resize_LDA(imgs: Union[ImageBatch, List[np.ndarray]],
                labels: np.ndarray,
                statuses: np.ndarray) -> Tuple[np.ndarray, List[str]]:
     """
@@ -53,17 +67,36 @@ def resize_LDA(imgs: np.ndarray,
 
     # normalized the images to gray scale 8 x 8
     h, w = 8, 8
-    X_raw_normalized = []
-    for img in imgs:
-        img_gray = img if len(img.shape) == 2 else cv.cvtColor(
-            img, cv.COLOR_BGR2GRAY)
-        img_resized = cv.resize(img_gray, (h, w), interpolation=cv.INTER_AREA)
-        X_raw_normalized.append(img_resized)
-    X_raw_normalized = np.array(X_raw_normalized)
+    X_raw_normalized = to_image_batch(imgs).gray8
 
     X_flatten = X_raw_normalized.reshape((-1, h * w))
+    return reduce_LDA(X_flatten, labels, statuses)
+
+
+def fit_LDA(X_flatten: np.ndarray,
+            labels: np.ndarray,
+            statuses: np.ndarray) -> Union[LinearDiscriminantAnalysis, GaussianRandomProjection]:
+    """
+    Fit the LDA reducing the flattened normalized images on the labeled images.
+    When at most one image is labeled, a random projection is used instead.
+
+    Args
+    ----
+    X_flatten : np.ndarray, shape = (n_samples, 64)
+        The flattened gray scale 8 x 8 images.
+    labels : np.ndarray
+        The partial labels.
+    statuses : np.ndarray
+        The label statuses.
 
-    n_components = 5
+    Returns
+    -------
+    reducer : Union[LinearDiscriminantAnalysis, GaussianRandomProjection]
+        The fitted reducer.
+    """
+    # pylint: disable=invalid-name
+
+    n_components = N_COMPONENTS
 
     mask_labeled = np.array([status == StatusType.Labeled
                             for status in statuses])
@@ -74,19 +107,54 @@ def resize_LDA(imgs: np.ndarray,
     labels_labeled = LabelEncoder().fit(categories).transform(labels_labeled)
 
     if len(labels_labeled) <= 1:
-        n_components_actual = n_components
-        reducer = GaussianRandomProjection(n_components=n_components_actual)
-        X = reducer.fit_transform(X_flatten)
-    else:
-        n_samples, n_features = X_flatten.shape
-        n_categories = len(np.unique(labels_labeled))
-        n_components_actual = min(n_samples, n_features,
-                                  n_categories - 1, n_components)
-        reducer = LinearDiscriminantAnalysis(n_components=n_components_actual)
-
-        reducer.fit(X_labeled, labels_labeled)
-        X = reducer.transform(X_flatten)
+        reducer = GaussianRandomProjection(n_components=n_components,
+                                           random_state=0)
+        return reducer.fit(X_flatten)
+
+    n_samples, n_features = X_flatten.shape
+    n_categories = len(np.unique(labels_labeled))
+    n_components_actual = min(n_samples, n_features,
+                              n_categories - 1, n_components)
+    reducer = LinearDiscriminantAnalysis(n_components=n_components_actual)
+    return reducer.fit(X_labeled, labels_labeled)
 
+
+def reduce_LDA(X_flatten: np.ndarray,
+               labels: np.ndarray,
+               statuses: np.ndarray,
+               reducer: Union[LinearDiscriminantAnalysis, GaussianRandomProjection, None] = None,
+               ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the dimension of the flattened normalized images with LDA.
+
+    Args
+    ----
+    X_flatten : np.ndarray, shape = (n_samples, 64)
+        The flattened gray scale 8 x 8 images.
+    labels : np.ndarray
+        The partial labels.
+    statuses : np.ndarray
+        The label statuses.
+    reducer : Union[LinearDiscriminantAnalysis, GaussianRandomProjection], optional
+        The reducer fitted by fit_LDA, e.g., on a previous pool.
+        When None, the reducer is fitted on the given images and labels.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+    # pylint: disable=invalid-name
+
+    n_components = N_COMPONENTS
+
+    if reducer is None:
+        reducer = fit_LDA(X_flatten, labels, statuses)
+    X = reducer.transform(X_flatten)
+
+    n_samples, n_components_actual = X.shape
     if n_components > n_components_actual:
         zeros = np.zeros((n_samples, n_components -
                          n_components_actual), dtype=float)
@@ -96,35 +164,146 @@ def resize_LDA(imgs: np.ndarray,
     return X, feature_names
 
 
+def fit_reducer(data_objects: List[DataObject],
+                labels: np.ndarray,
+                statuses: np.ndarray,
+                ) -> Union[LinearDiscriminantAnalysis, GaussianRandomProjection]:
+    """
+    Fit the LDA on the flattened normalized images of the data objects.
+    Only the labeled images are decoded, as the LDA is fitted on them,
+    and the random projection standing in for it only needs one image.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+    labels : np.ndarray
+        The partial labels.
+    statuses : np.ndarray
+        The label statuses.
+
+    Returns
+    -------
+    reducer : Union[LinearDiscriminantAnalysis, GaussianRandomProjection]
+        The fitted reducer, see fit_LDA.
+    """
+
+    fitted = np.flatnonzero(statuses == StatusType.Labeled)
+    if len(fitted) <= 1:
+        fitted = np.arange(min(1, len(data_objects)))
+    return fit_LDA(describe_thumbnails([data_objects[i] for i in fitted])['raw'],
+                   labels[fitted], statuses[fitted])
+
+
+def reduce_descriptors(descriptors: Dict[str, np.ndarray],
+                       labels: np.ndarray,
+                       statuses: np.ndarray,
+                       reducer: Union[LinearDiscriminantAnalysis,
+                                      GaussianRandomProjection, None] = None,
+                       ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the per-image descriptors of the data objects with LDA.
+
+    Args
+    ----
+    descriptors : Dict[str, np.ndarray]
+        The descriptors computed by describe_thumbnails.
+    labels : np.ndarray
+        The partial labels.
+    statuses : np.ndarray
+        The label statuses.
+    reducer : Union[LinearDiscriminantAnalysis, GaussianRandomProjection], optional
+        The reducer fitted by fit_reducer.
+        When None, the reducer is fitted on the given images and labels.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+
+    return reduce_LDA(descriptors['raw'], labels, statuses, reducer)
+
+
 def extract_features(data_objects: List[DataObject],
                      labels: np.ndarray,
                      statuses: np.ndarray,
-                     ) -> Tuple[List[List[float]], List[str]]:
-    imgs = [get_image(data_object) for data_object in data_objects]
-    X, feature_names = resize_LDA(imgs, labels, statuses)
-    return X.tolist(), feature_names
+                     reducer: Union[LinearDiscriminantAnalysis,
+                                    GaussianRandomProjection, None] = None,
+                     ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Extract the LDA features of the images of the data objects.
 
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+    labels : np.ndarray
+        The partial labels.
+    statuses : np.ndarray
+        The label statuses.
+    reducer : Union[LinearDiscriminantAnalysis, GaussianRandomProjection], optional
+        The reducer fitted by fit_reducer.
+        When None, the reducer is fitted on the given images and labels.
 
-class Handler(RequestHandler):
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+
+    return reduce_descriptors(describe_thumbnails(data_objects), labels, statuses, reducer)
+
+
+class Handler(CorsRequestHandler):
     """
     The handler for feature extraction - image LDA.
+    With 'reducerId', the LDA is persisted with the labels it is fitted on,
+    and refitted when the labels change or by the '/refit' endpoint.
     """
 
-    def post(self):
+    def initialize(self, refit: bool = False):
+        """Configure the route to refit the persisted reducer."""
+        self.refit = refit
+
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # process input: (dataObjects)
+        # process input: (dataObjects, labels, statuses, reducerId?)
         data_objects: List[DataObject] = json_data['dataObjects']
         labels: List[Label] = json_data['labels'] if 'labels' in json_data else None
         statuses: List[Status] = json_data['statuses'] if 'statuses' in json_data else None
+        reducer_id: Optional[str] = json_data.get('reducerId')
+        if self.refit and reducer_id is None:
+            self.send_error(400)
+            return
 
         labels = np.array([d['category'] for d in labels], dtype=str)
         statuses = np.array([d['value'] for d in statuses], dtype=str)
-        features, feature_names = extract_features(
-            data_objects, labels, statuses)
 
-        self.write({
+        reducer = await get_reducer(self.request.path, reducer_id, self.refit,
+                                    partial(fit_reducer, labels=labels, statuses=statuses),
+                                    data_objects,
+                                    get_labels_key(data_objects, labels, statuses))
+
+        if accepts_ndjson(self.request):
+            # the labels are only used for fitting, not by a fixed reducer
+            await stream_features(self, data_objects, describe_thumbnails,
+                                  partial(reduce_descriptors, labels=labels,
+                                          statuses=statuses, reducer=reducer),
+                                  reduce_chunks=reducer is not None)
+            return
+
+        features, feature_names = await run_in_executor(
+            self.request.path, extract_features,
+            data_objects, labels, statuses, reducer)
+
+        write_body(self, {
             'features': features,
             'featureNames': feature_names,
         })
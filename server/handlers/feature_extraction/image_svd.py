@@ -1,37 +1,123 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from typing import List, Tuple
-import json
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
-from tornado.web import RequestHandler
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
 
 from ..types import DataObject
-from .utils import get_image, resize_SVD
+from ..utils.executor import run_in_executor
+from ..utils.streaming import accepts_ndjson, stream_features
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
+from .utils import FIT_MAX_SAMPLES, describe_thumbnails, fit_SVD, get_reducer, reduce_SVD
 
 
-def extract_features(data_objects: List[DataObject]
-                     ) -> Tuple[List[List[float]], List[str]]:
-    imgs = [get_image(data_object) for data_object in data_objects]
-    X, feature_names = resize_SVD(imgs)
-    return X.tolist(), feature_names
+def fit_reducer(data_objects: List[DataObject]) -> TruncatedSVD:
+    """
+    Fit the SVD on the flattened normalized images of the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+
+    Returns
+    -------
+    reducer : TruncatedSVD
+        The fitted reducer.
+    """
+
+    return fit_SVD(describe_thumbnails(data_objects)['raw'])
+
+
+def reduce_descriptors(descriptors: Dict[str, np.ndarray],
+                       reducer: Optional[TruncatedSVD] = None,
+                       ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the per-image descriptors of the data objects with SVD.
+
+    Args
+    ----
+    descriptors : Dict[str, np.ndarray]
+        The descriptors computed by describe_thumbnails.
+    reducer : TruncatedSVD, optional
+        The reducer fitted by fit_reducer.
+        When None, the reducer is fitted on the given images.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
 
+    return reduce_SVD(descriptors['raw'], reducer)
 
-class Handler(RequestHandler):
+
+def extract_features(data_objects: List[DataObject],
+                     reducer: Optional[TruncatedSVD] = None,
+                     ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Extract the SVD features of the images of the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with images as content.
+    reducer : TruncatedSVD, optional
+        The reducer fitted by fit_reducer.
+        When None, the reducer is fitted on the given images.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+
+    return reduce_descriptors(describe_thumbnails(data_objects), reducer)
+
+
+class Handler(CorsRequestHandler):
     """
     The handler for feature extraction - image SVD.
+    With 'reducerId', the SVD is fitted once and persisted,
+    and refitted by the '/refit' endpoint.
     """
 
-    def post(self):
+    def initialize(self, refit: bool = False):
+        """Configure the route to refit the persisted reducer."""
+        self.refit = refit
+
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # process input: (dataObjects)
+        # process input: (dataObjects, reducerId?)
         data_objects: List[DataObject] = json_data['dataObjects']
+        reducer_id: Optional[str] = json_data.get('reducerId')
+        if self.refit and reducer_id is None:
+            self.send_error(400)
+            return
+
+        reducer = await get_reducer(self.request.path, reducer_id, self.refit,
+                                    fit_reducer, data_objects,
+                                    max_samples=FIT_MAX_SAMPLES)
+
+        if accepts_ndjson(self.request):
+            await stream_features(self, data_objects, describe_thumbnails,
+                                  partial(reduce_descriptors, reducer=reducer),
+                                  reduce_chunks=reducer is not None)
+            return
 
-        features, feature_names = extract_features(data_objects)
+        features, feature_names = await run_in_executor(
+            self.request.path, extract_features, data_objects, reducer)
 
-        self.write({
+        write_body(self, {
             'features': features,
             'featureNames': feature_names,
         })
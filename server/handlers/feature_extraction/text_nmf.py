@@ -1,50 +1,197 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from typing import List, Tuple
-import json
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
-from tornado.web import RequestHandler
+import numpy as np
 from sklearn.decomposition import NMF
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 from ..types import DataObject
+from ..utils.executor import run_in_executor
+from ..utils.streaming import accepts_ndjson, stream_features
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
+from .utils import OnlineNMF, get_reducer, update_reducer
 
 
-def extract_features(data_objects: List[DataObject],
-                     ) -> Tuple[List[List[float]], List[str]]:
-    X = [data_object['content'] for data_object in data_objects]
+# pylint: disable=pointless-string-statement
+"""
+The number of dimensions of the features.
+"""
+N_COMPONENTS = 20
+
+
+def describe_data_objects(data_objects: List[DataObject]) -> Dict[str, np.ndarray]:
+    """
+    Collect the texts of the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with texts as content.
+
+    Returns
+    -------
+    descriptors : Dict[str, np.ndarray]
+        The texts by the name 'content'.
+    """
+
+    return {'content': np.array([data_object['content'] for data_object in data_objects],
+                                dtype=object)}
+
+
+def fit_reducer(data_objects: List[DataObject]) -> OnlineNMF:
+    """
+    Fit the online NMF on the texts of the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with texts as content.
+
+    Returns
+    -------
+    reducer : OnlineNMF
+        The fitted reducer.
+    """
+
+    return OnlineNMF(N_COMPONENTS).fit(describe_data_objects(data_objects)['content'])
+
+
+def partial_fit_reducer(reducer: Optional[OnlineNMF],
+                        data_objects: List[DataObject]) -> OnlineNMF:
+    """
+    Update the online NMF with the texts of appended data objects.
+
+    Args
+    ----
+    reducer : OnlineNMF, optional
+        The reducer to update. When None, a new reducer is fitted.
+    data_objects : List[DataObject]
+        The appended data objects with texts as content.
+
+    Returns
+    -------
+    reducer : OnlineNMF
+        The updated reducer.
+    """
+
+    if reducer is None:
+        reducer = OnlineNMF(N_COMPONENTS)
+    return reducer.partial_fit(describe_data_objects(data_objects)['content'])
+
+
+def reduce_descriptors(descriptors: Dict[str, np.ndarray],
+                       reducer: Optional[OnlineNMF] = None,
+                       ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the texts of the data objects with NMF.
+
+    Args
+    ----
+    descriptors : Dict[str, np.ndarray]
+        The texts collected by describe_data_objects.
+    reducer : OnlineNMF, optional
+        The reducer fitted by fit_reducer.
+        When None, an NMF of the tf-idf features is fitted on the given texts.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+    # pylint: disable=invalid-name
+
+    feature_names = [f'NMF[{i}]' for i in range(N_COMPONENTS)]
+    if reducer is not None:
+        return reducer.transform(descriptors['content']), feature_names
+
+    X = list(descriptors['content'])
     tfidf_vectorizer = TfidfVectorizer(max_df=0.95,
                                        min_df=2,
                                        max_features=5000,
                                        stop_words='english')
     X_tfidf = tfidf_vectorizer.fit_transform(X)
-    n_components = 20
-    nmf = NMF(n_components=n_components,
+    nmf = NMF(n_components=N_COMPONENTS,
               init='random',
               random_state=0,
               alpha=.1,
               l1_ratio=.5)
     X_nmf = nmf.fit_transform(X_tfidf)
-    feature_names = [f'NMF[{i}]' for i in range(n_components)]
-    return X_nmf.tolist(), feature_names
+    return X_nmf, feature_names
+
 
+def extract_features(data_objects: List[DataObject],
+                     reducer: Optional[OnlineNMF] = None,
+                     ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Extract the NMF features of the texts of the data objects.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with texts as content.
+    reducer : OnlineNMF, optional
+        The reducer fitted by fit_reducer.
+        When None, an NMF of the tf-idf features is fitted on the given texts.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
 
-class Handler(RequestHandler):
+    return reduce_descriptors(describe_data_objects(data_objects), reducer)
+
+
+class Handler(CorsRequestHandler):
     """
     The handler for feature extraction - text NMF.
+    With 'reducerId', an online NMF of hashed tf-idf features is fitted once
+    and persisted, refitted by the '/refit' endpoint,
+    and updated with appended data objects by the '/append' endpoint.
     """
 
-    def post(self):
+    def initialize(self, refit: bool = False, append: bool = False):
+        """Configure the route to refit or append to the persisted reducer."""
+        self.refit = refit
+        self.append = append
+
+    async def post(self):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
-        # process input: (dataObjects)
+        # process input: (dataObjects, reducerId?)
         data_objects: List[DataObject] = json_data['dataObjects']
+        reducer_id: Optional[str] = json_data.get('reducerId')
+        if (self.refit or self.append) and reducer_id is None:
+            self.send_error(400)
+            return
+
+        if self.append:
+            reducer = await update_reducer(self.request.path, reducer_id,
+                                           partial_fit_reducer, data_objects)
+        else:
+            reducer = await get_reducer(self.request.path, reducer_id, self.refit,
+                                        fit_reducer, data_objects)
+
+        if accepts_ndjson(self.request):
+            # with a fixed reducer, the texts of each chunk
+            # are vectorized and encoded in the job describing the chunk
+            await stream_features(self, data_objects, describe_data_objects,
+                                  partial(reduce_descriptors, reducer=reducer),
+                                  reduce_chunks=reducer is not None)
+            return
 
-        features, feature_names = extract_features(data_objects)
+        features, feature_names = await run_in_executor(
+            self.request.path, extract_features, data_objects, reducer)
 
-        self.write({
+        write_body(self, {
             'features': features,
             'featureNames': feature_names,
         })
@@ -1,10 +1,31 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from .get_image import get_image
-from .resize_SVD import resize_SVD
+from .descriptor_cache import DescriptorCache, get_image_key
+from .get_image import THUMBNAIL_MIN_SIZE, get_image, get_image_size
+from .image_batch import ImageBatch, describe_thumbnails, to_image_batch
+from .online_nmf import OnlineNMF
+from .parallel_describe import parallel_describe, shutdown_pool
+from .persisted_reducer import FIT_MAX_SAMPLES, get_labels_key, get_reducer, update_reducer
+from .resize_SVD import fit_SVD, reduce_SVD, resize_SVD
 
 __all__ = [
+    "FIT_MAX_SAMPLES",
+    "THUMBNAIL_MIN_SIZE",
+    "DescriptorCache",
+    "describe_thumbnails",
+    "fit_SVD",
     "get_image",
+    "get_image_size",
+    "get_image_key",
+    "get_labels_key",
+    "get_reducer",
+    "ImageBatch",
+    "OnlineNMF",
+    "parallel_describe",
+    "reduce_SVD",
     "resize_SVD",
+    "shutdown_pool",
+    "to_image_batch",
+    "update_reducer",
 ]
@@ -0,0 +1,205 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+A two-tier cache of per-image descriptors keyed by the image content.
+
+The memory tier is a size-bounded LRU cache private to each process.
+The disk tier stores one .npz file per image in a directory
+shared by the worker processes, and evicts the least recently used files
+when the directory grows beyond its size budget.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from ...types import DataObject
+from ...utils.blob_store import FILE_PREFIX, get_content_path
+from ...utils.data_persistence.lru_cache import LRUCache
+
+
+# pylint: disable=pointless-string-statement
+"""
+The maximum number of bytes of descriptors kept in memory by each process.
+"""
+MEMORY_MAX_BYTES = 256 << 20
+
+"""
+The directory of the disk tier. When None, the disk tier is disabled.
+"""
+DISK_DIR: Optional[str] = os.path.join(tempfile.gettempdir(),
+                                       'onelabeler-descriptor-cache')
+
+"""
+The maximum number of bytes of descriptors stored on disk.
+When exceeded, the least recently used files are removed
+until DISK_LOW_WATERMARK of the budget is used.
+"""
+DISK_MAX_BYTES = 4 << 30
+DISK_LOW_WATERMARK = 0.9
+
+
+def get_image_key(data_object: DataObject, namespace: str = '') -> str:
+    """
+    Compute the cache key of an image from its encoded content.
+
+    Args
+    ----
+    data_object : DataObject
+        The data object with the image data url,
+        or the reference to a blob or file, as content.
+    namespace : str, optional
+        The name distinguishing descriptors computed differently,
+        e.g., the extractor version and parameters.
+
+    Returns
+    -------
+    key : str
+        The hex digest of the namespace and the image content.
+        Blobs are identified by their id, which is the hash of their content,
+        and files by their path, size and modification time.
+    """
+
+    content: str = data_object['content']
+    payload = content.split('base64,', 1)[-1]
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(namespace.encode())
+    hasher.update(payload.encode())
+    if content.startswith(FILE_PREFIX):
+        stat = os.stat(get_content_path(content))
+        hasher.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return hasher.hexdigest()
+
+
+class DescriptorCache():
+    """
+    The cache mapping an image key to the named descriptors of the image.
+    """
+
+    def __init__(self,
+                 memory_max_bytes: int = MEMORY_MAX_BYTES,
+                 disk_dir: Optional[str] = DISK_DIR,
+                 disk_max_bytes: int = DISK_MAX_BYTES):
+        self.memory = LRUCache(memory_max_bytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_hits = 0
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Get the descriptors of an image.
+
+        Args
+        ----
+        key : str
+            The image key.
+
+        Returns
+        -------
+        descriptors : Dict[str, np.ndarray], optional
+            The descriptors by name, None when not cached.
+        """
+
+        try:
+            return self.memory.get(key)
+        except KeyError:
+            pass
+        if self.disk_dir is None:
+            return None
+
+        path = self._get_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as file:
+                descriptors = {name: file[name] for name in file.files}
+            # refresh the modification time used for the eviction order
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        self.memory.put(key, descriptors)
+        return descriptors
+
+    def put(self, key: str, descriptors: Dict[str, np.ndarray]) -> None:
+        """
+        Put the descriptors of an image in both tiers.
+
+        Args
+        ----
+        key : str
+            The image key.
+        descriptors : Dict[str, np.ndarray]
+            The descriptors by name.
+        """
+
+        self.memory.put(key, descriptors)
+        if self.disk_dir is None:
+            return
+
+        path = self._get_path(key)
+        # write to a temporary file and rename,
+        # such that other processes never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            np.savez(file, **descriptors)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += os.path.getsize(path)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def info(self) -> dict:
+        """
+        Get the statistics of the cache.
+
+        Returns
+        -------
+        info : dict
+            The statistics of the memory tier and the number of disk hits.
+        """
+
+        return {**self.memory.info(), 'diskHits': self.disk_hits}
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f'{key}.npz')
+
+    def _scan_disk_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.disk_dir)
+                   if entry.name.endswith('.npz'))
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith('.npz'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        n_bytes = sum(d[1] for d in entries)
+        target = self.disk_max_bytes * DISK_LOW_WATERMARK
+        for _, size, path in entries:
+            if n_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                n_bytes -= size
+            except OSError:
+                # removed by another process
+                pass
+        self._disk_bytes = n_bytes
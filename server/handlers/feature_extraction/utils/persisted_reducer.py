@@ -0,0 +1,200 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Dataset-level reducers (e.g., the SVD of the image extractors)
+fitted once per project and persisted with data_persistence,
+such that the following requests only transform their data objects.
+
+A request opts in by giving 'reducerId', the ObjectId under which
+the reducer is saved. The reducer is fitted on the data objects of the first
+request with the id, and on the data objects of a request to the
+'/refit' endpoint of the extractor, e.g., after the pool has drifted.
+Without 'reducerId', the reducer is fitted on the data objects of every request.
+The supervised reducers (e.g., the LDA of images) are persisted
+with the key of the labels they are fitted on,
+and refitted when a request gives other labels.
+The reducers supporting incremental updates (e.g., the online NMF of texts)
+are also updated with the data objects of a request to the '/append' endpoint,
+starting from the persisted reducer.
+The reducers of the image extractors are fitted on a sample of at most
+FIT_MAX_SAMPLES data objects, such that the first request with an id
+decodes a bounded number of images in one job before its rows are streamed.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Callable, Dict, List, Optional
+
+from bson.objectid import ObjectId
+import numpy as np
+
+from ...types import DataObject, StatusType
+from ...utils.data_persistence import is_saved, load, save
+from ...utils.executor import run_in_executor
+
+
+# pylint: disable=pointless-string-statement
+"""
+The suffix of the paths of the refit endpoints.
+"""
+REFIT_SUFFIX = '/refit'
+
+"""
+The suffix of the paths of the append endpoints.
+"""
+APPEND_SUFFIX = '/append'
+
+"""
+The number of data objects the image reducers are fitted on.
+The SVD of 8 x 8 thumbnails and of hog descriptors converge well below it.
+"""
+FIT_MAX_SAMPLES = 4096
+
+"""
+The locks serializing the updates of each reducer,
+such that concurrent appends are not lost.
+"""
+_UPDATE_LOCKS: Dict[ObjectId, asyncio.Lock] = {}
+
+
+def _get_extractor(path: str) -> str:
+    for suffix in (REFIT_SUFFIX, APPEND_SUFFIX):
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def get_labels_key(data_objects: List[DataObject],
+                   labels: np.ndarray,
+                   statuses: np.ndarray) -> str:
+    """
+    Compute the key of the labels a supervised reducer is fitted on.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects.
+    labels : np.ndarray
+        The partial labels.
+    statuses : np.ndarray
+        The label statuses.
+
+    Returns
+    -------
+    key : str
+        The hex digest of the uuids and the categories of the labeled data objects,
+        independent of the order of the data objects.
+    """
+
+    labeled = sorted((data_object['uuid'], str(label))
+                     for data_object, label, status in zip(data_objects, labels, statuses)
+                     if status == StatusType.Labeled)
+    hasher = hashlib.blake2b(digest_size=16)
+    for uuid, label in labeled:
+        hasher.update(f'{len(uuid)}:{uuid}{len(label)}:{label}'.encode())
+    return hasher.hexdigest()
+
+
+async def get_reducer(path: str,
+                      reducer_id: Optional[str],
+                      refit: bool,
+                      fit: Callable[[List[DataObject]], Any],
+                      data_objects: List[DataObject],
+                      fit_key: Optional[str] = None,
+                      max_samples: Optional[int] = None) -> Any:
+    """
+    Load the persisted reducer, or fit and persist it.
+
+    Args
+    ----
+    path : str
+        The path of the endpoint, for bounding the concurrent jobs
+        and identifying the extractor.
+    reducer_id : str, optional
+        The ObjectId of the reducer.
+    refit : bool
+        Whether to fit the reducer even when persisted.
+    fit : Callable[[List[DataObject]], Any]
+        The module-level function fitting the reducer on data objects.
+    data_objects : List[DataObject]
+        The data objects to fit the reducer on.
+    fit_key : str, optional
+        The key of what the reducer is fitted on beyond the data objects,
+        e.g., the labels of a supervised reducer computed by get_labels_key.
+        The persisted reducer is reused only when saved with the same key.
+    max_samples : int, optional
+        The largest number of data objects the reducer is fitted on.
+        When there are more data objects, the reducer is fitted
+        on a random sample of them. When None, it is fitted on all of them.
+
+    Returns
+    -------
+    reducer : Any
+        The fitted reducer, None when reducer_id is None.
+    """
+    # pylint: disable=too-many-arguments
+
+    if reducer_id is None:
+        return None
+
+    # The reducer is saved with the extractor path,
+    # such that an id reused for another extractor leads to a refit.
+    extractor = _get_extractor(path)
+
+    # the reducer is loaded and saved on the IOLoop,
+    # only the fitting runs in the executor
+    inserted_id = ObjectId(reducer_id)
+    if not refit and is_saved(inserted_id=inserted_id):
+        data = load(inserted_id=inserted_id)
+        if data['extractor'] == extractor and data.get('key') == fit_key:
+            return data['reducer']
+    if max_samples is not None and len(data_objects) > max_samples:
+        sample = np.random.RandomState(0).choice(len(data_objects), max_samples,
+                                                 replace=False)
+        data_objects = [data_objects[i] for i in np.sort(sample)]
+    reducer = await run_in_executor(path, fit, data_objects)
+    save(data={'extractor': extractor, 'reducer': reducer, 'key': fit_key},
+         inserted_id=inserted_id)
+    return reducer
+
+
+async def update_reducer(path: str,
+                         reducer_id: str,
+                         partial_fit: Callable[[Optional[Any], List[DataObject]], Any],
+                         data_objects: List[DataObject]) -> Any:
+    """
+    Update the persisted reducer with appended data objects, and persist it.
+
+    Args
+    ----
+    path : str
+        The path of the endpoint, for bounding the concurrent jobs
+        and identifying the extractor.
+    reducer_id : str
+        The ObjectId of the reducer.
+    partial_fit : Callable[[Optional[Any], List[DataObject]], Any]
+        The module-level function updating the reducer with data objects,
+        and fitting a new reducer when given None.
+    data_objects : List[DataObject]
+        The appended data objects.
+
+    Returns
+    -------
+    reducer : Any
+        The updated reducer.
+    """
+
+    extractor = _get_extractor(path)
+    inserted_id = ObjectId(reducer_id)
+    lock = _UPDATE_LOCKS.setdefault(inserted_id, asyncio.Lock())
+    async with lock:
+        reducer = None
+        if is_saved(inserted_id=inserted_id):
+            data = load(inserted_id=inserted_id)
+            if data['extractor'] == extractor:
+                reducer = data['reducer']
+        reducer = await run_in_executor(path, partial_fit, reducer, data_objects)
+        save(data={'extractor': extractor, 'reducer': reducer},
+             inserted_id=inserted_id)
+    return reducer
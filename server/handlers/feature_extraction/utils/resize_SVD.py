@@ -1,14 +1,22 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 
-import cv2 as cv
 import numpy as np
 from sklearn.decomposition import TruncatedSVD
 
+from .image_batch import ImageBatch, to_image_batch
 
-def resize_SVD(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+
+# pylint: disable=pointless-string-statement
+"""
+The number of dimensions of the features.
+"""
+N_COMPONENTS = 5
+
+
+def resize_SVD(imgs: Union[ImageBatch, List[np.ndarray]]) -> Tuple[np.ndarray, List[str]]:
     """
     Extract features for each image by dimension reduction for the normalized image.
 
@@ -37,24 +45,63 @@ def resize_SVD(imgs: np.ndarray) -> Tuple[np.ndarray, List[str]]:
 
     # normalized the images to gray scale 8 x 8
     h, w = 8, 8
-    X_raw_normalized = []
-    for img in imgs:
-        img_gray = img if len(img.shape) == 2 else cv.cvtColor(
-            img, cv.COLOR_BGR2GRAY)
-        img_resized = cv.resize(img_gray, (h, w),
-                                interpolation=cv.INTER_AREA)
-        X_raw_normalized.append(img_resized)
-    X_raw_normalized = np.array(X_raw_normalized)
+    X_raw_normalized = to_image_batch(imgs).gray8
 
     X_flatten = X_raw_normalized.reshape((-1, h * w))
+    return reduce_SVD(X_flatten)
+
 
-    n_components = 5
+def fit_SVD(X_flatten: np.ndarray) -> TruncatedSVD:
+    """
+    Fit the SVD reducing the flattened normalized images.
+
+    Args
+    ----
+    X_flatten : np.ndarray, shape = (n_samples, 64)
+        The flattened gray scale 8 x 8 images.
+
+    Returns
+    -------
+    reducer : TruncatedSVD
+        The fitted reducer.
+    """
+    # pylint: disable=invalid-name
 
     n_samples, n_features = X_flatten.shape
-    n_components_actual = min(n_samples, n_features, n_components)
+    n_components_actual = min(n_samples, n_features, N_COMPONENTS)
+    return TruncatedSVD(n_components=n_components_actual,
+                        random_state=0).fit(X_flatten)
+
+
+def reduce_SVD(X_flatten: np.ndarray,
+               reducer: Optional[TruncatedSVD] = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Reduce the dimension of the flattened normalized images with SVD.
+
+    Args
+    ----
+    X_flatten : np.ndarray, shape = (n_samples, 64)
+        The flattened gray scale 8 x 8 images.
+    reducer : TruncatedSVD, optional
+        The reducer fitted by fit_SVD, e.g., on a previous pool.
+        When None, the reducer is fitted on the given images.
+
+    Returns
+    -------
+    X : np.ndarray
+        The extracted feature values.
+    feature_names : List[str]
+        The names of features.
+    """
+    # pylint: disable=invalid-name
+
+    n_components = N_COMPONENTS
+
+    if reducer is None:
+        reducer = fit_SVD(X_flatten)
+    X = reducer.transform(X_flatten)
 
-    reducer = TruncatedSVD(n_components=n_components_actual)
-    X = reducer.fit_transform(X_flatten)
+    n_samples, n_components_actual = X.shape
     if n_components > n_components_actual:
         zeros = np.zeros((n_samples, n_components -
                          n_components_actual), dtype=float)
@@ -8,9 +8,10 @@ TODO: implement the image processing algorithms for image labeling tasks.
 import json
 
 import cv2 as cv
-from tornado.web import RequestHandler
 
-class ImageProcessingHandler(RequestHandler):
+from .utils.wire_format import CorsRequestHandler
+
+class ImageProcessingHandler(CorsRequestHandler):
     """
     The handler for image labeling.
     """
@@ -1,67 +1,64 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
-from typing import List, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from bson.objectid import ObjectId
 import numpy as np
 from sklearn.base import BaseEstimator
 from sklearn.dummy import DummyClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.neural_network import BernoulliRBM
-from sklearn.pipeline import make_pipeline
+from sklearn.pipeline import Pipeline, make_pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.semi_supervised import LabelSpreading
 from sklearn.svm import SVC
 from sklearn.tree import DecisionTreeClassifier
-import tornado.web
 
-from .utils.data_persistence import save
+from .utils.data_persistence import cache_info, save
+from .utils.dataset_session import resolve_dataset
+from .utils.executor import run_in_executor
+from .utils.knn_label_spreading import KNNLabelSpreading
 from .utils.load_estimator import load_estimator
+from .utils.retrain_scheduler import get_metrics, schedule
+from .utils.wire_format import CorsRequestHandler, parse_body, write_body
 from .types import BuiltInModelType, StatusType
-from .types import (
-    DataObject,
-    Label,
-    Model,
-    Status,
-)
+from .types import Label, Model
 
 
-def update_estimator(estimator_type: str,
-                     estimator: BaseEstimator,
-                     features: np.ndarray,
-                     labels: List[Union[Label, None]],
-                     statuses: np.ndarray) -> BaseEstimator:
-    assert len(features) == len(labels),\
-        f'number of data objects and labels mismatch: {len(features)} != {len(labels)}'
-    assert len(features) == len(statuses),\
-        f'number of data objects and label statuses mismatch: {len(features)} != {len(statuses)}'
-    assert estimator_type in [
-        BuiltInModelType.Null,
-        BuiltInModelType.Random,
-        BuiltInModelType.DecisionTree,
-        BuiltInModelType.SVM,
-        BuiltInModelType.LogisticRegression,
-        BuiltInModelType.LabelSpreading,
-        BuiltInModelType.RestrictedBoltzmannMachine,
-    ], f'Invalid model type: {estimator_type}'
+def encode_labels(labels: List[Union[Label, None]],
+                  statuses: np.ndarray) -> Tuple[np.ndarray, LabelEncoder, np.ndarray]:
+    """
+    Encode the classification labels of the labeled data objects.
+
+    Args
+    ----
+    labels : List[Union[Label, None]]
+        The labels of the data objects.
+    statuses : np.ndarray of any values, dtype = objects, shape = (n_samples,)
+        The label statuses of the data objects.
+
+    Returns
+    -------
+    mask_labeled : np.ndarray of bool values, shape = (n_samples,)
+        Whether each data object is labeled with a category.
+    encoder : LabelEncoder
+        The encoder of the categories.
+    y : np.ndarray of int values, shape = (n_samples,)
+        The encoded labels, -1 for the data objects not labeled.
+    """
 
     # Note: when a data object is labeled for label tasks other than classification,
     # its status will be Labeled, but the label will be None.
     mask_labeled = np.array([status == StatusType.Labeled
                              and labels[i] != None
                              and 'category' in labels[i]
-                             for i, status in enumerate(statuses)])
-    if np.sum(mask_labeled) == 0:
-        return estimator
+                             for i, status in enumerate(statuses)], dtype=bool)
 
     classification_labels = np.array([
         (d['category'] if (d is not None and 'category' in d) else None)
         for d in labels], dtype=str)
 
-    X = features
-
     unlabeled_indices = np.where(~mask_labeled)[0]
     if len(unlabeled_indices) != 0:
         unlabeled_mark = classification_labels[unlabeled_indices[0]]
@@ -75,53 +72,345 @@ def update_estimator(estimator_type: str,
         categories = np.unique(classification_labels)
         encoder = LabelEncoder().fit(categories)
         y = encoder.transform(classification_labels)
+    return mask_labeled, encoder, y
+
+
+def fit_supervised(make_estimator: Callable[[], BaseEstimator],
+                   encoder: LabelEncoder,
+                   X_train: np.ndarray,
+                   y_train: np.ndarray) -> BaseEstimator:
+    """
+    Fit a new supervised estimator on the labeled data objects,
+    or a DummyClassifier when there is only one class,
+    which the built-in classifiers don't support.
+
+    Args
+    ----
+    make_estimator : Callable[[], BaseEstimator]
+        The function creating the untrained estimator.
+    encoder : LabelEncoder
+        The encoder of the categories.
+    X_train : np.ndarray, shape = (n_labeled, n_features)
+        The features of the labeled data objects.
+    y_train : np.ndarray of int values, shape = (n_labeled,)
+        The encoded labels of the labeled data objects.
+
+    Returns
+    -------
+    estimator : EstimatorWithLabelDecoder
+        The fitted estimator.
+    """
+    # pylint: disable=invalid-name
+
+    is_one_class = len(np.unique(y_train)) == 1
+    estimator = make_estimator() if not is_one_class\
+        else DummyClassifier(strategy='most_frequent')
+    return EstimatorWithLabelDecoder(
+        estimator=estimator.fit(X_train, y_train), encoder=encoder)
+
+
+def update_decision_tree(estimator: BaseEstimator,
+                         encoder: LabelEncoder,
+                         features: np.ndarray,
+                         y: np.ndarray,
+                         mask_labeled: np.ndarray,
+                         uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Fit a decision tree on all the labeled data objects.
+    See update_estimator for the arguments.
+    """
+    # pylint: disable=too-many-arguments, unused-argument
+
+    return EstimatorWithLabelDecoder(
+        estimator=DecisionTreeClassifier().fit(features[mask_labeled], y[mask_labeled]),
+        encoder=encoder)
+
+
+def update_svm(estimator: BaseEstimator,
+               encoder: LabelEncoder,
+               features: np.ndarray,
+               y: np.ndarray,
+               mask_labeled: np.ndarray,
+               uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Fit a SVM on all the labeled data objects.
+    See update_estimator for the arguments.
+    """
+    # pylint: disable=too-many-arguments, unused-argument
 
-    X_train = X[mask_labeled]
+    return fit_supervised(lambda: SVC(gamma=0.001),
+                          encoder, features[mask_labeled], y[mask_labeled])
+
+
+def update_logistic_regression(estimator: BaseEstimator,
+                               encoder: LabelEncoder,
+                               features: np.ndarray,
+                               y: np.ndarray,
+                               mask_labeled: np.ndarray,
+                               uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Fit a logistic regression on all the labeled data objects,
+    warm started from the coefficients of the last update when the classes are unchanged.
+    See update_estimator for the arguments.
+
+    Note
+    ----
+    The update is not incremental:
+    the warm start only reduces the number of solver iterations,
+    while the StandardScaler is refitted and each iteration goes over all the labeled data objects,
+    such that the cost still grows with the total number of labels.
+    Only the SGD model is trained incrementally, see update_online_estimator.
+    """
+    # pylint: disable=too-many-arguments, unused-argument, invalid-name
+
+    X_train = features[mask_labeled]
     y_train = y[mask_labeled]
+    previous = estimator.estimator\
+        if isinstance(estimator, EstimatorWithLabelDecoder)\
+        and np.array_equal(estimator.encoder.classes_, encoder.classes_)\
+        else None
+    if isinstance(previous, Pipeline)\
+            and isinstance(previous[-1], LogisticRegression)\
+            and np.array_equal(previous[-1].classes_, np.unique(y_train)):
+        # warm start from the coefficients fitted in the last update
+        previous[-1].set_params(warm_start=True)
+        return EstimatorWithLabelDecoder(
+            estimator=previous.fit(X_train, y_train), encoder=encoder)
+    return fit_supervised(lambda: make_pipeline(
+        StandardScaler(),
+        LogisticRegression(C=1, penalty='l2', tol=0.01, solver='saga'),
+    ), encoder, X_train, y_train)
 
-    if estimator_type in [BuiltInModelType.Null,
-                          BuiltInModelType.Random]:
-        pass
-    elif estimator_type == BuiltInModelType.DecisionTree:
-        estimator = DecisionTreeClassifier().fit(X_train, y_train)
-        estimator = EstimatorWithLabelDecoder(
-            estimator=estimator, encoder=encoder)
-    elif estimator_type == BuiltInModelType.SVM:
-        # sklearn.svm.SVC doesn't support the edge case with one class
-        is_one_class = len(np.unique(y_train)) == 1
-        estimator = SVC(gamma=0.001) if not is_one_class\
-            else DummyClassifier(strategy='most_frequent')
-        estimator = estimator.fit(X_train, y_train)
-        estimator = EstimatorWithLabelDecoder(
-            estimator=estimator, encoder=encoder)
-    elif estimator_type == BuiltInModelType.LogisticRegression:
-        # sklearn.linear_model.LogisticRegression
-        # doesn't support the edge case with one class
-        is_one_class = len(np.unique(y_train)) == 1
-        estimator = make_pipeline(
-            StandardScaler(),
-            LogisticRegression(C=1, penalty='l2', tol=0.01, solver='saga'),
-        ) if not is_one_class else DummyClassifier(strategy='most_frequent')
-        estimator = estimator.fit(X_train, y_train)
-        estimator = EstimatorWithLabelDecoder(
-            estimator=estimator, encoder=encoder)
-    elif estimator_type == BuiltInModelType.RestrictedBoltzmannMachine:
-        # sklearn.neural_network.BernoulliRBM
+
+def update_rbm(estimator: BaseEstimator,
+               encoder: LabelEncoder,
+               features: np.ndarray,
+               y: np.ndarray,
+               mask_labeled: np.ndarray,
+               uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Fit a restricted Boltzmann machine followed by a logistic regression
+    on all the labeled data objects.
+    See update_estimator for the arguments.
+    """
+    # pylint: disable=too-many-arguments, unused-argument
+
+    return fit_supervised(lambda: make_pipeline(
+        BernoulliRBM(random_state=0),
+        LogisticRegression(solver='newton-cg', tol=1),
+    ), encoder, features[mask_labeled], y[mask_labeled])
+
+
+def update_label_spreading(estimator: BaseEstimator,
+                           encoder: LabelEncoder,
+                           features: np.ndarray,
+                           y: np.ndarray,
+                           mask_labeled: np.ndarray,
+                           uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Fit a label spreading on all the data objects.
+    See update_estimator for the arguments.
+    """
+    # pylint: disable=too-many-arguments, unused-argument
+
+    if isinstance(estimator, EstimatorWithLabelDecoder):
+        estimator = estimator.estimator
+    estimator = LabelSpreading(gamma=0.25, max_iter=20)\
+        if estimator is None else estimator
+    return EstimatorWithLabelDecoder(
+        estimator=estimator.fit(features, y), encoder=encoder)
+
+
+def update_knn_label_spreading(estimator: BaseEstimator,
+                               encoder: LabelEncoder,
+                               features: np.ndarray,
+                               y: np.ndarray,
+                               mask_labeled: np.ndarray,
+                               uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Fit a label spreading over the k-nearest-neighbor graph on all the data objects,
+    reusing the graph of the last update.
+    See update_estimator for the arguments.
+    """
+    # pylint: disable=too-many-arguments, unused-argument
+
+    # refit the previous estimator such that its graph is reused
+    if isinstance(estimator, EstimatorWithLabelDecoder):
+        estimator = estimator.estimator
+    if not isinstance(estimator, KNNLabelSpreading):
+        estimator = KNNLabelSpreading()
+    return EstimatorWithLabelDecoder(
+        estimator=estimator.fit(features, y), encoder=encoder)
+
+
+def update_sgd(estimator: BaseEstimator,
+               encoder: LabelEncoder,
+               features: np.ndarray,
+               y: np.ndarray,
+               mask_labeled: np.ndarray,
+               uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Update the SGD classifier with the data objects labeled since the last update.
+    See update_estimator for the arguments.
+    """
+    # pylint: disable=too-many-arguments
+
+    if len(encoder.classes_) == 1:
+        # sklearn.linear_model.SGDClassifier
         # doesn't support the edge case with one class
-        is_one_class = len(np.unique(y_train)) == 1
-        estimator = make_pipeline(
-            BernoulliRBM(random_state=0),
-            LogisticRegression(solver='newton-cg', tol=1),
-        ) if not is_one_class else DummyClassifier(strategy='most_frequent')
-        estimator = estimator.fit(X_train, y_train)
-        estimator = EstimatorWithLabelDecoder(
-            estimator=estimator, encoder=encoder)
-    elif estimator_type == BuiltInModelType.LabelSpreading:
-        estimator = LabelSpreading(gamma=0.25, max_iter=20)\
-            if estimator is None else estimator
-        estimator = estimator.fit(X, y)
-        estimator = EstimatorWithLabelDecoder(
-            estimator=estimator, encoder=encoder)
+        return fit_supervised(SGDClassifier, encoder,
+                              features[mask_labeled], y[mask_labeled])
+    return update_online_estimator(
+        estimator, encoder, features, y, mask_labeled, uuids)
+
+
+# pylint: disable=pointless-string-statement
+"""
+The function updating the estimator of each built-in model type,
+the models not listed (i.e., Null and Random) are not trained.
+"""
+UPDATERS: Dict[str, Callable[..., BaseEstimator]] = {
+    BuiltInModelType.DecisionTree: update_decision_tree,
+    BuiltInModelType.SVM: update_svm,
+    BuiltInModelType.LogisticRegression: update_logistic_regression,
+    BuiltInModelType.RestrictedBoltzmannMachine: update_rbm,
+    BuiltInModelType.LabelSpreading: update_label_spreading,
+    BuiltInModelType.LabelSpreadingKNN: update_knn_label_spreading,
+    BuiltInModelType.SGD: update_sgd,
+}
+
+
+def update_estimator(estimator_type: str,
+                     estimator: BaseEstimator,
+                     features: np.ndarray,
+                     labels: List[Union[Label, None]],
+                     statuses: np.ndarray,
+                     uuids: Optional[List[str]] = None) -> BaseEstimator:
+    """
+    Update the estimator of a model with the labels.
+
+    Args
+    ----
+    estimator_type : str
+        The model type, takes value in BuiltInModelType.
+    estimator : BaseEstimator
+        The estimator from the last update.
+    features : np.ndarray, shape = (n_samples, n_features)
+        The features of all the data objects.
+    labels : List[Union[Label, None]]
+        The labels of the data objects.
+    statuses : np.ndarray of any values, dtype = objects, shape = (n_samples,)
+        The label statuses of the data objects.
+    uuids : List[str], optional
+        The uuids of the data objects, for identifying the data objects seen
+        by the incrementally trained models.
+
+    Returns
+    -------
+    estimator : BaseEstimator
+        The updated estimator,
+        unchanged when no data object is labeled with a category.
+    """
+    # pylint: disable=too-many-arguments
+
+    assert len(features) == len(labels),\
+        f'number of data objects and labels mismatch: {len(features)} != {len(labels)}'
+    assert len(features) == len(statuses),\
+        f'number of data objects and label statuses mismatch: {len(features)} != {len(statuses)}'
+    assert estimator_type in [
+        BuiltInModelType.Null,
+        BuiltInModelType.Random,
+        *UPDATERS,
+    ], f'Invalid model type: {estimator_type}'
+
+    if estimator_type not in UPDATERS:
+        return estimator
+    mask_labeled, encoder, y = encode_labels(labels, statuses)
+    if np.sum(mask_labeled) == 0:
+        return estimator
+    return UPDATERS[estimator_type](
+        estimator, encoder, features, y, mask_labeled, uuids)
+
+
+def update_online_estimator(estimator: BaseEstimator,
+                            encoder: LabelEncoder,
+                            features: np.ndarray,
+                            y: np.ndarray,
+                            mask_labeled: np.ndarray,
+                            uuids: Optional[List[str]] = None,
+                            ) -> BaseEstimator:
+    """
+    Update an online estimator with the data objects labeled since the last update,
+    such that the cost of an update grows with the number of new labels
+    instead of the total number of labels.
+
+    The estimator is trained from scratch on all the labeled data objects
+    when it has not been trained incrementally before, when the categories change,
+    or when a label it has learned from is changed or removed,
+    as partial_fit can neither add classes nor unlearn samples.
+
+    Args
+    ----
+    estimator : BaseEstimator
+        The estimator from the last update.
+    encoder : LabelEncoder
+        The encoder of the categories.
+    features : np.ndarray, shape = (n_samples, n_features)
+        The features of all the data objects.
+    y : np.ndarray of int values, shape = (n_samples,)
+        The encoded labels of all the data objects.
+    mask_labeled : np.ndarray of bool values, shape = (n_samples,)
+        Whether each data object is labeled.
+    uuids : List[str], optional
+        The uuids of the data objects, for identifying the data objects seen.
+        When not given, the estimator is trained from scratch.
+
+    Returns
+    -------
+    estimator : IncrementalEstimatorWithLabelDecoder
+        The updated estimator.
+    """
+    # pylint: disable=too-many-arguments
+
+    labeled_indices = np.flatnonzero(mask_labeled)
+    labeled_categories = encoder.classes_[y[labeled_indices]]
+
+    can_resume = isinstance(estimator, IncrementalEstimatorWithLabelDecoder)\
+        and uuids is not None\
+        and np.array_equal(estimator.encoder.classes_, encoder.classes_)
+    if can_resume:
+        current_labels = dict(zip((uuids[i] for i in labeled_indices),
+                                  labeled_categories))
+        can_resume = all(current_labels.get(uuid) == category
+                         for uuid, category in estimator.seen_labels.items())
+    if can_resume:
+        is_new = np.array([uuids[i] not in estimator.seen_labels
+                           for i in labeled_indices], dtype=bool)
+        new_indices = labeled_indices[is_new]
+        new_categories = labeled_categories[is_new]
+    else:
+        estimator = IncrementalEstimatorWithLabelDecoder(
+            estimator=make_pipeline(
+                StandardScaler(),
+                SGDClassifier(loss='modified_huber', random_state=0),
+            ),
+            encoder=encoder,
+            seen_labels={},
+        )
+        new_indices = labeled_indices
+        new_categories = labeled_categories
+
+    if len(new_indices) == 0:
+        return estimator
+
+    scaler, classifier = estimator.estimator[0], estimator.estimator[-1]
+    X_new = features[new_indices]
+    scaler.partial_fit(X_new)
+    classifier.partial_fit(scaler.transform(X_new), y[new_indices],
+                           classes=np.arange(len(encoder.classes_)))
+    if uuids is not None:
+        estimator.seen_labels.update(zip((uuids[i] for i in new_indices),
+                                         new_categories))
     return estimator
 
 
@@ -144,34 +433,67 @@ class EstimatorWithLabelDecoder(BaseEstimator):
         return proba
 
 
-class ModelTrainingHandler(tornado.web.RequestHandler):
+class IncrementalEstimatorWithLabelDecoder(EstimatorWithLabelDecoder):
     """
-    The handler for default labeling.
+    An estimator trained with partial_fit,
+    which records the labels of the data objects it has learned from.
     """
 
-    def post(self, key: str):
+    def __init__(self,
+                 estimator: BaseEstimator,
+                 encoder: LabelEncoder,
+                 seen_labels: Optional[Dict[str, str]] = None):
+        super().__init__(estimator=estimator, encoder=encoder)
+        self.seen_labels = seen_labels
+
+
+class ModelTrainingHandler(CorsRequestHandler):
+    """
+    The handler for model training.
+    """
+
+    async def post(self, key: str):
         self.set_header('Access-Control-Allow-Origin', '*')
-        json_data = json.loads(self.request.body)
+        json_data = parse_body(self.request)
 
         if key not in ['Retrain']:
             # The service is not found.
             self.send_error(404)
             return
 
-        # process input: (features, labels, model?)
-        data_objects: List[DataObject] = json_data['dataObjects']
-        labels: List[Union[Label, None]] = json_data['labels']
-        statuses: List[Status] = json_data['statuses']
+        # process input: (dataObjects | sessionId, labels, statuses, model)
+        dataset = resolve_dataset(json_data)
+        features = dataset['features']
+        labels: List[Union[Label, None]] = dataset['labels']
+        statuses = dataset['statuses']
+        uuids: List[str] = dataset['uuids']
         model: Model = json_data['model']
 
-        # data structure transformation
-        features = np.array([data_object['features']
-                             for data_object in data_objects])
-        statuses = np.array([d['value'] for d in statuses], dtype=str)
-        estimator = load_estimator(model)
+        async def train() -> BaseEstimator:
+            # load when the run starts, such that the run continues
+            # from the model committed by the previous run
+            estimator = load_estimator(model)
+            return await run_in_executor(
+                self.request.path, update_estimator,
+                model['type'], estimator, features, labels, statuses, uuids)
+
+        def commit(estimator: BaseEstimator) -> None:
+            save(data=estimator, inserted_id=ObjectId(model['objectId']))
 
-        estimator = update_estimator(model['type'], estimator,
-                                     features, labels, statuses)
+        # coalesce with the concurrent requests of the same model
+        await schedule(model['objectId'], train, commit)
+        write_body(self, {'model': model})
+
+    def get(self, key: str):
+        """Compute the metrics of the model."""
+        self.set_header('Access-Control-Allow-Origin', '*')
+
+        if key not in ['Metrics']:
+            # The service is not found.
+            self.send_error(404)
+            return
 
-        save(data=estimator, inserted_id=ObjectId(model['objectId']))
-        self.write({'model': model})
+        write_body(self, {
+            'scheduler': get_metrics(),
+            'cache': cache_info(),
+        })
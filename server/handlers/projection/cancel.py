@@ -0,0 +1,23 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The handler cancelling a progressive projection by its job id.
+"""
+
+from ..utils.wire_format import CorsRequestHandler, parse_body
+from .utils import cancel_job
+
+
+class Handler(CorsRequestHandler):
+    """
+    The handler for cancelling a progressive projection.
+    """
+
+    def post(self):
+        """Cancel the progressive job."""
+        self.set_header('Access-Control-Allow-Origin', '*')
+        json_data = parse_body(self.request)
+
+        # process input: (jobId)
+        cancel_job(json_data['jobId'])
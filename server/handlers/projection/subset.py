@@ -0,0 +1,216 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The level-of-detail projection of a subset of a dataset session,
+e.g., the data objects visible in the viewport of a zoomed scatterplot.
+
+The subset is projected on its own, such that the local structure
+is not compressed by the rest of the pool.
+When 'parentProjectionId' is given (the 'projectionId' returned by
+/projection/TSNE or /projection/MDS for the features of the whole session,
+or by a previous subset projection),
+the subset layout is initialized with the parent coordinates of the subset,
+and aligned to them with a similarity transform,
+such that the refined layout replaces the zoomed region in place.
+A parent not returned for the same session is ignored.
+The subset projections are cached by the session, the content of the subset features,
+the method and the parent.
+"""
+
+import hashlib
+from typing import Optional, TypedDict
+
+import numpy as np
+from tornado.web import HTTPError
+
+from ..utils.dataset_session import get_session
+from ..utils.executor import run_in_executor
+from ..utils.wire_format import CorsRequestHandler, parse_body, write_body
+from . import mds, pca, tsne
+from .utils import ProjectionCache
+
+
+# pylint: disable=pointless-string-statement
+"""
+The cache of the subset projections in the server process.
+"""
+CACHE = ProjectionCache()
+
+"""
+The smallest number of data objects in a subset,
+above the perplexity of TSNE.
+"""
+MIN_SUBSET_SIZE = 32
+
+
+class SubsetProjection(TypedDict):
+    """The projection of a subset, with the session rows of the subset."""
+    indices: np.ndarray
+    projection: np.ndarray
+
+
+def align(projection: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Align a projection to target coordinates
+    with the least squares rotation, uniform scaling and translation.
+
+    Args
+    ----
+    projection : np.ndarray of float values, shape = (n_objects, n_components)
+        The projected coordinates of data objects.
+    target : np.ndarray of float values, shape = (n_objects, n_components)
+        The target coordinates of the same data objects.
+
+    Returns
+    -------
+    aligned : np.ndarray of float values, shape = (n_objects, n_components)
+        The aligned coordinates of data objects.
+    """
+
+    source_mean = projection.mean(axis=0)
+    target_mean = target.mean(axis=0)
+    source = projection - source_mean
+    norm = np.linalg.norm(source)
+    if norm == 0:
+        return np.broadcast_to(target_mean, projection.shape).copy()
+    u, s, vt = np.linalg.svd(source.T @ (target - target_mean))
+    scale = s.sum() / norm ** 2
+    return scale * source @ (u @ vt) + target_mean
+
+
+def project(X: np.ndarray,
+            method: str,
+            n_components: int,
+            init: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Project the data objects of a subset into n_components dimensions.
+
+    Args
+    ----
+    X : np.ndarray of float values, shape = (n_subset, n_features)
+        The features of the data objects in the subset.
+    method : str
+        The projection method, takes value in ['MDS', 'PCA', 'TSNE'].
+    n_components : int
+        The number of dimensions to project into.
+    init : np.ndarray of float values, shape = (n_subset, n_components), optional
+        The parent coordinates of the data objects,
+        the projection is initialized with and aligned to.
+
+    Returns
+    -------
+    projection : np.ndarray of float values, shape = (n_subset, n_components)
+        The projected coordinates of data objects.
+    """
+    # pylint: disable=invalid-name
+
+    if method == 'TSNE':
+        projection = tsne.fit_embedding(X, n_components, init)['embedding']
+    elif method == 'MDS':
+        projection = mds.project(X, n_components, init)
+    else:
+        projection = pca.project(X, n_components)
+    if init is None:
+        return projection
+    return align(projection, init)
+
+
+def get_parent_coordinates(parent_id: str,
+                           indices: np.ndarray,
+                           session_id: str) -> Optional[np.ndarray]:
+    """
+    Get the coordinates of the data objects in a cached parent projection.
+
+    Args
+    ----
+    parent_id : str
+        The projectionId of the parent projection.
+    indices : np.ndarray of int values, shape = (n_subset,)
+        The session rows of the data objects.
+    session_id : str
+        The id of the session the rows belong to.
+
+    Returns
+    -------
+    coordinates : np.ndarray of float values, shape = (n_subset, n_components), optional
+        The parent coordinates, None when the parent is not cached,
+        was not returned for the session, or does not contain all the data objects.
+    """
+
+    if parent_id.startswith('subset-'):
+        if not CACHE.has_session(parent_id, session_id):
+            return None
+        parent: Optional[SubsetProjection] = CACHE.get(parent_id)
+        if parent is None:
+            return None
+        order = np.argsort(parent['indices'])
+        positions = np.searchsorted(parent['indices'], indices, sorter=order)
+        positions = order[np.minimum(positions, len(order) - 1)]
+        if not np.array_equal(parent['indices'][positions], indices):
+            return None
+        return parent['projection'][positions]
+
+    if parent_id.startswith('tsne-') and tsne.CACHE.has_session(parent_id, session_id):
+        parent = tsne.CACHE.get(parent_id)
+        coordinates = None if parent is None else parent['embedding']
+    elif parent_id.startswith('mds-') and mds.CACHE.has_session(parent_id, session_id):
+        parent = mds.CACHE.get(parent_id)
+        coordinates = None if parent is None else parent['projection']
+    else:
+        coordinates = None
+    if coordinates is None or (len(indices) > 0 and indices.max() >= len(coordinates)):
+        return None
+    return coordinates[indices]
+
+
+class Handler(CorsRequestHandler):
+    """
+    The handler for projection - level-of-detail projection of a subset.
+    """
+
+    async def post(self):
+        """Project the subset of the dataset session."""
+        self.set_header('Access-Control-Allow-Origin', '*')
+        json_data = parse_body(self.request)
+
+        # process input: (sessionId, uuids | indices, method, nComponents,
+        # parentProjectionId?)
+        session_id: str = json_data['sessionId']
+        session = get_session(session_id)
+        indices = session.get_indices(json_data['uuids'])\
+            if 'uuids' in json_data else np.array(json_data['indices'], dtype=int)
+        if len(indices) > 0 and (indices.min() < 0 or indices.max() >= len(session.features)):
+            raise HTTPError(400, reason='The indices are out of the session rows')
+        method: str = json_data['method']
+        n_components: int = json_data['nComponents']
+        parent_id: Optional[str] = json_data.get('parentProjectionId')
+        if method not in ['MDS', 'PCA', 'TSNE'] or len(indices) < MIN_SUBSET_SIZE:
+            self.send_error(400)
+            return
+
+        # the cache is read and written on the IOLoop,
+        # the key is computed in a thread,
+        # and the projection is computed in the executor
+        X = session.features[indices]
+        # the session rows of the subset are cached with the projection
+        namespace = f'subset-{method}-{n_components}-{session_id}'
+        if parent_id is not None:
+            namespace += '-' + hashlib.blake2b(parent_id.encode(),
+                                               digest_size=8).hexdigest()
+        key = await CACHE.compute_key(X, namespace)
+        value: Optional[SubsetProjection] = CACHE.get(key)
+        if value is None:
+            init = None if parent_id is None\
+                else get_parent_coordinates(parent_id, indices, session_id)
+            # the job is bounded by the concurrency of the method's endpoint
+            projection = await run_in_executor(
+                f'/projection/{method}', project, X, method, n_components, init)
+            value = {'indices': indices, 'projection': projection}
+            CACHE.put(key, len(X), value)
+        CACHE.add_session(key, session_id)
+
+        write_body(self, {
+            'projection': value['projection'],
+            'projectionId': key,
+        })
@@ -0,0 +1,18 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The utilities of the projections: the chunked PCA,
+the progressive responses and the projection cache.
+"""
+
+from .chunked_pca import ChunkedPCA
+from .progressive import ProgressiveJob, cancel_job
+from .projection_cache import ProjectionCache
+
+__all__ = [
+    "cancel_job",
+    "ChunkedPCA",
+    "ProgressiveJob",
+    "ProjectionCache",
+]
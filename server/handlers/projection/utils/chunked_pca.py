@@ -0,0 +1,110 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+A PCA fitted in one pass over the rows, chunk by chunk,
+such that the feature matrix is never copied or centered at once.
+
+Each chunk is centered on its own mean, and the means and the scatter
+matrices of the chunks are merged in float64 with the pairwise update of
+Chan et al., such that features with a large offset keep their precision,
+unlike the covariance computed as X^T X / n - mean mean^T.
+The components are the top eigenvectors of the covariance,
+in O(n_features^2) memory whatever the number of rows,
+with the sign making the largest loading of each component positive,
+such that refits on similar rows give the same orientation.
+Only the mean and the components are kept with the fitted model,
+and the rows are centered chunk by chunk in float64 when transformed.
+"""
+
+from typing import Optional
+
+import numpy as np
+from scipy.linalg import eigh
+
+
+# pylint: disable=pointless-string-statement
+"""
+The number of rows accumulated and transformed at a time.
+"""
+BATCH_SIZE = 8192
+
+
+class ChunkedPCA():
+    """
+    The PCA fitted and applied in chunks of rows.
+    """
+
+    def __init__(self, n_components: int):
+        self.n_components = n_components
+        self.mean_: Optional[np.ndarray] = None
+        self.components_: Optional[np.ndarray] = None
+
+    def fit(self, X: np.ndarray) -> 'ChunkedPCA':
+        """
+        Fit the PCA in one pass over the rows.
+
+        Args
+        ----
+        X : np.ndarray of float values, shape = (n_rows, n_features)
+            The features of data objects.
+
+        Returns
+        -------
+        self : ChunkedPCA
+            The fitted PCA.
+        """
+        # pylint: disable=invalid-name
+
+        n_features = X.shape[1]
+        n_rows = 0
+        mean = np.zeros(n_features)
+        scatter = np.zeros((n_features, n_features))
+        for start in range(0, len(X), BATCH_SIZE):
+            chunk = np.array(X[start:start + BATCH_SIZE], dtype=np.float64)
+            n_chunk = len(chunk)
+            chunk_mean = chunk.mean(axis=0)
+            chunk -= chunk_mean
+            delta = chunk_mean - mean
+            n_merged = n_rows + n_chunk
+            mean += delta * (n_chunk / n_merged)
+            scatter += chunk.T @ chunk\
+                + np.outer(delta, delta) * (n_rows * n_chunk / n_merged)
+            n_rows = n_merged
+
+        self.mean_ = mean
+        _, eigenvectors = eigh(scatter / n_rows,
+                               subset_by_index=[n_features - self.n_components,
+                                                n_features - 1])
+        # the eigenvectors in decreasing order of the eigenvalues
+        components = eigenvectors[:, ::-1].T
+        signs = np.sign(components[np.arange(self.n_components),
+                                   np.abs(components).argmax(axis=1)])
+        self.components_ = components * signs[:, np.newaxis]
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Project rows with the fitted components, chunk by chunk.
+
+        Args
+        ----
+        X : np.ndarray of float values, shape = (n_rows, n_features)
+            The features of data objects.
+
+        Returns
+        -------
+        projection : np.ndarray of float values, shape = (n_rows, n_components)
+            The projected coordinates of data objects.
+        """
+        # pylint: disable=invalid-name
+
+        # Each chunk is centered in float64 before the projection,
+        # as subtracting the projected mean from the projected rows would
+        # cancel the leading digits of features with a large offset.
+        projection = np.zeros((len(X), self.n_components))
+        for start in range(0, len(X), BATCH_SIZE):
+            chunk = np.array(X[start:start + BATCH_SIZE], dtype=np.float64)
+            chunk -= self.mean_
+            projection[start:start + BATCH_SIZE] = chunk @ self.components_.T
+        return projection
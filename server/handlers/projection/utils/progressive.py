@@ -0,0 +1,152 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Progressive projection responses.
+
+When the request has header 'Accept: application/x-ndjson',
+the projection handlers compute the projection in stages,
+from a fast approximation to the converged layout,
+and write one JSON event per line, flushed as soon as it is ready:
+- {"type": "projection", "stage", "projection"} after each stage;
+- {"type": "done", "cancelled", "projectionId"} at the end,
+  where cancelled tells whether stages were skipped,
+  and projectionId identifies the cached final projection.
+
+A request may give 'jobId', e.g., one per scatterplot.
+A newer request with the same 'jobId' cancels the job,
+as does a request to the '/projection/cancel' endpoint.
+The stage running when the job is cancelled runs to completion,
+and the following stages are not started.
+The job also stops when the client disconnects.
+Only the running jobs are registered, cancelling an unknown job id is a no-op.
+"""
+
+import itertools
+import json
+from typing import Dict, Optional
+
+import numpy as np
+from tornado.iostream import StreamClosedError
+from tornado.web import RequestHandler
+
+from ...utils.streaming import MIME_NDJSON
+from ...utils.wire_format import to_json_compatible
+
+
+# pylint: disable=pointless-string-statement
+"""
+The generation of the newest running job of each job id,
+removed when the job exits.
+"""
+_GENERATIONS: Dict[str, int] = {}
+
+"""
+The source of the generations, increasing across the job ids,
+such that a generation is never reused by a later job.
+"""
+_COUNTER = itertools.count()
+
+
+def cancel_job(job_id: str) -> None:
+    """
+    Cancel the running job of a job id, if any.
+
+    Args
+    ----
+    job_id : str
+        The id of the job.
+    """
+
+    _GENERATIONS.pop(job_id, None)
+
+
+class ProgressiveJob():
+    """
+    The progressive response of a projection request,
+    used as a context manager, such that the job is unregistered
+    when the request completes or fails.
+    """
+
+    def __init__(self, handler: RequestHandler, job_id: Optional[str] = None):
+        self.handler = handler
+        self.job_id = job_id
+        self.closed = False
+        self.generation = next(_COUNTER)
+        if job_id is not None:
+            # the newer generation cancels the running job of the id
+            _GENERATIONS[job_id] = self.generation
+        handler.set_header('Content-Type', MIME_NDJSON)
+        handler.set_header('Vary', 'Accept')
+
+    def __enter__(self) -> 'ProgressiveJob':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.job_id is not None\
+                and _GENERATIONS.get(self.job_id) == self.generation:
+            del _GENERATIONS[self.job_id]
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Whether the job is cancelled, or the client disconnected.
+        """
+
+        if self.closed:
+            return True
+        return self.job_id is not None\
+            and _GENERATIONS.get(self.job_id) != self.generation
+
+    async def write_projection(self, stage: str, projection: np.ndarray) -> bool:
+        """
+        Write the projection of a stage and flush it to the client.
+
+        Args
+        ----
+        stage : str
+            The name of the stage, e.g., 'coarse'.
+        projection : np.ndarray of float values, shape = (n_pool, n_components)
+            The projected coordinates of data objects.
+
+        Returns
+        -------
+        running : bool
+            Whether the following stages should be computed,
+            False when the job is cancelled.
+        """
+
+        if self.cancelled:
+            return False
+        try:
+            self.handler.write(json.dumps(to_json_compatible({
+                'type': 'projection',
+                'stage': stage,
+                'projection': projection,
+            })) + '\n')
+            await self.handler.flush()
+        except StreamClosedError:
+            self.closed = True
+        return not self.cancelled
+
+    async def finish(self, projection_id: Optional[str] = None) -> None:
+        """
+        Write the end of the response.
+
+        Args
+        ----
+        projection_id : str, optional
+            The id of the cached final projection.
+        """
+
+        if self.closed:
+            return
+        try:
+            self.handler.write(json.dumps({
+                'type': 'done',
+                'cancelled': self.cancelled,
+                'projectionId': projection_id,
+            }) + '\n')
+            await self.handler.flush()
+        except StreamClosedError:
+            self.closed = True
@@ -0,0 +1,218 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The cache of projections in the server process,
+keyed by the content of the projected features.
+
+A request projecting the same features again (e.g., after relabeling)
+gets the cached projection without recomputing it,
+and a request projecting the features of a previous request
+with rows appended (e.g., after adding data objects to the pool)
+finds the previous projection to extend instead of starting over.
+The sessions a projection was returned to are recorded with it,
+such that a projection id given by a request is only used
+for the rows of the session it was computed on.
+The fingerprints of the features take seconds for large pools,
+and are computed in a thread (hashlib releases the GIL),
+while the cache itself is only read and written on the IOLoop.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+import numpy as np
+from tornado.ioloop import IOLoop
+
+from ...utils.data_persistence.lru_cache import LRUCache
+from ...utils.fingerprint import fingerprint
+
+
+# pylint: disable=pointless-string-statement
+"""
+The maximum number of bytes of projections kept in memory.
+"""
+CACHE_MAX_BYTES = 256 << 20
+
+"""
+The number of the most recently cached sizes searched for a previous projection.
+Each candidate size costs a fingerprint of the features up to that size.
+"""
+MAX_PREFIX_CANDIDATES = 4
+
+
+class ProjectionCache():
+    """
+    The cache mapping the features and the projection method
+    to the projection, or the model it is read from.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.memory = LRUCache(max_bytes, on_evict=self._forget_sessions)
+        self._n_rows: OrderedDict = OrderedDict()
+        self._sessions: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def get_key(X: np.ndarray, namespace: str) -> str:
+        """
+        Compute the cache key of a projection.
+
+        Args
+        ----
+        X : np.ndarray, shape = (n_pool, n_features)
+            The projected features.
+        namespace : str
+            The name distinguishing projections computed differently,
+            e.g., the method and the number of dimensions.
+
+        Returns
+        -------
+        key : str
+            The cache key.
+        """
+        # pylint: disable=invalid-name
+
+        return f'{namespace}-{fingerprint(X)}'
+
+    @staticmethod
+    async def compute_key(X: np.ndarray, namespace: str) -> str:
+        """
+        Compute the cache key of a projection in a thread, without blocking the IOLoop.
+
+        Args
+        ----
+        X : np.ndarray, shape = (n_pool, n_features)
+            The projected features.
+        namespace : str
+            The name distinguishing projections computed differently,
+            e.g., the method and the number of dimensions.
+
+        Returns
+        -------
+        key : str
+            The cache key.
+        """
+        # pylint: disable=invalid-name
+
+        return await IOLoop.current().run_in_executor(
+            None, ProjectionCache.get_key, X, namespace)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a projection.
+
+        Args
+        ----
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        value : Any, optional
+            The cached projection, None when not cached.
+        """
+
+        try:
+            return self.memory.get(key)
+        except KeyError:
+            return None
+
+    def put(self, key: str, n_rows: int, value: Any) -> None:
+        """
+        Put a projection.
+
+        Args
+        ----
+        key : str
+            The cache key.
+        n_rows : int
+            The number of projected rows.
+        value : Any
+            The projection.
+        """
+
+        self.memory.put(key, value)
+        self._n_rows[key] = n_rows
+        self._n_rows.move_to_end(key)
+        while len(self._n_rows) > 4 * MAX_PREFIX_CANDIDATES:
+            self._n_rows.popitem(last=False)
+
+    def add_session(self, key: str, session_id: Optional[str]) -> None:
+        """
+        Record that a cached projection was returned to a session.
+
+        Args
+        ----
+        key : str
+            The cache key.
+        session_id : str, optional
+            The id of the session whose features are projected.
+            When None, or when the projection is not cached, nothing is recorded.
+        """
+
+        if session_id is None or key not in self.memory:
+            return
+        self._sessions.setdefault(key, set()).add(session_id)
+
+    def has_session(self, key: str, session_id: str) -> bool:
+        """
+        Check whether a cached projection was returned to a session.
+
+        Args
+        ----
+        key : str
+            The cache key.
+        session_id : str
+            The id of the session.
+
+        Returns
+        -------
+        recorded : bool
+            Whether the projection is cached and was returned to the session.
+        """
+
+        return key in self.memory and session_id in self._sessions.get(key, ())
+
+    async def find_prefix(self, X: np.ndarray, namespace: str) -> Optional[Tuple[int, Any]]:
+        """
+        Find the cached projection of the leading rows of the features.
+        The keys of the candidate prefixes are computed in a thread.
+
+        Args
+        ----
+        X : np.ndarray, shape = (n_pool, n_features)
+            The projected features.
+        namespace : str
+            The name distinguishing projections computed differently.
+
+        Returns
+        -------
+        previous : Tuple[int, Any], optional
+            The number of leading rows and their projection,
+            the largest cached one, None when not found.
+        """
+        # pylint: disable=invalid-name
+
+        candidates = sorted({n for key, n in self._n_rows.items()
+                             if key.startswith(f'{namespace}-') and 0 < n < len(X)},
+                            reverse=True)
+        for n_rows in candidates[:MAX_PREFIX_CANDIDATES]:
+            value = self.get(await self.compute_key(X[:n_rows], namespace))
+            if value is not None:
+                return n_rows, value
+        return None
+
+    def _forget_sessions(self, key: str, _n_bytes: int) -> None:
+        self._sessions.pop(key, None)
+
+    def info(self) -> dict:
+        """
+        Get the statistics of the cache.
+
+        Returns
+        -------
+        info : dict
+            The statistics of the memory.
+        """
+
+        return self.memory.info()
@@ -59,7 +59,9 @@ class BuiltInModelType():
     SVM = 'SVM'
     LogisticRegression = 'LogisticRegression'
     LabelSpreading = 'LabelSpreading'
+    LabelSpreadingKNN = 'LabelSpreadingKNN'
     RestrictedBoltzmannMachine = 'RestrictedBoltzmannMachine'
+    SGD = 'SGD'
 
 
 class BuiltInSamplingStrategyType():
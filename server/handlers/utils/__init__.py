@@ -1,10 +1,16 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+from . import blob_store
 from . import data_persistence
+from . import dataset_session
+from . import executor
 from . import load_estimator
 
 __all__ = [
+    "blob_store",
     "data_persistence",
+    "dataset_session",
+    "executor",
     "load_estimator",
 ]
@@ -0,0 +1,291 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+A content-addressed store of binary blobs (e.g., encoded images) on the local disk.
+
+A blob is identified by the SHA-256 hex digest of its content,
+thus a blob is uploaded once and shared by all the requests referencing it.
+Instead of a data url, the content of a data object can reference
+- a blob by 'blob:<blob id>';
+- a local file by 'file:<path>', for files under one of FILE_ROOTS.
+The referenced content is read through a memory map,
+such that it is neither part of the request body nor copied in memory.
+
+The blobs are evicted in least recently used order
+when the directory grows beyond BLOB_MAX_BYTES,
+the clients upload them again when /blobs/missing reports them.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from typing import Iterator, List, Optional, Tuple, Union
+
+
+# pylint: disable=pointless-string-statement
+"""
+The directory of the blobs.
+"""
+BLOB_DIR = os.path.join(tempfile.gettempdir(), 'onelabeler-blobs')
+
+"""
+The maximum number of bytes of blobs stored.
+When exceeded, the least recently used blobs are removed
+until BLOB_LOW_WATERMARK of the budget is used.
+"""
+BLOB_MAX_BYTES = 8 << 30
+BLOB_LOW_WATERMARK = 0.9
+
+"""
+The directories whose files can be referenced by data objects.
+When empty, file references are rejected.
+"""
+FILE_ROOTS: List[str] = []
+
+"""
+The prefixes of the content referencing a blob or a file.
+"""
+BLOB_PREFIX = 'blob:'
+FILE_PREFIX = 'file:'
+
+_BLOB_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+_BLOB_LOCK = threading.Lock()
+_BLOB_BYTES: Optional[int] = None
+
+
+def _check_blob_id(blob_id: str) -> None:
+    if _BLOB_ID_PATTERN.fullmatch(blob_id) is None:
+        raise ValueError(f'Invalid blob id: {blob_id}')
+
+
+def get_blob_path(blob_id: str) -> str:
+    """
+    Get the path of a blob, which may not exist.
+
+    Args
+    ----
+    blob_id : str
+        The SHA-256 hex digest of the blob content.
+
+    Returns
+    -------
+    path : str
+        The path of the blob file.
+    """
+
+    _check_blob_id(blob_id)
+    return os.path.join(BLOB_DIR, blob_id[:2], blob_id)
+
+
+def has_blob(blob_id: str) -> bool:
+    """
+    Check whether a blob is stored.
+
+    Args
+    ----
+    blob_id : str
+        The SHA-256 hex digest of the blob content.
+
+    Returns
+    -------
+    stored : bool
+        Whether the blob is stored.
+    """
+
+    path = get_blob_path(blob_id)
+    try:
+        # refresh the modification time used for the eviction order
+        os.utime(path)
+    except OSError:
+        return False
+    return os.path.isfile(path)
+
+
+class BlobWriter():
+    """
+    The writer of a blob received in chunks,
+    hashing the content while writing it to a temporary file.
+    """
+
+    def __init__(self):
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        self.hasher = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Append a chunk to the blob.
+
+        Args
+        ----
+        chunk : bytes
+            The chunk of content.
+        """
+
+        self.hasher.update(chunk)
+        self.file.write(chunk)
+
+    def close(self) -> str:
+        """
+        Store the blob under its id, unless already stored.
+
+        Returns
+        -------
+        blob_id : str
+            The SHA-256 hex digest of the blob content.
+        """
+
+        self.file.close()
+        blob_id = self.hasher.hexdigest()
+        path = get_blob_path(blob_id)
+        if has_blob(blob_id):
+            os.remove(self.tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # the rename is atomic, readers never see a partial blob
+            os.replace(self.tmp_path, path)
+            _add_blob_bytes(os.path.getsize(path))
+        return blob_id
+
+    def abort(self) -> None:
+        """
+        Discard the blob.
+        """
+
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def _add_blob_bytes(n_bytes: int) -> None:
+    # pylint: disable=global-statement
+    global _BLOB_BYTES
+    with _BLOB_LOCK:
+        if _BLOB_BYTES is None:
+            _BLOB_BYTES = sum(d[1] for d in _scan_blobs())
+        else:
+            _BLOB_BYTES += n_bytes
+        if _BLOB_BYTES > BLOB_MAX_BYTES:
+            _BLOB_BYTES = _evict_blobs()
+
+
+def _scan_blobs() -> List[Tuple[float, int, str]]:
+    entries = []
+    for directory in os.scandir(BLOB_DIR):
+        if not directory.is_dir():
+            continue
+        for entry in os.scandir(directory.path):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def _evict_blobs() -> int:
+    entries = sorted(_scan_blobs())
+    n_bytes = sum(d[1] for d in entries)
+    target = BLOB_MAX_BYTES * BLOB_LOW_WATERMARK
+    for _, size, path in entries:
+        if n_bytes <= target:
+            break
+        try:
+            os.remove(path)
+            n_bytes -= size
+        except OSError:
+            # removed by another process
+            pass
+    return n_bytes
+
+
+def put_blob(content: bytes) -> str:
+    """
+    Store a blob, unless already stored.
+
+    Args
+    ----
+    content : bytes
+        The blob content.
+
+    Returns
+    -------
+    blob_id : str
+        The SHA-256 hex digest of the blob content.
+    """
+
+    blob_id = hashlib.sha256(content).hexdigest()
+    if has_blob(blob_id):
+        return blob_id
+    writer = BlobWriter()
+    try:
+        writer.write(content)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def get_content_path(content: str) -> Optional[str]:
+    """
+    Get the path of the file referenced by a data object content.
+
+    Args
+    ----
+    content : str
+        The data object content.
+
+    Returns
+    -------
+    path : str, optional
+        The path of the referenced blob or file,
+        None when the content is not a reference.
+    """
+
+    if content.startswith(BLOB_PREFIX):
+        path = get_blob_path(content[len(BLOB_PREFIX):])
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+    if content.startswith(FILE_PREFIX):
+        path = os.path.realpath(content[len(FILE_PREFIX):])
+        for root in FILE_ROOTS:
+            root = os.path.realpath(root)
+            if os.path.commonpath([root, path]) == root:
+                return path
+        raise PermissionError(f'The file is not under FILE_ROOTS: {path}')
+    return None
+
+
+@contextmanager
+def open_content(path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """
+    Map the content of a blob or file into memory, read-only.
+
+    Args
+    ----
+    path : str
+        The path of the blob or file.
+
+    Yields
+    ------
+    buffer : Union[bytes, mmap.mmap]
+        The content, valid until the context exits.
+    """
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # empty files can't be mapped
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
@@ -4,10 +4,18 @@
 # pylint: disable=missing-docstring
 from .data_persistence import (save,
                                load,
-                               is_saved)
+                               is_saved,
+                               cache_info)
+from .lru_cache import LRUCache, estimate_size
+from .mongo_client import close_clients, get_client
 
 __all__ = [
     'save',
     'load',
     'is_saved',
+    'cache_info',
+    'LRUCache',
+    'estimate_size',
+    'close_clients',
+    'get_client',
 ]
@@ -3,15 +3,22 @@
 
 """
 Functions for dumping and loading data.
+
+When the database is not mocked, a size-bounded LRU cache is put in front of it.
+Saving writes through to both the cache and the database,
+and loading only unpickles from the database on cache misses.
 """
 
-from typing import Any, Optional
+from typing import Any, Hashable, Optional
+import logging
 import pickle
 import time
 
-import pymongo
 from bson.objectid import ObjectId
 
+from .lru_cache import LRUCache
+from .mongo_client import get_client
+
 
 # pylint: disable=pointless-string-statement
 """
@@ -19,6 +26,17 @@ Whether to mock the database with a dict.
 """
 MOCK = True
 
+"""
+The maximum number of bytes held in memory by the cache (or the mocked database).
+The sizes of the data are estimated with lru_cache.estimate_size.
+"""
+CACHE_MAX_BYTES = 1 << 30
+
+"""
+The cache of unpickled data in front of the database.
+"""
+CACHE = LRUCache(CACHE_MAX_BYTES)
+
 
 def save(data: Any,
          name: Optional[str] = None,
@@ -57,8 +75,10 @@ def save(data: Any,
     # pylint: disable=too-many-arguments
 
     if not MOCK:
-        return save_to_db(data, name, url, db_name,
-                          collection_name, inserted_id)
+        details = save_to_db(data, name, url, db_name,
+                             collection_name, inserted_id)
+        CACHE.put(details['inserted_id'], data)
+        return details
     return save_to_dict(data, name, inserted_id)
 
 
@@ -90,7 +110,12 @@ def load(inserted_id: ObjectId,
     """
 
     if not MOCK:
-        return load_from_db(inserted_id, url, db_name, collection_name)
+        try:
+            return CACHE.get(inserted_id)
+        except KeyError:
+            data = load_from_db(inserted_id, url, db_name, collection_name)
+            CACHE.put(inserted_id, data)
+            return data
     return load_from_dict(inserted_id)
 
 
@@ -120,7 +145,8 @@ def is_saved(inserted_id: ObjectId,
     # pylint: disable=invalid-name
 
     if not MOCK:
-        return is_saved_in_db(inserted_id, url, db_name, collection_name)
+        return inserted_id in CACHE\
+            or is_saved_in_db(inserted_id, url, db_name, collection_name)
     return is_saved_in_dict(inserted_id)
 
 
@@ -160,8 +186,8 @@ def save_to_db(data: Any,
 
     pickled_data = pickle.dumps(data)
 
-    # create connection
-    client = pymongo.MongoClient(url)
+    # get the shared connection
+    client = get_client(url)
 
     # create database
     db = client[db_name]
@@ -218,8 +244,8 @@ def load_from_db(inserted_id: ObjectId,
     """
     # pylint: disable=invalid-name
 
-    # create connection
-    client = pymongo.MongoClient(url)
+    # get the shared connection
+    client = get_client(url)
 
     # get database
     db = client[db_name]
@@ -260,8 +286,8 @@ def is_saved_in_db(inserted_id: ObjectId,
     """
     # pylint: disable=invalid-name
 
-    # create connection
-    client = pymongo.MongoClient(url)
+    # get the shared connection
+    client = get_client(url)
 
     # get database
     db = client[db_name]
@@ -269,20 +295,56 @@ def is_saved_in_db(inserted_id: ObjectId,
     # get collection
     collection = db[collection_name]
 
-    # get data
-    data = collection.find_one({'_id': inserted_id})
-    return data is None
+    # check data without fetching the payload
+    data = collection.find_one({'_id': inserted_id}, projection={'_id': 1})
+    return data is not None
+
+
+def cache_info() -> dict:
+    """
+    Get the statistics of the in-memory tier,
+    which is the mocked database when MOCK is set and the cache otherwise.
+
+    Returns
+    -------
+    info : dict
+        Has form {'hits': int, 'misses': int, 'evictions': int,
+        'nItems': int, 'nBytes': int, 'maxBytes': int}.
+    """
+
+    return DB.info() if MOCK else CACHE.info()
+
+
+def log_eviction(inserted_id: Hashable, n_bytes: int) -> None:
+    """
+    Log the eviction of data from the database mocked with a dict.
+
+    Args
+    ----
+    inserted_id : Hashable
+        The key of the evicted data object.
+    n_bytes : int
+        The estimated size of the evicted data object.
+    """
+
+    logging.getLogger(__name__).warning(
+        'The mocked database evicted %s (%d bytes) to stay within %d bytes, '
+        'the data object is forgotten and recreated (e.g., untrained) on next use',
+        inserted_id, n_bytes, DB.max_bytes)
 
 
 # pylint: disable=pointless-string-statement
 """
-A dict simulating the database.
+A size-bounded dict simulating the database.
 
 Note
 ----
 Saving and fetching data from the dict is much faster than from db.
+As there is no durable backend behind the mocked database,
+evicted data are forgotten, e.g., an evicted estimator is recreated untrained.
+Each eviction is logged as a warning, see log_eviction.
 """
-DB = {}
+DB = LRUCache(CACHE_MAX_BYTES, on_evict=log_eviction)
 
 
 def save_to_dict(data: Any,
@@ -311,7 +373,7 @@ def save_to_dict(data: Any,
     if inserted_id is None:
         inserted_id = ObjectId()
 
-    DB[inserted_id] = data
+    DB.put(inserted_id, data)
     details = {
         'inserted_id': inserted_id,
         'name': name,
@@ -335,7 +397,7 @@ def load_from_dict(inserted_id: ObjectId) -> Any:
         The stored data.
     """
 
-    data = DB[inserted_id]
+    data = DB.get(inserted_id)
     return data
 
 
@@ -0,0 +1,199 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+A size-bounded in-memory cache with least-recently-used eviction.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import sys
+import threading
+
+import numpy as np
+import scipy.sparse
+
+
+def estimate_size(obj: Any, visited: Optional[Dict[int, Any]] = None) -> int:
+    """
+    Estimate the number of bytes held by an object.
+
+    The numpy arrays and scipy sparse matrices reachable from the object
+    are counted with their buffer sizes, other objects with sys.getsizeof.
+    Unlike measuring the pickled object, the estimation doesn't copy the data.
+
+    Args
+    ----
+    obj : Any
+        The object to measure.
+    visited : Dict[int, Any], optional
+        The objects already counted, keyed by id.
+        The objects are kept referenced such that their ids are not reused.
+
+    Returns
+    -------
+    n_bytes : int
+        The estimated number of bytes.
+    """
+
+    if visited is None:
+        visited = {}
+    if id(obj) in visited:
+        return 0
+    visited[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        # views share the buffer of the array they are taken from
+        return estimate_size(obj.base, visited)\
+            if isinstance(obj.base, np.ndarray) else obj.nbytes
+    if scipy.sparse.issparse(obj):
+        return sum(estimate_size(getattr(obj, d), visited)
+                   for d in ['data', 'indices', 'indptr', 'row', 'col', 'offsets']
+                   if hasattr(obj, d))
+    n_bytes = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        n_bytes += sum(estimate_size(key, visited) + estimate_size(value, visited)
+                       for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        n_bytes += sum(estimate_size(d, visited) for d in obj)
+    elif hasattr(obj, '__dict__'):
+        n_bytes += estimate_size(vars(obj), visited)
+    elif type(obj).__module__ != 'builtins' and hasattr(obj, '__getstate__'):
+        # extension types (e.g., sklearn.tree._tree.Tree) expose their buffers in the state
+        n_bytes += estimate_size(obj.__getstate__(), visited)
+    return n_bytes
+
+
+class LRUCache():
+    """
+    A cache holding at most max_bytes (estimated) bytes of values.
+    When full, the least recently used values are evicted,
+    and on_evict, when given, is called with the key and size of each evicted value.
+    """
+    # the hits, misses and evictions are the statistics reported by info
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,
+                 max_bytes: int,
+                 on_evict: Optional[Callable[[Hashable, int], None]] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Get a value and mark it as recently used.
+
+        Args
+        ----
+        key : Hashable
+            The key of the value.
+
+        Returns
+        -------
+        value : Any
+            The cached value.
+
+        Raises
+        ------
+        KeyError
+            When the value is not in the cache.
+        """
+
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                raise KeyError(key)
+            self.hits += 1
+            self._items.move_to_end(key)
+            value, _ = self._items[key]
+            return value
+
+    def put(self, key: Hashable, value: Any, n_bytes: Optional[int] = None) -> None:
+        """
+        Put a value and evict the least recently used values if over the size budget.
+        A value larger than the whole budget is not kept.
+
+        Args
+        ----
+        key : Hashable
+            The key of the value.
+        value : Any
+            The value.
+        n_bytes : int, optional
+            The size of the value.
+            When not given, the size is estimated with estimate_size.
+        """
+
+        if n_bytes is None:
+            n_bytes = estimate_size(value)
+        evicted: List[Tuple[Hashable, int]] = []
+        with self._lock:
+            self._remove(key)
+            if n_bytes > self.max_bytes:
+                self.evictions += 1
+                evicted.append((key, n_bytes))
+            else:
+                self._items[key] = (value, n_bytes)
+                self.n_bytes += n_bytes
+                while self.n_bytes > self.max_bytes:
+                    oldest_key = next(iter(self._items))
+                    evicted.append((oldest_key, self._items[oldest_key][1]))
+                    self._remove(oldest_key)
+                    self.evictions += 1
+        # the callback runs outside the lock, such that it may use the cache
+        if self.on_evict is not None:
+            for evicted_key, evicted_n_bytes in evicted:
+                self.on_evict(evicted_key, evicted_n_bytes)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove a value if it is in the cache.
+
+        Args
+        ----
+        key : Hashable
+            The key of the value.
+        """
+
+        with self._lock:
+            self._remove(key)
+
+    def info(self) -> dict:
+        """
+        Get the statistics of the cache.
+
+        Returns
+        -------
+        info : dict
+            The numbers of hits, misses, evictions, items and bytes,
+            and the size budget.
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'nItems': len(self._items),
+                'nBytes': self.n_bytes,
+                'maxBytes': self.max_bytes,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        if key in self._items:
+            _, n_bytes = self._items.pop(key)
+            self.n_bytes -= n_bytes
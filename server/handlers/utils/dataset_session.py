@@ -0,0 +1,365 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Functions for keeping datasets on the server across requests.
+
+A dataset is registered once as a session.
+Afterwards, the requests only carry the session id
+together with the statuses and labels that changed since the last request,
+instead of the features of the whole pool.
+
+The sessions are kept in memory within a byte budget,
+the least recently used sessions evicted when over the budget,
+and the sessions not used for SESSION_TTL seconds expired.
+A request with an evicted or unknown session id gets a 404 response,
+upon which the client registers the dataset again.
+"""
+
+import time
+from typing import Dict, List, Optional, TypedDict, Union
+import uuid as uuid_lib
+
+import numpy as np
+from tornado.web import HTTPError
+
+from ..types import DataObject, Label, Status, StatusType
+from .data_persistence import LRUCache
+
+
+class Dataset(TypedDict):
+    """The data objects resolved from a request."""
+    uuids: List[str]
+    features: Optional[np.ndarray]
+    statuses: Optional[np.ndarray]
+    labels: Optional[List[Union[Label, None]]]
+
+
+class DatasetSession():
+    """
+    The dataset kept on the server.
+
+    The features are stored as a contiguous float32 array of shape (n_pool, n_features).
+    The statuses and labels are aligned with the rows of the features.
+    """
+
+    def __init__(self, data_objects: List[DataObject]):
+        self.uuids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.features: Optional[np.ndarray] = None
+        self.statuses = np.array([], dtype=object)
+        self.labels: List[Union[Label, None]] = []
+        self.append(data_objects)
+
+    def append(self, data_objects: List[DataObject]) -> None:
+        """
+        Add data objects to the session.
+        The features of data objects already in the session are overwritten.
+
+        Args
+        ----
+        data_objects : List[DataObject]
+            The data objects with features.
+        """
+
+        new_objects = [d for d in data_objects if d['uuid'] not in self.index]
+        for data_object in data_objects:
+            if data_object['uuid'] in self.index:
+                self.features[self.index[data_object['uuid']]] = \
+                    data_object['features']
+        if len(new_objects) == 0:
+            return
+
+        features = np.array([d['features'] for d in new_objects],
+                            dtype=np.float32)
+        self.features = features if self.features is None\
+            else np.ascontiguousarray(np.vstack((self.features, features)))
+        for data_object in new_objects:
+            self.index[data_object['uuid']] = len(self.uuids)
+            self.uuids.append(data_object['uuid'])
+        self.statuses = np.concatenate((
+            self.statuses,
+            np.full(len(new_objects), StatusType.New, dtype=object),
+        ))
+        self.labels += [None] * len(new_objects)
+
+    def update(self,
+               statuses: Optional[List[Status]] = None,
+               labels: Optional[List[Union[Label, None]]] = None,
+               cleared_labels: Optional[List[str]] = None) -> None:
+        """
+        Update the statuses and labels of data objects in the session.
+
+        Args
+        ----
+        statuses : List[Status], optional
+            The changed statuses, matched to the data objects by uuid.
+        labels : List[Label], optional
+            The changed labels, matched to the data objects by uuid.
+            The None entries (the data objects without label in the inline form)
+            are skipped, as they carry no uuid.
+        cleared_labels : List[str], optional
+            The uuids of the data objects whose label is removed.
+
+        Raises
+        ------
+        HTTPError
+            400 when a uuid is not in the session, before anything is updated.
+        """
+
+        statuses = statuses if statuses is not None else []
+        labels = [label for label in (labels if labels is not None else [])
+                  if label is not None]
+        cleared_labels = cleared_labels if cleared_labels is not None else []
+        status_indices = self.get_indices([status['uuid'] for status in statuses])
+        label_indices = self.get_indices([label['uuid'] for label in labels])
+        cleared_indices = self.get_indices(cleared_labels)
+
+        for i, status in zip(status_indices, statuses):
+            self.statuses[i] = status['value']
+        for i, label in zip(label_indices, labels):
+            self.labels[i] = label
+        for i in cleared_indices:
+            self.labels[i] = None
+
+    def get_indices(self, uuids: List[str]) -> np.ndarray:
+        """
+        Get the rows of data objects in the session.
+
+        Args
+        ----
+        uuids : List[str]
+            The uuids of the data objects.
+
+        Returns
+        -------
+        indices : np.ndarray of int values, shape = (n_objects,)
+            The row of each data object.
+
+        Raises
+        ------
+        HTTPError
+            400 when a uuid is not in the session.
+        """
+
+        try:
+            return np.array([self.index[uuid] for uuid in uuids], dtype=int)
+        except KeyError as error:
+            raise HTTPError(400, reason=f'Unknown uuid: {error.args[0]}') from None
+
+    @property
+    def n_bytes(self) -> int:
+        """
+        The size of the session counted against the budget,
+        the size of the feature matrix, which dominates it.
+        """
+
+        return 0 if self.features is None else self.features.nbytes
+
+    def subset(self, uuids: Optional[List[str]] = None) -> Dataset:
+        """
+        Get the data objects in the session.
+
+        Args
+        ----
+        uuids : List[str], optional
+            The uuids of the data objects to get.
+            When not given, all the data objects are returned.
+
+        Returns
+        -------
+        dataset : Dataset
+            The uuids, features, statuses and labels of the data objects.
+
+        Raises
+        ------
+        HTTPError
+            400 when a uuid is not in the session.
+        """
+
+        if uuids is None:
+            return {
+                'uuids': list(self.uuids),
+                'features': self.features,
+                'statuses': self.statuses.astype(str),
+                'labels': list(self.labels),
+            }
+        indices = self.get_indices(uuids)
+        return {
+            'uuids': list(uuids),
+            'features': self.features[indices],
+            'statuses': self.statuses[indices].astype(str),
+            'labels': [self.labels[i] for i in indices],
+        }
+
+
+# pylint: disable=pointless-string-statement
+"""
+The maximum number of bytes of the sessions kept in memory.
+"""
+SESSIONS_MAX_BYTES = 2 << 30
+
+"""
+The number of seconds after which a session not used is expired.
+"""
+SESSION_TTL = 24 * 60 * 60
+
+"""
+The registered sessions, keyed by session id.
+"""
+SESSIONS = LRUCache(SESSIONS_MAX_BYTES)
+
+"""
+The time each session was last used, as time.monotonic().
+"""
+_LAST_USED: Dict[str, float] = {}
+
+
+def _expire_sessions() -> None:
+    now = time.monotonic()
+    for session_id, last_used in list(_LAST_USED.items()):
+        if now - last_used > SESSION_TTL or session_id not in SESSIONS:
+            SESSIONS.pop(session_id)
+            del _LAST_USED[session_id]
+
+
+def _put_session(session_id: str, session: DatasetSession) -> None:
+    if session.n_bytes > SESSIONS.max_bytes:
+        raise HTTPError(413, reason='The dataset exceeds the session size budget')
+    SESSIONS.put(session_id, session, session.n_bytes)
+    _LAST_USED[session_id] = time.monotonic()
+
+
+def register_session(data_objects: List[DataObject]) -> str:
+    """
+    Register a dataset as a session.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects with features.
+
+    Returns
+    -------
+    session_id : str
+        The id of the session.
+    """
+
+    _expire_sessions()
+    session_id = uuid_lib.uuid4().hex
+    _put_session(session_id, DatasetSession(data_objects))
+    return session_id
+
+
+def get_session(session_id: str) -> DatasetSession:
+    """
+    Get a registered session.
+
+    Args
+    ----
+    session_id : str
+        The id of the session.
+
+    Returns
+    -------
+    session : DatasetSession
+        The session.
+
+    Raises
+    ------
+    HTTPError
+        404 when the session is unknown, evicted or expired.
+    """
+
+    _expire_sessions()
+    try:
+        session = SESSIONS.get(session_id)
+    except KeyError:
+        raise HTTPError(404, reason=f'Invalid session id: {session_id}') from None
+    _LAST_USED[session_id] = time.monotonic()
+    return session
+
+
+def append_to_session(session_id: str, data_objects: List[DataObject]) -> DatasetSession:
+    """
+    Add data objects to a registered session,
+    and count the grown session against the budget.
+
+    Args
+    ----
+    session_id : str
+        The id of the session.
+    data_objects : List[DataObject]
+        The data objects with features.
+
+    Returns
+    -------
+    session : DatasetSession
+        The session.
+    """
+
+    session = get_session(session_id)
+    session.append(data_objects)
+    _put_session(session_id, session)
+    return session
+
+
+def remove_session(session_id: str) -> None:
+    """
+    Remove a registered session.
+
+    Args
+    ----
+    session_id : str
+        The id of the session.
+    """
+
+    SESSIONS.pop(session_id)
+    _LAST_USED.pop(session_id, None)
+
+
+def resolve_dataset(json_data: dict, with_features: bool = True) -> Dataset:
+    """
+    Resolve the data objects of a request,
+    given either inline or as a reference to a session.
+
+    In the inline form, the request has 'dataObjects',
+    and optionally 'statuses' and 'labels' aligned with the data objects.
+    In the session form, the request has 'sessionId',
+    and optionally 'statuses' and 'labels' that changed since the last request,
+    'clearedLabels' with the uuids of the data objects whose label is removed,
+    and 'uuids' restricting the data objects to a subset.
+
+    Args
+    ----
+    json_data : dict
+        The parsed request body.
+    with_features : bool
+        Whether to build the features of inline data objects.
+
+    Returns
+    -------
+    dataset : Dataset
+        The uuids, features, statuses and labels of the data objects.
+        The entries not available in the request are None.
+    """
+
+    if 'sessionId' in json_data:
+        session = get_session(json_data['sessionId'])
+        session.update(json_data.get('statuses'), json_data.get('labels'),
+                       json_data.get('clearedLabels'))
+        return session.subset(json_data.get('uuids'))
+
+    data_objects: List[DataObject] = json_data['dataObjects']
+    uuids = [(d['uuid'] if 'uuid' in d else None) for d in data_objects]
+    features = np.array([(d['features'] if 'features' in d else None)
+                         for d in data_objects]) if with_features else None
+    statuses = np.array([d['value'] for d in json_data['statuses']], dtype=str)\
+        if json_data.get('statuses') is not None else None
+    labels = json_data.get('labels')
+    return {
+        'uuids': uuids,
+        'features': features,
+        'statuses': statuses,
+        'labels': labels,
+    }
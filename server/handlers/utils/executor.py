@@ -0,0 +1,189 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Functions for running CPU-bound computation outside the IOLoop.
+
+The handlers parse the request and write the response on the IOLoop,
+while the computation is submitted to a shared process or thread pool.
+The number of jobs running concurrently for each endpoint is bounded,
+such that a heavy endpoint (e.g., TSNE projection) cannot occupy all the workers.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import functools
+import os
+from typing import Any, Callable, Dict, Optional
+
+from tornado.ioloop import IOLoop
+from tornado.locks import Semaphore
+
+
+# pylint: disable=pointless-string-statement
+"""
+The kind of the executor, takes value in ['process', 'thread'].
+"""
+EXECUTOR_KIND = 'process'
+
+"""
+The number of workers of the executor.
+When None, the number of processors on the machine is used.
+"""
+MAX_WORKERS: Optional[int] = None
+
+"""
+The number of jobs allowed to run concurrently for an endpoint
+not listed in MAX_CONCURRENCY.
+"""
+DEFAULT_MAX_CONCURRENCY = 2
+
+"""
+The number of jobs allowed to run concurrently for specific endpoints.
+"""
+MAX_CONCURRENCY: Dict[str, int] = {
+    '/projection/MDS': 1,
+    '/projection/TSNE': 1,
+}
+
+_EXECUTOR: Optional[Executor] = None
+_SEMAPHORES: Dict[str, Semaphore] = {}
+
+
+def configure(kind: Optional[str] = None,
+              max_workers: Optional[int] = None,
+              default_max_concurrency: Optional[int] = None) -> None:
+    """
+    Configure the executor.
+    Should be called before the first job is submitted.
+
+    Args
+    ----
+    kind : str, optional
+        The kind of the executor, takes value in ['process', 'thread'].
+    max_workers : int, optional
+        The number of workers of the executor.
+    default_max_concurrency : int, optional
+        The number of jobs allowed to run concurrently for an endpoint.
+    """
+    # pylint: disable=global-statement
+
+    global EXECUTOR_KIND, MAX_WORKERS, DEFAULT_MAX_CONCURRENCY
+
+    assert _EXECUTOR is None, 'the executor is already started'
+
+    if kind is not None:
+        assert kind in ['process', 'thread'], f'Invalid executor kind: {kind}'
+        EXECUTOR_KIND = kind
+    if max_workers is not None:
+        MAX_WORKERS = max_workers
+    if default_max_concurrency is not None:
+        DEFAULT_MAX_CONCURRENCY = default_max_concurrency
+
+
+def get_executor() -> Executor:
+    """
+    Get the shared executor, which is created on first use.
+
+    Returns
+    -------
+    executor : Executor
+        The executor running the computation.
+    """
+    # pylint: disable=global-statement
+
+    global _EXECUTOR
+
+    if _EXECUTOR is None:
+        if EXECUTOR_KIND == 'process':
+            _EXECUTOR = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        else:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _EXECUTOR
+
+
+def shutdown(wait: bool = True) -> None:
+    """
+    Shut down the shared executor.
+
+    Args
+    ----
+    wait : bool
+        Whether to wait for the pending jobs to finish.
+    """
+    # pylint: disable=global-statement
+
+    global _EXECUTOR
+
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=wait)
+        _EXECUTOR = None
+
+
+def get_worker_threads() -> int:
+    """
+    Get the number of threads a job can use without oversubscribing the processors,
+    which are shared by the workers of the executor.
+    Called in a worker, it reads the configuration the worker was forked with,
+    and gives 1 when the worker does not know it.
+
+    Returns
+    -------
+    n_threads : int
+        The share of the processors of a worker, at least 1.
+    """
+
+    n_processors = os.cpu_count() or 1
+    return max(1, n_processors // (MAX_WORKERS or n_processors))
+
+
+def get_semaphore(endpoint: str) -> Semaphore:
+    """
+    Get the semaphore bounding the concurrent jobs of an endpoint.
+
+    Args
+    ----
+    endpoint : str
+        The path of the endpoint.
+
+    Returns
+    -------
+    semaphore : Semaphore
+        The semaphore of the endpoint.
+    """
+
+    if endpoint not in _SEMAPHORES:
+        max_concurrency = MAX_CONCURRENCY.get(endpoint, DEFAULT_MAX_CONCURRENCY)
+        _SEMAPHORES[endpoint] = Semaphore(max_concurrency)
+    return _SEMAPHORES[endpoint]
+
+
+async def run_in_executor(endpoint: str,
+                          fn: Callable[..., Any],
+                          *args: Any,
+                          **kwargs: Any) -> Any:
+    """
+    Run a function in the shared executor without blocking the IOLoop.
+
+    Args
+    ----
+    endpoint : str
+        The path of the endpoint submitting the job.
+        Jobs of the same endpoint share the concurrency limit.
+    fn : Callable
+        The function to run.
+        When the executor is a process pool,
+        the function and the arguments need to be picklable.
+    *args : Any
+        The positional arguments of the function.
+    **kwargs : Any
+        The keyword arguments of the function.
+
+    Returns
+    -------
+    result : Any
+        The return value of the function.
+    """
+
+    async with get_semaphore(endpoint):
+        return await IOLoop.current().run_in_executor(
+            get_executor(), functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,34 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The content digest of arrays, for keying the cached results computed from them.
+"""
+
+import hashlib
+
+import numpy as np
+
+
+def fingerprint(X: np.ndarray) -> str:
+    """
+    Compute a digest identifying the content of an array,
+    for keying the results computed from the array.
+
+    Args
+    ----
+    X : np.ndarray
+        The array.
+
+    Returns
+    -------
+    digest : str
+        The hex digest of the shape, dtype and data of the array.
+    """
+    # pylint: disable=invalid-name
+
+    X = np.ascontiguousarray(X)
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(str((X.shape, X.dtype.str)).encode())
+    hasher.update(memoryview(X).cast('B'))
+    return hasher.hexdigest()
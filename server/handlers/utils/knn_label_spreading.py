@@ -0,0 +1,209 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Label spreading on a sparse k-nearest-neighbor graph,
+with an approximate neighbor search for large pools.
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+import scipy.sparse
+from sklearn.neighbors import NearestNeighbors
+from sklearn.semi_supervised import LabelSpreading
+from sklearn.utils import check_random_state
+from sklearn.utils.validation import check_array, check_is_fitted
+
+from .fingerprint import fingerprint
+
+
+# pylint: disable=pointless-string-statement
+"""
+The largest number of samples for which the neighbors are searched exactly.
+The exact search takes O(n^2) time when the features have more than a few dimensions.
+"""
+EXACT_MAX_SAMPLES = 20000
+
+
+def _leaf_kneighbors(X: np.ndarray,
+                     leaf: np.ndarray,
+                     n_neighbors: int) -> tuple:
+    # pylint: disable=invalid-name
+    X_leaf = X[leaf]
+    squared_norms = np.einsum('ij,ij->i', X_leaf, X_leaf)
+    distances = squared_norms[:, None] + squared_norms[None, :]\
+        - 2 * (X_leaf @ X_leaf.T)
+    nearest = np.argpartition(distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+    return leaf[nearest], np.take_along_axis(distances, nearest, axis=1)
+
+
+def _merge_candidates(indices: np.ndarray,
+                      distances: np.ndarray,
+                      n_neighbors: int) -> tuple:
+    # keep the n_neighbors nearest distinct candidates of each row
+    order = np.argsort(indices, axis=1, kind='stable')
+    indices = np.take_along_axis(indices, order, axis=1)
+    distances = np.take_along_axis(distances, order, axis=1)
+    distances[:, 1:][indices[:, 1:] == indices[:, :-1]] = np.inf
+    nearest = np.argsort(distances, axis=1, kind='stable')[:, :n_neighbors]
+    return (np.take_along_axis(indices, nearest, axis=1),
+            np.take_along_axis(distances, nearest, axis=1))
+
+
+def approximate_kneighbors(X: np.ndarray,
+                           n_neighbors: int,
+                           n_trees: int = 4,
+                           leaf_size: int = 256,
+                           batch_size: int = 4096,
+                           random_state: Union[int, np.random.RandomState, None] = 0,
+                           ) -> np.ndarray:
+    """
+    Search the approximate nearest neighbors of each sample among the samples.
+
+    The samples are split recursively at the median of a random projection
+    until the leaves hold at most leaf_size samples,
+    and the neighbors are searched exactly within the leaves.
+    The candidates of n_trees such trees are merged,
+    and refined once with the neighbors of the neighbors.
+    The search takes O(n log n) time.
+
+    Args
+    ----
+    X : np.ndarray, shape = (n_samples, n_features)
+        The samples.
+    n_neighbors : int
+        The number of neighbors of each sample, the sample itself included.
+    n_trees : int, optional (default=4)
+        The number of random projection trees.
+    leaf_size : int, optional (default=256)
+        The maximum number of samples in a leaf.
+    batch_size : int, optional (default=4096)
+        The number of samples refined at a time, bounding the memory usage.
+    random_state : Union[int, np.random.RandomState, None], optional (default=0)
+        The random number generator for the projections.
+
+    Returns
+    -------
+    neighbors : np.ndarray of int values, shape = (n_samples, n_neighbors)
+        The indices of the neighbors of each sample, sorted by increasing distances.
+    """
+    # pylint: disable=invalid-name
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-locals
+
+    X = np.asarray(X, dtype=np.float64)
+    n_samples = X.shape[0]
+    n_neighbors = min(n_neighbors, n_samples)
+    leaf_size = max(leaf_size, 2 * n_neighbors)
+    random_state = check_random_state(random_state)
+
+    candidate_indices = []
+    candidate_distances = []
+    for _ in range(n_trees):
+        tree_indices = np.empty((n_samples, n_neighbors), dtype=np.intp)
+        tree_distances = np.empty((n_samples, n_neighbors))
+        nodes = [np.arange(n_samples)]
+        while len(nodes) != 0:
+            node = nodes.pop()
+            if len(node) <= leaf_size:
+                tree_indices[node], tree_distances[node] = _leaf_kneighbors(
+                    X, node, n_neighbors)
+                continue
+            projection = X[node] @ random_state.normal(size=X.shape[1])
+            order = np.argsort(projection, kind='stable')
+            nodes.append(node[order[:len(node) // 2]])
+            nodes.append(node[order[len(node) // 2:]])
+        candidate_indices.append(tree_indices)
+        candidate_distances.append(tree_distances)
+    neighbors, _ = _merge_candidates(np.hstack(candidate_indices),
+                                     np.hstack(candidate_distances),
+                                     n_neighbors)
+
+    # refine with the neighbors of the neighbors
+    squared_norms = np.einsum('ij,ij->i', X, X)
+    refined = np.empty_like(neighbors)
+    for start in range(0, n_samples, batch_size):
+        rows = np.arange(start, min(start + batch_size, n_samples))
+        candidates = neighbors[neighbors[rows]].reshape(len(rows), -1)
+        distances = squared_norms[rows, None] + squared_norms[candidates]\
+            - 2 * np.einsum('ij,ikj->ik', X[rows], X[candidates])
+        refined[rows], _ = _merge_candidates(candidates, distances, n_neighbors)
+    return refined
+
+
+class KNNLabelSpreading(LabelSpreading):
+    """
+    LabelSpreading on a sparse k-nearest-neighbor graph.
+
+    The dense RBF kernel of LabelSpreading takes O(n^2) time and memory.
+    The k-nearest-neighbor graph has n * n_neighbors entries,
+    and is kept with the estimator and reused by the following fits
+    as long as the features are unchanged, i.e., when only the labels change.
+    Beyond EXACT_MAX_SAMPLES samples, the graph is built from
+    approximate neighbors, such that the cost is near-linear in the pool size.
+    """
+    # pylint: disable=too-many-ancestors
+
+    def __init__(self,
+                 n_neighbors: int = 10,
+                 alpha: float = 0.2,
+                 max_iter: int = 30,
+                 tol: float = 1e-3,
+                 n_jobs: Optional[int] = None):
+        # pylint: disable=too-many-arguments
+        super().__init__(kernel='knn', n_neighbors=n_neighbors,
+                         alpha=alpha, max_iter=max_iter, tol=tol, n_jobs=n_jobs)
+        # the neighbor search and the graph of the last fit, reused by the following fits
+        self.nn_fit: Optional[NearestNeighbors] = None
+        self.neighbors_: Optional[np.ndarray] = None
+        self.graph_: Optional[scipy.sparse.csr_matrix] = None
+        self.graph_key_: Optional[tuple] = None
+
+    def _get_kernel(self, X, y=None):
+        # pylint: disable=invalid-name
+        if y is not None:
+            return super()._get_kernel(X, y)
+
+        # The connectivity graph built from the neighbor indices,
+        # same as NearestNeighbors.kneighbors_graph,
+        # the indices are kept for predicting the training samples.
+        n_samples = X.shape[0]
+        n_neighbors = min(self.n_neighbors, n_samples)
+        self.nn_fit = NearestNeighbors(n_neighbors=n_neighbors,
+                                       n_jobs=self.n_jobs).fit(X)
+        if n_samples <= EXACT_MAX_SAMPLES or scipy.sparse.issparse(X):
+            self.neighbors_ = self.nn_fit.kneighbors(X, return_distance=False)
+        else:
+            self.neighbors_ = approximate_kneighbors(X, n_neighbors)
+        return scipy.sparse.csr_matrix(
+            (np.ones(n_samples * n_neighbors),
+             self.neighbors_.ravel(),
+             np.arange(0, n_samples * n_neighbors + 1, n_neighbors)),
+            shape=(n_samples, n_samples),
+        )
+
+    def _build_graph(self):
+        graph_key = (fingerprint(self.X_), self.n_neighbors)
+        if self.graph_key_ != graph_key:
+            self.graph_ = super()._build_graph().tocsr()
+            self.graph_key_ = graph_key
+        return self.graph_
+
+    def predict_proba(self, X):
+        # pylint: disable=invalid-name
+        # the attributes declared in __init__ don't tell whether the estimator is fitted
+        check_is_fitted(self, 'label_distributions_')
+
+        X = check_array(X, accept_sparse=['csr'])
+        if X.shape[1] != self.X_.shape[1]:
+            raise ValueError(f'X has {X.shape[1]} features, '
+                             f'but {type(self).__name__} is expecting {self.X_.shape[1]} features')
+        if not scipy.sparse.issparse(X) and fingerprint(X) == self.graph_key_[0]:
+            neighbors = self.neighbors_
+        else:
+            neighbors = self.nn_fit.kneighbors(X, return_distance=False)
+        probabilities = self.label_distributions_[neighbors].sum(axis=1)
+        normalizer = probabilities.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        return probabilities / normalizer
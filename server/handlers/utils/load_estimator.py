@@ -3,7 +3,7 @@
 
 from bson.objectid import ObjectId
 from sklearn.base import BaseEstimator
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.neural_network import BernoulliRBM
 from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
@@ -12,6 +12,7 @@ from sklearn.svm import SVC
 from sklearn.tree import DecisionTreeClassifier
 
 from .data_persistence import is_saved, load, save
+from .knn_label_spreading import KNNLabelSpreading
 from ..types import Model
 
 def load_estimator(model: Model) -> BaseEstimator:
@@ -24,6 +25,8 @@ def load_estimator(model: Model) -> BaseEstimator:
         'LogisticRegression',
         'RestrictedBoltzmannMachine',
         'LabelSpreading',
+        'LabelSpreadingKNN',
+        'SGD',
     ]
 
     if is_saved(inserted_id=ObjectId(estimator_id)):
@@ -41,10 +44,17 @@ def load_estimator(model: Model) -> BaseEstimator:
             )
         if estimator_type == 'LabelSpreading':
             estimator = LabelSpreading(gamma=0.25, max_iter=20)
+        if estimator_type == 'LabelSpreadingKNN':
+            estimator = KNNLabelSpreading()
         if estimator_type == 'RestrictedBoltzmannMachine':
             estimator = make_pipeline(
                 BernoulliRBM(random_state=0),
                 LogisticRegression(solver='newton-cg', tol=1),
             )
+        if estimator_type == 'SGD':
+            estimator = make_pipeline(
+                StandardScaler(),
+                SGDClassifier(loss='modified_huber', random_state=0),
+            )
         save(data=estimator, inserted_id=ObjectId(estimator_id))
     return estimator
@@ -0,0 +1,146 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Functions for coalescing the training requests of the same model.
+
+The requests for a model are queued by the model objectId.
+While a training run is in flight, newer requests replace each other,
+such that a burst of requests results in a single follow-up run on the newest labels.
+Each run commits its result and resolves the requesters it was started for,
+such that the requesters never wait for more than the in-flight run and the follow-up run,
+however steady the stream of requests.
+All the coroutines run on the IOLoop, thus the queues need no locking.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+
+
+# pylint: disable=pointless-string-statement
+"""
+The number of seconds to wait for more requests before starting a run.
+"""
+DEBOUNCE_SECONDS = 0.05
+
+
+class _ModelQueue():
+    """
+    The training requests of a model.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        # the newest request not yet started: (train, commit)
+        self.latest: Optional[tuple] = None
+        # the requesters awaiting the result of the next run
+        self.waiters: List[Future] = []
+
+
+_QUEUES: Dict[str, _ModelQueue] = {}
+_METRICS = {
+    'nRequests': 0,
+    'nCoalesced': 0,
+    'nRuns': 0,
+    'nFailed': 0,
+}
+
+
+async def schedule(key: str,
+                   train: Callable[[], Awaitable[Any]],
+                   commit: Callable[[Any], None]) -> Any:
+    """
+    Request a training run and await the result shared by the coalesced requests.
+
+    Args
+    ----
+    key : str
+        The key of the model, i.e., the model objectId.
+    train : Callable[[], Awaitable[Any]]
+        The coroutine function computing the trained model.
+    commit : Callable[[Any], None]
+        The function saving the trained model.
+
+    Returns
+    -------
+    result : Any
+        The trained model of the run started after the request,
+        on the newest request received before the run started.
+    """
+
+    queue = _QUEUES.get(key)
+    is_idle = queue is None
+    if is_idle:
+        queue = _ModelQueue()
+        _QUEUES[key] = queue
+
+    _METRICS['nRequests'] += 1
+    if queue.latest is not None:
+        _METRICS['nCoalesced'] += 1
+    queue.latest = (train, commit)
+    future = Future()
+    queue.waiters.append(future)
+
+    if is_idle:
+        IOLoop.current().spawn_callback(_drain, key)
+    return await future
+
+
+async def _drain(key: str) -> None:
+    """
+    Run the queued requests of a model one after another,
+    each run on the newest request received before it started.
+
+    Args
+    ----
+    key : str
+        The key of the model, i.e., the model objectId.
+    """
+
+    queue = _QUEUES[key]
+    try:
+        while queue.latest is not None:
+            await gen.sleep(DEBOUNCE_SECONDS)
+            train, commit = queue.latest
+            queue.latest = None
+            waiters, queue.waiters = queue.waiters, []
+
+            try:
+                result = await train()
+                commit(result)
+            except Exception as error:  # pylint: disable=broad-except
+                _METRICS['nFailed'] += 1
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(error)
+                continue
+
+            _METRICS['nRuns'] += 1
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
+    finally:
+        del _QUEUES[key]
+
+
+def get_metrics() -> dict:
+    """
+    Get the statistics of the scheduler.
+
+    Returns
+    -------
+    metrics : dict
+        The numbers of requests received, requests coalesced into newer ones,
+        runs committed and runs failed,
+        together with the current queue depth, i.e., the number of models
+        with queued requests and the number of requesters waiting for a run to start.
+    """
+
+    return {
+        **_METRICS,
+        'nModelsQueued': len(_QUEUES),
+        'nWaiting': sum(len(d.waiters) for d in _QUEUES.values()),
+    }
@@ -0,0 +1,202 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Functions for streaming feature extraction responses as NDJSON.
+
+When the request has header 'Accept: application/x-ndjson',
+the feature extraction handlers describe the data objects in chunks,
+and write one JSON event per line, flushed as soon as it is ready:
+- {"type": "progress", "done", "total"} after each described chunk;
+- {"type": "featureNames", "featureNames"} once the features are computed;
+- {"type": "features", "start", "features"} for each chunk of rows,
+  where start is the index of the first row;
+- {"type": "done"} at the end.
+
+Only one chunk of data objects is decoded at a time,
+the server keeps the per-object descriptors needed by the dataset-level
+reducers (e.g., SVD), and the rows are serialized one chunk at a time.
+When the reducer is fixed (e.g., persisted with 'reducerId'),
+each chunk is described and reduced in one job,
+and its rows are flushed before the next chunk is described,
+such that the first rows arrive after one chunk instead of the whole pool.
+The extraction stops when the client disconnects.
+"""
+
+import json
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from tornado.httputil import HTTPServerRequest
+from tornado.iostream import StreamClosedError
+from tornado.web import RequestHandler
+
+from ..types import DataObject
+from .executor import run_in_executor
+from .wire_format import get_accepted_types, to_json_compatible
+
+
+# pylint: disable=pointless-string-statement
+"""
+The MIME type of newline delimited JSON.
+"""
+MIME_NDJSON = 'application/x-ndjson'
+
+"""
+The number of data objects described by a job, and of rows in an event.
+"""
+CHUNK_SIZE = 256
+
+
+def accepts_ndjson(request: HTTPServerRequest) -> bool:
+    """
+    Check whether the response to a request can be streamed as NDJSON.
+
+    Args
+    ----
+    request : HTTPServerRequest
+        The request.
+
+    Returns
+    -------
+    accepts_ndjson : bool
+        Whether the Accept header of the request lists NDJSON with a nonzero quality.
+    """
+
+    return MIME_NDJSON in get_accepted_types(request)
+
+
+async def write_event(handler: RequestHandler, event: dict) -> None:
+    """
+    Write an event as a line of JSON and flush it to the client.
+
+    Args
+    ----
+    handler : RequestHandler
+        The handler writing the response.
+    event : dict
+        The event, possibly containing numpy arrays.
+    """
+
+    handler.write(json.dumps(to_json_compatible(event)) + '\n')
+    await handler.flush()
+
+
+def describe_and_reduce(data_objects: List[DataObject],
+                        describe: Callable[[List[DataObject]], Dict[str, np.ndarray]],
+                        reduce: Callable[[Dict[str, np.ndarray]],
+                                         Tuple[np.ndarray, List[str]]],
+                        ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Describe a chunk of data objects and reduce the descriptors of the chunk.
+
+    Args
+    ----
+    data_objects : List[DataObject]
+        The data objects of the chunk.
+    describe : Callable[[List[DataObject]], Dict[str, np.ndarray]]
+        The module-level function computing the per-object descriptors.
+    reduce : Callable[[Dict[str, np.ndarray]], Tuple[np.ndarray, List[str]]]
+        The module-level function computing the features of the chunk
+        with a fixed reducer.
+
+    Returns
+    -------
+    X : np.ndarray
+        The features of the chunk.
+    feature_names : List[str]
+        The names of features.
+    """
+
+    return reduce(describe(data_objects))
+
+
+async def stream_features(handler: RequestHandler,
+                          data_objects: List[DataObject],
+                          describe: Callable[[List[DataObject]], Dict[str, np.ndarray]],
+                          reduce: Callable[[Dict[str, np.ndarray]], Tuple[np.ndarray, List[str]]],
+                          chunk_size: int = CHUNK_SIZE,
+                          reduce_chunks: bool = False) -> None:
+    """
+    Extract features in chunks and stream them as NDJSON events.
+
+    Args
+    ----
+    handler : RequestHandler
+        The handler writing the response.
+    data_objects : List[DataObject]
+        The data objects.
+    describe : Callable[[List[DataObject]], Dict[str, np.ndarray]]
+        The module-level function computing the per-object descriptors
+        of a chunk, as named arrays whose first dimension indexes the objects.
+    reduce : Callable[[Dict[str, np.ndarray]], Tuple[np.ndarray, List[str]]]
+        The module-level function computing the features and feature names
+        from the descriptors of all the objects.
+    chunk_size : int, optional (default=CHUNK_SIZE)
+        The number of data objects described by a job.
+    reduce_chunks : bool, optional (default=False)
+        Whether reduce computes the features of each chunk on its own,
+        i.e., the reducer is fixed, such that the rows of a chunk
+        are streamed as soon as it is described.
+    """
+    # pylint: disable=too-many-arguments
+
+    handler.set_header('Content-Type', MIME_NDJSON)
+    handler.set_header('Vary', 'Accept')
+    path = handler.request.path
+    n_objects = len(data_objects)
+
+    try:
+        if reduce_chunks:
+            for start in range(0, n_objects, chunk_size):
+                features, feature_names = await run_in_executor(
+                    path, describe_and_reduce,
+                    data_objects[start:start + chunk_size], describe, reduce)
+                await write_event(handler, {
+                    'type': 'progress',
+                    'done': min(start + chunk_size, n_objects),
+                    'total': n_objects,
+                })
+                if start == 0:
+                    await write_event(handler, {
+                        'type': 'featureNames',
+                        'featureNames': feature_names,
+                    })
+                await write_event(handler, {
+                    'type': 'features',
+                    'start': start,
+                    'features': features,
+                })
+            await write_event(handler, {'type': 'done'})
+            return
+
+        chunks: Dict[str, List[np.ndarray]] = {}
+        for start in range(0, n_objects, chunk_size):
+            descriptors = await run_in_executor(
+                path, describe, data_objects[start:start + chunk_size])
+            for name, values in descriptors.items():
+                chunks.setdefault(name, []).append(values)
+            await write_event(handler, {
+                'type': 'progress',
+                'done': min(start + chunk_size, n_objects),
+                'total': n_objects,
+            })
+
+        features, feature_names = await run_in_executor(
+            path, reduce, {name: np.concatenate(values)
+                           for name, values in chunks.items()})
+        del chunks
+        await write_event(handler, {
+            'type': 'featureNames',
+            'featureNames': feature_names,
+        })
+        for start in range(0, n_objects, chunk_size):
+            await write_event(handler, {
+                'type': 'features',
+                'start': start,
+                'features': features[start:start + chunk_size],
+            })
+        await write_event(handler, {'type': 'done'})
+    except StreamClosedError:
+        # the client disconnected, the remaining chunks are not computed
+        return
@@ -0,0 +1,217 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Functions for encoding and decoding request and response bodies.
+
+JSON is the default format.
+When the request has header 'Content-Type: application/msgpack',
+the body is decoded as msgpack.
+When the request has header 'Accept: application/msgpack',
+the response is encoded as msgpack.
+
+In msgpack bodies, numpy arrays are stored as the msgpack extension type
+NDARRAY_EXT_TYPE, whose payload is the array in the .npy format.
+The arrays are decoded with np.frombuffer without copying the payload,
+and are thus read-only.
+
+The handlers derive from CorsRequestHandler, which answers the CORS preflight
+of the requests that are not simple requests for the browser
+(e.g., with 'Content-Type: application/msgpack').
+"""
+
+import io
+import json
+from typing import Any, List
+
+import msgpack
+import numpy as np
+from tornado.httputil import HTTPServerRequest
+from tornado.web import RequestHandler
+
+
+# pylint: disable=pointless-string-statement
+"""
+The MIME types of the supported formats.
+"""
+MIME_JSON = 'application/json'
+MIME_MSGPACK = 'application/msgpack'
+MIME_MSGPACK_ALIASES = [MIME_MSGPACK, 'application/x-msgpack']
+
+"""
+The request headers and methods allowed for cross-origin requests.
+"""
+CORS_ALLOW_HEADERS = 'Content-Type, Accept'
+CORS_ALLOW_METHODS = 'GET, POST, OPTIONS'
+
+"""
+The msgpack extension type code of numpy arrays.
+"""
+NDARRAY_EXT_TYPE = 1
+
+
+def _encode_ndarray(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, np.ascontiguousarray(obj),
+                                  allow_pickle=False)
+        return msgpack.ExtType(NDARRAY_EXT_TYPE, buffer.getvalue())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj)} is not msgpack serializable')
+
+
+def _decode_ndarray(code: int, data: bytes) -> Any:
+    if code != NDARRAY_EXT_TYPE:
+        return msgpack.ExtType(code, data)
+    buffer = io.BytesIO(data)
+    version = np.lib.format.read_magic(buffer)
+    if version == (1, 0):
+        header = np.lib.format.read_array_header_1_0(buffer)
+    else:
+        header = np.lib.format.read_array_header_2_0(buffer)
+    shape, fortran_order, dtype = header
+    count = int(np.prod(shape, dtype=np.int64))
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    array = np.frombuffer(data, dtype=dtype, count=count, offset=buffer.tell())
+    order = 'F' if fortran_order else 'C'
+    return array.reshape(shape, order=order)
+
+
+def to_json_compatible(obj: Any) -> Any:
+    """
+    Convert the numpy arrays and scalars in a nested object to python lists and scalars.
+
+    Args
+    ----
+    obj : Any
+        The object possibly containing numpy values.
+
+    Returns
+    -------
+    obj : Any
+        The object that can be dumped to JSON.
+    """
+
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    if isinstance(obj, dict):
+        return {key: to_json_compatible(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_json_compatible(value) for value in obj]
+    return obj
+
+
+def parse_body(request: HTTPServerRequest) -> Any:
+    """
+    Decode the body of a request according to its Content-Type header.
+
+    Args
+    ----
+    request : HTTPServerRequest
+        The request.
+
+    Returns
+    -------
+    data : Any
+        The decoded body.
+    """
+
+    content_type = request.headers.get('Content-Type', MIME_JSON)
+    content_type = content_type.split(';', 1)[0].strip().lower()
+    if content_type in MIME_MSGPACK_ALIASES:
+        return msgpack.unpackb(request.body, raw=False,
+                               ext_hook=_decode_ndarray)
+    return json.loads(request.body)
+
+
+class CorsRequestHandler(RequestHandler):
+    """
+    The base of the handlers, allowing cross-origin requests
+    in the default headers of every response (including the error responses),
+    and answering the CORS preflight requests.
+    """
+
+    def set_default_headers(self):
+        self.set_header('Access-Control-Allow-Origin', '*')
+        self.set_header('Access-Control-Allow-Headers', CORS_ALLOW_HEADERS)
+        self.set_header('Access-Control-Allow-Methods', CORS_ALLOW_METHODS)
+
+    def options(self, *args):
+        """Answer the preflight request."""
+        # pylint: disable=unused-argument
+        self.set_status(204)
+        self.finish()
+
+
+def get_accepted_types(request: HTTPServerRequest) -> List[str]:
+    """
+    Get the media types accepted by the client.
+
+    Args
+    ----
+    request : HTTPServerRequest
+        The request.
+
+    Returns
+    -------
+    media_types : List[str]
+        The lowercase media types listed in the Accept header of the request,
+        except those with quality value 0, which the client refuses.
+    """
+
+    accept = request.headers.get('Accept', '')
+    media_types = []
+    for media_range in accept.split(','):
+        media_type, *params = [d.strip().lower() for d in media_range.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type != '' and quality > 0:
+            media_types.append(media_type)
+    return media_types
+
+
+def accepts_msgpack(request: HTTPServerRequest) -> bool:
+    """
+    Check whether the response to a request can be encoded as msgpack.
+
+    Args
+    ----
+    request : HTTPServerRequest
+        The request.
+
+    Returns
+    -------
+    accepts_msgpack : bool
+        Whether the Accept header of the request lists msgpack with a nonzero quality.
+    """
+
+    return any(d in MIME_MSGPACK_ALIASES for d in get_accepted_types(request))
+
+
+def write_body(handler: RequestHandler, data: dict) -> None:
+    """
+    Encode the response body according to the Accept header of the request.
+
+    Args
+    ----
+    handler : RequestHandler
+        The handler writing the response.
+    data : dict
+        The response body, possibly containing numpy arrays.
+    """
+
+    handler.set_header('Vary', 'Accept')
+    if accepts_msgpack(handler.request):
+        handler.set_header('Content-Type', MIME_MSGPACK)
+        handler.write(msgpack.packb(data, use_bin_type=True,
+                                    default=_encode_ndarray))
+        return
+    handler.write(to_json_compatible(data))
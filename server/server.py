@@ -8,13 +8,25 @@ import tornado.ioloop
 import tornado.web
 from tornado.options import define, options, parse_command_line
 
+from handlers.feature_extraction.utils import shutdown_pool
+from handlers.utils import executor
+from handlers.utils.data_persistence import close_clients
 from url import url
 
 define('port', default=8005, help='run on th given port', type=int)
 define('debug', default=False, help='run in debug mode')
+define('executor', default='process',
+       help='run the computation in a "process" or "thread" pool')
+define('max_workers', default=None, type=int,
+       help='the number of workers in the pool (default: number of processors)')
+define('max_concurrency', default=2, type=int,
+       help='the number of jobs allowed to run concurrently for an endpoint')
 
 def main():
     parse_command_line()
+    executor.configure(kind=options.executor,
+                       max_workers=options.max_workers,
+                       default_max_concurrency=options.max_concurrency)
     app = tornado.web.Application(
         handlers=url,
         debug=options.debug,
@@ -22,7 +34,12 @@ def main():
     app.listen(options.port)
     print(f'Development server is running at http://127.0.0.1:{options.port}/')
     print('Quit the server with Control-C')
-    tornado.ioloop.IOLoop.instance().start()
+    try:
+        tornado.ioloop.IOLoop.instance().start()
+    finally:
+        executor.shutdown(wait=False)
+        shutdown_pool()
+        close_clients()
 
 
 if __name__ == '__main__':
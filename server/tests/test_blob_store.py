@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The blob store: eviction of the least recently used blobs.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from handlers.utils import blob_store
+
+
+class TestBlobStore(unittest.TestCase):
+    """
+    The blobs stored in a temporary directory with a budget of 2.5 blobs.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(blob_store, 'BLOB_DIR', self.tmp_dir.name),
+            mock.patch.object(blob_store, 'BLOB_MAX_BYTES', 2500),
+            mock.patch.object(blob_store, '_BLOB_BYTES', None),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp_dir.cleanup()
+
+    def put_blob(self, value: int, mtime: float) -> str:
+        """Store a blob of 1000 bytes last used at mtime."""
+        blob_id = blob_store.put_blob(bytes([value]) * 1000)
+        os.utime(blob_store.get_blob_path(blob_id), (mtime, mtime))
+        return blob_id
+
+    def test_least_recently_used_is_evicted(self):
+        """The least recently used blob is evicted past the budget."""
+        first = self.put_blob(1, 1000)
+        second = self.put_blob(2, 2000)
+        # the client checking the first blob marks it as used
+        self.assertTrue(blob_store.has_blob(first))
+        third = self.put_blob(3, 3000)
+        self.assertTrue(blob_store.has_blob(first))
+        self.assertFalse(blob_store.has_blob(second))
+        self.assertTrue(blob_store.has_blob(third))
+
+
+if __name__ == '__main__':
+    unittest.main()
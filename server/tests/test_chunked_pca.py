@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The chunked PCA: precision with offset features, and continuity across the chunks.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.decomposition import PCA
+
+from handlers.projection.utils import ChunkedPCA, chunked_pca
+
+
+class TestChunkedPCA(unittest.TestCase):
+    """
+    The components of ChunkedPCA against the PCA of sklearn.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.standard_normal((3000, 6)) * [5, 3, 2, 1, 1, 1]
+
+    def assert_same_components(self, components, expected):
+        """Check the components up to their signs."""
+        np.testing.assert_allclose(np.abs(np.sum(components * expected, axis=1)),
+                                   1, atol=1e-6)
+
+    def test_large_offset(self):
+        """The components are accurate for features far from the origin."""
+        expected = PCA(n_components=2).fit(self.X).components_
+        # an offset of 1e8 leaves about 8 significant digits in float64
+        with mock.patch.object(chunked_pca, 'BATCH_SIZE', 512):
+            model = ChunkedPCA(2).fit(self.X + 1e8)
+        self.assert_same_components(model.components_, expected)
+        np.testing.assert_allclose(model.mean_ - 1e8, self.X.mean(axis=0), atol=1e-6)
+
+    def test_transform_large_offset(self):
+        """The projection of features far from the origin keeps its precision."""
+        # pylint: disable=invalid-name
+        for offset, dtype in [(1e4, np.float32), (1e10, np.float64)]:
+            X = (self.X + offset).astype(dtype)
+            with mock.patch.object(chunked_pca, 'BATCH_SIZE', 512):
+                model = ChunkedPCA(2).fit(X)
+                projection = model.transform(X)
+            # the differences with the nearby offset are exact
+            centered = (X.astype(np.float64) - offset) - (model.mean_ - offset)
+            np.testing.assert_allclose(projection, centered @ model.components_.T,
+                                       atol=1e-9)
+
+    def test_chunks_do_not_change_the_projection(self):
+        """The batch size does not change the projection."""
+        projection = ChunkedPCA(2).fit(self.X).transform(self.X)
+        with mock.patch.object(chunked_pca, 'BATCH_SIZE', 700):
+            chunked = ChunkedPCA(2).fit(self.X).transform(self.X)
+        # the same orientation, not only the same subspace
+        np.testing.assert_allclose(chunked, projection, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
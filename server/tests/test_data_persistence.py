@@ -0,0 +1,73 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The data persistence: evictions of the mocked database and health checks of the clients.
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from bson.objectid import ObjectId
+import numpy as np
+
+from handlers.utils.data_persistence import close_clients, get_client, load, save
+from handlers.utils.data_persistence import data_persistence, mongo_client
+
+
+class TestDataPersistence(unittest.TestCase):
+    """
+    The mocked database and the shared mongo clients.
+    """
+    # pylint: disable=protected-access
+
+    def tearDown(self):
+        close_clients()
+
+    def test_eviction_is_logged(self):
+        """The evicted ids are logged, and cannot be loaded anymore."""
+        inserted_id = ObjectId()
+        with mock.patch.object(data_persistence.DB, 'max_bytes', 3 << 19),\
+                self.assertLogs(data_persistence.__name__, level='WARNING') as logs:
+            save(data=np.zeros(1 << 17), inserted_id=inserted_id)
+            save(data=np.zeros(1 << 17))
+        self.assertIn(str(inserted_id), logs.output[0])
+        with self.assertRaises(KeyError):
+            load(inserted_id=inserted_id)
+
+    def test_health_check_does_not_block(self):
+        """The ping runs in the background, and the failing client is replaced."""
+        pinged = threading.Event()
+
+        def slow_failing_ping(_):
+            time.sleep(0.5)
+            pinged.set()
+            return False
+
+        client = get_client('mongodb://localhost:27017')
+        mongo_client._LAST_HEALTH_CHECK['mongodb://localhost:27017'] = 0
+        with mock.patch.object(mongo_client, 'is_client_healthy', slow_failing_ping):
+            start = time.time()
+            self.assertIs(get_client('mongodb://localhost:27017'), client)
+            self.assertLess(time.time() - start, 0.1)
+            self.assertTrue(pinged.wait(5))
+        # the failing client is replaced on the next call
+        time.sleep(0.1)
+        self.assertIsNot(get_client('mongodb://localhost:27017'), client)
+
+    def test_replaced_client_is_closed_later(self):
+        """A failing client is not closed under the calls still holding it."""
+        url = 'mongodb://localhost:27017'
+        client = get_client(url)
+        closed = threading.Event()
+        mongo_client._LAST_HEALTH_CHECK[url] = 0
+        with mock.patch.object(mongo_client, 'is_client_healthy', return_value=False),\
+                mock.patch.object(mongo_client, 'CLOSE_GRACE_PERIOD', 0.5),\
+                mock.patch.object(client, 'close', side_effect=closed.set):
+            get_client(url)
+            time.sleep(0.2)
+            self.assertIsNot(get_client(url), client)
+            self.assertFalse(closed.is_set())
+            self.assertTrue(closed.wait(5))
@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The dataset sessions: eviction, unknown ids and label updates.
+"""
+
+import json
+
+from tornado.testing import AsyncHTTPTestCase
+from tornado.web import Application
+
+from handlers import DatasetSessionHandler
+from handlers.utils import dataset_session
+
+
+def make_data_objects(n_objects: int, n_features: int = 4):
+    """Create data objects with constant features."""
+    return [{'uuid': f'{i}', 'features': [float(i)] * n_features}
+            for i in range(n_objects)]
+
+
+class TestDatasetSession(AsyncHTTPTestCase):
+    """
+    The /session endpoints.
+    """
+
+    def get_app(self):
+        return Application([(r'/session/(.*)', DatasetSessionHandler)])
+
+    def post(self, path: str, body: dict):
+        """Post a JSON body and return the response."""
+        return self.fetch(path, method='POST', body=json.dumps(body))
+
+    def test_unknown_session(self):
+        """Updating an unknown session is not found."""
+        response = self.post('/session/update', {'sessionId': 'unknown'})
+        self.assertEqual(response.code, 404)
+
+    def test_clear_label(self):
+        """The cleared labels are unset in the session."""
+        response = self.post('/session/register',
+                             {'dataObjects': make_data_objects(3)})
+        session_id = json.loads(response.body)['sessionId']
+        self.post('/session/update', {
+            'sessionId': session_id,
+            'labels': [{'uuid': '1', 'category': 'a'}],
+        })
+        session = dataset_session.get_session(session_id)
+        self.assertEqual(session.labels[1]['category'], 'a')
+        self.post('/session/update', {
+            'sessionId': session_id,
+            'clearedLabels': ['1'],
+        })
+        self.assertIsNone(session.labels[1])
+
+    def test_unknown_uuid(self):
+        """An update with an unknown uuid is refused without updating anything."""
+        session_id = dataset_session.register_session(make_data_objects(3))
+        response = self.post('/session/update', {
+            'sessionId': session_id,
+            'statuses': [{'uuid': '0', 'value': 'Labeled'}],
+            'labels': [{'uuid': '0', 'category': 'a'}, {'uuid': 'unknown', 'category': 'b'}],
+        })
+        self.assertEqual(response.code, 400)
+        session = dataset_session.get_session(session_id)
+        self.assertEqual(session.statuses[0], 'New')
+        self.assertIsNone(session.labels[0])
+        response = self.post('/session/update', {
+            'sessionId': session_id,
+            'clearedLabels': ['unknown'],
+        })
+        self.assertEqual(response.code, 400)
+
+    def test_eviction(self):
+        """The least recently used session is evicted past the budget."""
+        # each session holds 100 x 4 float32 features
+        budget = dataset_session.SESSIONS.max_bytes
+        dataset_session.SESSIONS.max_bytes = 2 * 100 * 4 * 4
+        try:
+            session_ids = [dataset_session.register_session(make_data_objects(100))
+                           for _ in range(3)]
+            response = self.post('/session/update', {'sessionId': session_ids[0]})
+            self.assertEqual(response.code, 404)
+            response = self.post('/session/update', {'sessionId': session_ids[2]})
+            self.assertEqual(response.code, 200)
+        finally:
+            dataset_session.SESSIONS.max_bytes = budget
+            for session_id in session_ids:
+                dataset_session.remove_session(session_id)
@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The latency of cheap endpoints while a heavy projection job runs,
+checking that the computation does not block the IOLoop.
+"""
+
+import json
+import time
+
+import numpy as np
+from tornado import gen
+from tornado.httpclient import HTTPRequest
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.web import Application
+
+from handlers.utils import executor
+from url import url
+
+
+# pylint: disable=pointless-string-statement
+"""
+The number of round trips measured while the TSNE job runs.
+"""
+N_ROUNDTRIPS = 20
+
+"""
+The largest accepted round trip latency in seconds.
+Generous against the few ms expected, for loaded CI machines.
+"""
+MAX_LATENCY = 0.1
+
+
+class TestExecutorLatency(AsyncHTTPTestCase):
+    """
+    The /roundtrip endpoint answers quickly while /projection/TSNE runs.
+    """
+
+    def setUp(self):
+        executor.shutdown()
+        executor.configure(kind='process', max_workers=2)
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        executor.shutdown(wait=False)
+
+    def get_app(self):
+        return Application(url)
+
+    @gen_test(timeout=300)
+    async def test_roundtrip_during_tsne(self):
+        """A roundtrip is answered promptly while TSNE runs."""
+        X = np.random.RandomState(0).rand(2000, 50)
+        tsne_request = HTTPRequest(self.get_url('/projection/TSNE'),
+                                   method='POST',
+                                   body=json.dumps({'X': X.tolist(), 'nComponents': 2}),
+                                   request_timeout=300)
+        tsne_response = self.http_client.fetch(tsne_request)
+
+        # wait until the job is parsed and submitted to the executor
+        await gen.sleep(1)
+
+        latencies = []
+        for _ in range(N_ROUNDTRIPS):
+            start = time.perf_counter()
+            response = await self.http_client.fetch(self.get_url('/roundtrip'),
+                                                    method='POST', body='')
+            latencies.append(time.perf_counter() - start)
+            self.assertEqual(response.code, 200)
+        self.assertFalse(tsne_response.done(),
+                         'the TSNE job finished before the round trips were measured')
+        self.assertLess(max(latencies), MAX_LATENCY)
+
+        response = await tsne_response
+        self.assertEqual(len(json.loads(response.body)['projection']), len(X))
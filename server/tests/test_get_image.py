@@ -0,0 +1,93 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The image decoding: the sizes read from the headers
+and the decoding at reduced resolution.
+"""
+
+import base64
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2 as cv
+import numpy as np
+
+from handlers.feature_extraction.utils import THUMBNAIL_MIN_SIZE, get_image, get_image_size
+from handlers.utils import blob_store
+
+
+def encode(img: np.ndarray, ext: str, params=()) -> bytes:
+    """Encode the image in the format of the extension."""
+    _, buffer = cv.imencode(ext, img, list(params))
+    return buffer.tobytes()
+
+
+def to_data_object(buffer: bytes, mime: str) -> dict:
+    """Wrap the encoded image in a data object with a data url."""
+    content = f'data:{mime};base64,' + base64.b64encode(buffer).decode()
+    return {'uuid': '0', 'type': 'image', 'content': content}
+
+
+class TestGetImage(unittest.TestCase):
+    """
+    The get_image_size and get_image functions.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        # a smooth image such that the reduced decodings are close to resizing
+        self.img = cv.resize(rng.randint(0, 256, (15, 20, 3), dtype=np.uint8), (800, 600))
+
+    def test_image_size(self):
+        """The sizes are read from the PNG and the baseline or progressive JPEG headers."""
+        self.assertEqual(get_image_size(encode(self.img, '.png')), (600, 800))
+        self.assertEqual(get_image_size(encode(self.img, '.jpg')), (600, 800))
+        progressive = encode(self.img, '.jpg', (cv.IMWRITE_JPEG_PROGRESSIVE, 1))
+        self.assertEqual(get_image_size(progressive), (600, 800))
+        self.assertIsNone(get_image_size(encode(self.img, '.bmp')))
+        self.assertIsNone(get_image_size(b'\xff\xd8'))
+
+    def test_reduced_jpeg(self):
+        """A JPEG image is decoded at the largest reduction keeping min_size."""
+        data_object = to_data_object(encode(self.img, '.jpg'), 'image/jpeg')
+        for min_size, shape in [(None, (600, 800)),
+                                (THUMBNAIL_MIN_SIZE, (75, 100)),
+                                (200, (300, 400)),
+                                (600, (600, 800))]:
+            with self.subTest(min_size=min_size):
+                img = get_image(data_object, min_size)
+                self.assertEqual(img.shape, (*shape, 3))
+        full = get_image(data_object)
+        reduced = get_image(data_object, THUMBNAIL_MIN_SIZE)
+        resized = cv.resize(full, (100, 75), interpolation=cv.INTER_AREA)
+        self.assertLess(np.abs(reduced.astype(float) - resized).mean(), 2)
+
+    def test_reduced_png(self):
+        """A PNG image is decoded at full size and resized to the reduction."""
+        data_object = to_data_object(encode(self.img, '.png'), 'image/png')
+        np.testing.assert_array_equal(get_image(data_object), self.img)
+        self.assertEqual(get_image(data_object, THUMBNAIL_MIN_SIZE).shape, (75, 100, 3))
+
+    def test_gray_image(self):
+        """A gray image is decoded in BGR color."""
+        gray = cv.cvtColor(self.img, cv.COLOR_BGR2GRAY)
+        data_object = to_data_object(encode(gray, '.png'), 'image/png')
+        self.assertEqual(get_image(data_object, THUMBNAIL_MIN_SIZE).shape, (75, 100, 3))
+
+    def test_blob_reference(self):
+        """A blob reference is decoded as the data url of the same image."""
+        buffer = encode(self.img, '.jpg')
+        with tempfile.TemporaryDirectory() as blob_dir,\
+                mock.patch.object(blob_store, 'BLOB_DIR', blob_dir),\
+                mock.patch.object(blob_store, '_BLOB_BYTES', None):
+            content = f'{blob_store.BLOB_PREFIX}{blob_store.put_blob(buffer)}'
+            img = get_image({'uuid': '0', 'type': 'image', 'content': content},
+                            THUMBNAIL_MIN_SIZE)
+        np.testing.assert_array_equal(
+            img, get_image(to_data_object(buffer, 'image/jpeg'), THUMBNAIL_MIN_SIZE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The cached thumbnails: memory only, and private to each process.
+"""
+
+import base64
+from concurrent.futures import ProcessPoolExecutor
+import unittest
+from unittest import mock
+
+import cv2 as cv
+import numpy as np
+
+from handlers.feature_extraction.utils import DescriptorCache, describe_thumbnails
+from handlers.feature_extraction.utils import image_batch
+
+
+def make_data_objects(n_images: int, seed: int):
+    """Encode random images as PNG data urls."""
+    rng = np.random.RandomState(seed)
+    data_objects = []
+    for i in range(n_images):
+        _, buffer = cv.imencode('.png', rng.randint(0, 256, (32, 32, 3), dtype=np.uint8))
+        content = 'data:image/png;base64,' + base64.b64encode(buffer.tobytes()).decode()
+        data_objects.append({'uuid': str(i), 'type': 'image', 'content': content})
+    return data_objects
+
+
+def count_cached(data_objects) -> int:
+    """Count the data objects whose thumbnail is cached in the calling process."""
+    return sum(image_batch.THUMBNAIL_CACHE.get(
+        image_batch.get_image_key(d, image_batch.THUMBNAIL_VERSION)) is not None
+               for d in data_objects)
+
+
+class TestThumbnailCache(unittest.TestCase):
+    """
+    The cache of describe_thumbnails.
+    """
+
+    def test_cached_in_memory(self):
+        """A repeated description in the same process decodes no image."""
+        data_objects = make_data_objects(5, seed=0)
+        with mock.patch.object(image_batch, 'THUMBNAIL_CACHE', DescriptorCache(disk_dir=None)):
+            first = describe_thumbnails(data_objects)
+            with mock.patch.object(image_batch, 'get_image') as get_image:
+                second = describe_thumbnails(data_objects)
+            get_image.assert_not_called()
+        np.testing.assert_array_equal(first['raw'], second['raw'])
+
+    def test_private_to_each_process(self):
+        """The thumbnails cached in a worker process are not cached in the server."""
+        data_objects = make_data_objects(5, seed=1)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            pool.submit(describe_thumbnails, data_objects).result()
+            self.assertEqual(pool.submit(count_cached, data_objects).result(), 5)
+        self.assertEqual(count_cached(data_objects), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The per-image descriptor cache of the image BoW features,
+and the dataset-level reducers run on the cached descriptors.
+"""
+
+import base64
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import cv2 as cv
+import numpy as np
+
+from handlers.feature_extraction import image_bow
+from handlers.feature_extraction.utils import (
+    DescriptorCache,
+    fit_SVD,
+    get_image_key,
+    reduce_SVD,
+)
+
+
+def make_data_objects(n_images: int, seed: int = 0):
+    """Encode random images as PNG data urls."""
+    rng = np.random.RandomState(seed)
+    data_objects = []
+    for i in range(n_images):
+        _, buffer = cv.imencode('.png', rng.randint(0, 256, (40, 32, 3), dtype=np.uint8))
+        content = 'data:image/png;base64,' + base64.b64encode(buffer.tobytes()).decode()
+        data_objects.append({'uuid': str(i), 'type': 'image', 'content': content})
+    return data_objects
+
+
+class TestBowDescriptors(unittest.TestCase):
+    """
+    The cached descriptors of image_bow.extract_features.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(image_bow, 'DESCRIPTOR_CACHE',
+                                    DescriptorCache(disk_dir=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.data_objects = make_data_objects(7)
+
+    def test_only_new_images_are_described(self):
+        """Appending an image describes the appended image only."""
+        descriptors = image_bow.get_descriptors(self.data_objects[:6])
+        with mock.patch.object(image_bow, 'parallel_describe',
+                               wraps=image_bow.parallel_describe) as describe:
+            appended = image_bow.get_descriptors(self.data_objects)
+        self.assertEqual(len(describe.call_args[0][1]), 1)
+        for name, values in descriptors.items():
+            np.testing.assert_array_equal(appended[name][:6], values)
+
+    def test_cached_features_are_unchanged(self):
+        """The features assembled from the cached descriptors are the computed ones."""
+        # pylint: disable=invalid-name
+        X, feature_names = image_bow.extract_features(self.data_objects)
+        with mock.patch.object(image_bow, 'parallel_describe') as describe:
+            X_cached, _ = image_bow.extract_features(self.data_objects)
+        describe.assert_not_called()
+        np.testing.assert_array_equal(X_cached, X)
+        self.assertEqual(X.shape, (7, len(feature_names)))
+
+    def test_fitted_reducer(self):
+        """The features of a fitted reducer are those fitted on the same images."""
+        # pylint: disable=invalid-name
+        X, _ = image_bow.extract_features(self.data_objects)
+        reducer = image_bow.fit_reducer(self.data_objects)
+        X_head, _ = image_bow.extract_features(self.data_objects[:3], reducer)
+        np.testing.assert_allclose(X_head, X[:3], atol=1e-8)
+
+
+class TestDatasetReducers(unittest.TestCase):
+    """
+    The SVD of the raw and hog descriptors.
+    """
+    # pylint: disable=invalid-name
+
+    def setUp(self):
+        self.X = np.random.RandomState(0).rand(80, 64)
+
+    def test_fewer_samples_than_components(self):
+        """The components missing with few images are padded with zeros."""
+        X_hog, feature_names = image_bow.reduce_hog(self.X[:3])
+        self.assertEqual(X_hog.shape, (3, image_bow.N_HOG_COMPONENTS))
+        self.assertEqual(len(feature_names), image_bow.N_HOG_COMPONENTS)
+        np.testing.assert_array_equal(X_hog[:, 3:], 0)
+        X_svd, _ = reduce_SVD(self.X[:2])
+        self.assertEqual(X_svd.shape, (2, 5))
+
+    def test_fitted_reducers(self):
+        """Reducing with a fitted reducer is reducing the images it is fitted on."""
+        np.testing.assert_allclose(
+            image_bow.reduce_hog(self.X[:5], image_bow.fit_hog(self.X))[0],
+            image_bow.reduce_hog(self.X)[0][:5], atol=1e-10)
+        np.testing.assert_allclose(reduce_SVD(self.X[:5], fit_SVD(self.X))[0],
+                                   reduce_SVD(self.X)[0][:5], atol=1e-10)
+
+
+class TestDescriptorCache(unittest.TestCase):
+    """
+    The memory and disk tiers of DescriptorCache.
+    """
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmp_dir.cleanup)
+        self.disk_dir = tmp_dir.name
+        self.descriptors = {'raw': np.arange(64, dtype=np.float64)}
+
+    def test_key_of_content(self):
+        """The key depends on the image content and the namespace, not the uuid."""
+        data_objects = make_data_objects(2)
+        renamed = {**data_objects[0], 'uuid': 'renamed'}
+        self.assertEqual(get_image_key(data_objects[0]), get_image_key(renamed))
+        self.assertNotEqual(get_image_key(data_objects[0]), get_image_key(data_objects[1]))
+        self.assertNotEqual(get_image_key(data_objects[0], 'bow-1'),
+                            get_image_key(data_objects[0], 'bow-2'))
+
+    def test_disk_tier_is_shared(self):
+        """Another cache on the same directory reads the descriptors from disk."""
+        DescriptorCache(disk_dir=self.disk_dir).put('key', self.descriptors)
+        cache = DescriptorCache(disk_dir=self.disk_dir)
+        np.testing.assert_array_equal(cache.get('key')['raw'], self.descriptors['raw'])
+        self.assertEqual(cache.disk_hits, 1)
+        self.assertIsNone(cache.get('missing'))
+
+    def test_disk_eviction(self):
+        """The least recently used files are removed past the disk budget."""
+        cache = DescriptorCache(disk_dir=self.disk_dir)
+        cache.put('first', self.descriptors)
+        file_size = os.path.getsize(os.path.join(self.disk_dir, 'first.npz'))
+        cache.disk_max_bytes = int(2.5 * file_size)
+        cache.put('second', self.descriptors)
+        past = time.time() - 10
+        os.utime(os.path.join(self.disk_dir, 'first.npz'), (past, past))
+        cache.put('third', self.descriptors)
+        self.assertEqual(sorted(os.listdir(self.disk_dir)), ['second.npz', 'third.npz'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The batched color and edge descriptors equal the per-image descriptors.
+"""
+
+import unittest
+
+import cv2 as cv
+import numpy as np
+
+from handlers.feature_extraction import image_bow
+from handlers.feature_extraction.utils import ImageBatch
+
+
+def make_images():
+    """Random, gray, uniform and saturated images of odd and even sizes."""
+    rng = np.random.RandomState(0)
+    return [
+        rng.randint(0, 256, (37, 50, 3), dtype=np.uint8),
+        rng.randint(0, 256, (64, 64, 3), dtype=np.uint8),
+        rng.randint(0, 256, (21, 17), dtype=np.uint8),
+        np.full((16, 16, 3), 128, dtype=np.uint8),
+        np.tile(np.array([0, 255], dtype=np.uint8), (31, 16))[..., None].repeat(3, axis=2),
+        cv.GaussianBlur(rng.randint(0, 256, (45, 30, 3), dtype=np.uint8), (7, 7), 0),
+    ]
+
+
+class TestBatchedDescriptors(unittest.TestCase):
+    """
+    The color and edge descriptors of an ImageBatch.
+    """
+    # pylint: disable=invalid-name
+
+    def setUp(self):
+        self.imgs = make_images()
+
+    def test_color_descriptors(self):
+        """The batched color features are the per-image features."""
+        X, feature_names = image_bow.color_descriptors(ImageBatch(self.imgs))
+        expected = np.array([image_bow.color_descriptors_single(img, False)
+                             for img in self.imgs])
+        np.testing.assert_array_equal(X, expected)
+        self.assertEqual(feature_names, image_bow.color_descriptors_single(self.imgs[0])[1])
+
+    def test_edge_descriptors(self):
+        """The batched edge features are the per-image features."""
+        X, feature_names = image_bow.edge_descriptors(ImageBatch(self.imgs))
+        expected = np.array([image_bow.edge_descriptors_single(img, False)
+                             for img in self.imgs])
+        np.testing.assert_array_equal(X, expected)
+        self.assertEqual(feature_names, image_bow.edge_descriptors_single(self.imgs[0])[1])
+
+    def test_empty_batch(self):
+        """An empty batch has no rows and the feature names."""
+        X, feature_names = image_bow.color_descriptors([])
+        self.assertEqual(X.shape, (0, len(feature_names)))
+        X, feature_names = image_bow.edge_descriptors([])
+        self.assertEqual(X.shape, (0, len(feature_names)))
+
+    def test_uint8_statistics(self):
+        """The statistics from the value counts are those of numpy on the values."""
+        # pylint: disable=protected-access
+        rng = np.random.RandomState(1)
+        for n_values in [1, 2, 99, 100]:
+            values = rng.randint(0, 256, n_values)
+            counts = np.bincount(values, minlength=256)
+            hist, median, mean = image_bow._uint8_statistics(counts, 16)
+            np.testing.assert_array_equal(
+                hist, np.histogram(values, bins=16, range=(0, 256))[0] / n_values)
+            self.assertEqual(median, np.median(values))
+            self.assertEqual(mean, np.mean(values))
+
+
+if __name__ == '__main__':
+    unittest.main()
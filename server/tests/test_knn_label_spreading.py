@@ -0,0 +1,88 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The label spreading on a sparse k-nearest-neighbor graph:
+agreement with LabelSpreading, the graph reuse and the approximate neighbors.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+from sklearn.semi_supervised import LabelSpreading
+
+from handlers.utils import knn_label_spreading
+from handlers.utils.knn_label_spreading import KNNLabelSpreading, approximate_kneighbors
+
+
+class TestKNNLabelSpreading(unittest.TestCase):
+    """
+    The fit and predict_proba of KNNLabelSpreading.
+    """
+    # pylint: disable=invalid-name
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        centers = rng.standard_normal((3, 5)) * 5
+        self.y_true = rng.randint(3, size=600)
+        self.X = centers[self.y_true] + rng.standard_normal((600, 5))
+        self.y = np.where(rng.rand(600) < 0.1, self.y_true, -1)
+
+    def test_agrees_with_label_spreading(self):
+        """The probabilities are those of LabelSpreading with the knn kernel."""
+        expected = LabelSpreading(kernel='knn', n_neighbors=10, alpha=0.2, max_iter=30)\
+            .fit(self.X, self.y)
+        estimator = KNNLabelSpreading(n_neighbors=10).fit(self.X, self.y)
+        np.testing.assert_allclose(estimator.label_distributions_,
+                                   expected.label_distributions_, atol=1e-10)
+        np.testing.assert_allclose(estimator.predict_proba(self.X[:50] + 0.01),
+                                   expected.predict_proba(self.X[:50] + 0.01), atol=1e-10)
+        self.assertGreater(np.mean(estimator.predict(self.X) == self.y_true), 0.95)
+
+    def test_graph_is_reused(self):
+        """The graph is built once while only the labels change."""
+        estimator = KNNLabelSpreading().fit(self.X, self.y)
+        graph = estimator.graph_
+        relabeled = np.where(np.arange(600) < 100, self.y_true, -1)
+        with mock.patch.object(KNNLabelSpreading, '_get_kernel') as get_kernel:
+            estimator.fit(self.X, relabeled)
+        get_kernel.assert_not_called()
+        self.assertIs(estimator.graph_, graph)
+
+        estimator.fit(self.X[:500], relabeled[:500])
+        self.assertEqual(estimator.graph_.shape, (500, 500))
+
+    def test_feature_mismatch(self):
+        """Predicting features of another dimension raises a ValueError."""
+        estimator = KNNLabelSpreading().fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            estimator.predict_proba(self.X[:, :4])
+
+    def test_approximate_graph_above_exact_max_samples(self):
+        """The large pools are spread on the approximate neighbors."""
+        with mock.patch.object(knn_label_spreading, 'EXACT_MAX_SAMPLES', 100):
+            estimator = KNNLabelSpreading().fit(self.X, self.y)
+        self.assertGreater(np.mean(estimator.predict(self.X) == self.y_true), 0.95)
+
+
+class TestApproximateKNeighbors(unittest.TestCase):
+    """
+    The recall of approximate_kneighbors.
+    """
+
+    def test_recall(self):
+        """Most of the approximate neighbors are the exact neighbors."""
+        # pylint: disable=invalid-name
+        X = np.random.RandomState(0).standard_normal((5000, 8))
+        neighbors = approximate_kneighbors(X, 10)
+        exact = NearestNeighbors(n_neighbors=10).fit(X).kneighbors(X, return_distance=False)
+        self.assertEqual(neighbors.shape, (5000, 10))
+        np.testing.assert_array_equal(neighbors[:, 0], np.arange(5000))
+        recall = np.mean([len(np.intersect1d(a, b)) / 10 for a, b in zip(neighbors, exact)])
+        self.assertGreater(recall, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The size-bounded LRU cache and the estimation of the sizes of its values.
+"""
+
+import unittest
+
+import numpy as np
+import scipy.sparse
+from sklearn.decomposition import PCA
+
+from handlers.utils.data_persistence.lru_cache import LRUCache, estimate_size
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    The eviction of LRUCache under its size budget.
+    """
+
+    def test_least_recently_used_is_evicted(self):
+        """The values are evicted from the least recently used, under the budget."""
+        evicted = []
+        cache = LRUCache(300, on_evict=lambda key, n_bytes: evicted.append((key, n_bytes)))
+        for key in 'abc':
+            cache.put(key, key, n_bytes=100)
+        cache.get('a')
+        cache.put('d', 'd', n_bytes=150)
+        self.assertEqual(evicted, [('b', 100), ('c', 100)])
+        self.assertEqual(sorted(key for key in 'abcd' if key in cache), ['a', 'd'])
+        self.assertEqual(cache.n_bytes, 250)
+
+    def test_replacing_a_value(self):
+        """Putting a key again replaces its size instead of adding to it."""
+        cache = LRUCache(300)
+        cache.put('a', 1, n_bytes=200)
+        cache.put('a', 2, n_bytes=250)
+        self.assertEqual(cache.get('a'), 2)
+        self.assertEqual(cache.n_bytes, 250)
+        self.assertEqual(cache.evictions, 0)
+
+    def test_value_over_the_budget(self):
+        """A value larger than the budget is not kept, nor evicts the others."""
+        evicted = []
+        cache = LRUCache(300, on_evict=lambda key, n_bytes: evicted.append(key))
+        cache.put('a', 1, n_bytes=100)
+        cache.put('b', 2, n_bytes=400)
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertEqual(evicted, ['b'])
+        with self.assertRaises(KeyError):
+            cache.get('b')
+        info = cache.info()
+        self.assertEqual((info['hits'], info['misses'], info['nItems']), (0, 1, 1))
+
+    def test_estimated_size(self):
+        """Without n_bytes, the size of the value is estimated."""
+        cache = LRUCache((1 << 20) - 1)
+        cache.put('a', np.zeros(1 << 16))
+        self.assertGreaterEqual(cache.n_bytes, 1 << 19)
+        cache.put('b', np.zeros(1 << 16))
+        self.assertNotIn('a', cache)
+
+
+class TestEstimateSize(unittest.TestCase):
+    """
+    The estimated sizes of the cached values.
+    """
+
+    def test_arrays_and_views(self):
+        """The buffers are counted once, whatever the views sharing them."""
+        X = np.zeros((1000, 100))  # pylint: disable=invalid-name
+        self.assertGreaterEqual(estimate_size(X), X.nbytes)
+        self.assertLess(estimate_size([X, X[:10], X.T]) - X.nbytes, 1000)
+
+    def test_containers(self):
+        """The arrays in dicts, lists and sparse matrices are counted."""
+        matrix = scipy.sparse.random(1000, 1000, density=0.01, format='csr')
+        n_bytes = estimate_size({'matrix': matrix, 'rows': [np.zeros(1000)] * 2})
+        expected = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes + 8000
+        self.assertGreaterEqual(n_bytes, expected)
+        self.assertLess(n_bytes, expected + 2000)
+
+    def test_fitted_model(self):
+        """The arrays in the attributes of objects are counted."""
+        model = PCA(n_components=50).fit(np.random.RandomState(0).rand(200, 1000))
+        self.assertGreaterEqual(estimate_size(model), model.components_.nbytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
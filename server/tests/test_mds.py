@@ -0,0 +1,138 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The landmark MDS: rank-deficient features, agreement with the classical MDS,
+and the persisted landmark MDS transforming the rows appended later.
+"""
+
+import json
+import unittest
+
+from bson.objectid import ObjectId
+import numpy as np
+from sklearn.metrics.pairwise import euclidean_distances
+from tornado.testing import AsyncHTTPTestCase
+from tornado.web import Application
+
+from handlers.projection import mds
+from handlers.utils import executor
+
+
+def classical_mds(X: np.ndarray, n_components: int) -> np.ndarray:
+    """The classical MDS of all the data objects."""
+    # pylint: disable=invalid-name
+    n_samples = len(X)
+    centering = np.eye(n_samples) - 1 / n_samples
+    B = -0.5 * centering @ euclidean_distances(X, squared=True) @ centering
+    eigenvalues, eigenvectors = np.linalg.eigh(B)
+    top = np.argsort(eigenvalues)[::-1][:n_components]
+    return eigenvectors[:, top] * np.sqrt(np.maximum(eigenvalues[top], 0))
+
+
+class TestLandmarkMDS(unittest.TestCase):
+    """
+    The projection of fit_landmarks and triangulate.
+    """
+
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+
+    def assert_same_distances(self, projection, X):  # pylint: disable=invalid-name
+        """Check the pairwise distances of the projection against the features."""
+        np.testing.assert_allclose(euclidean_distances(projection[:500]),
+                                   euclidean_distances(X[:500]), atol=1e-4)
+
+    def test_rank_deficient_features(self):
+        """The null eigenvalues of rank-deficient features are dropped."""
+        # pylint: disable=invalid-name
+        # more rows than landmarks, with fewer dimensions than n_components
+        cases = [
+            self.rng.standard_normal((8000, 1)),
+            np.hstack((self.rng.standard_normal((8000, 2)), np.zeros((8000, 30)))),
+            self.rng.standard_normal((8000, 2)) @ self.rng.standard_normal((2, 10)) + 1e4,
+            self.rng.standard_normal((8000, 2)).astype(np.float32) + 100,
+        ]
+        for X in cases:
+            projection = mds.fit_landmark_projection(X, 3)
+            self.assertLess(np.abs(projection).max(), 1e3)
+            # the landmark MDS is exact when the landmarks span the features
+            self.assert_same_distances(projection, X.astype(np.float64))
+
+    def test_agrees_with_classical_mds(self):
+        """The landmark MDS of all the data objects is the classical MDS."""
+        # pylint: disable=invalid-name
+        # all the data objects are landmarks
+        X = self.rng.standard_normal((600, 8)) * [5, 4, 3, 1, 1, 1, 1, 1]
+        projection = mds.fit_landmark_projection(X, 2)
+        expected = classical_mds(X, 2)
+        # the same coordinates up to the signs of the axes
+        np.testing.assert_allclose(np.abs(projection), np.abs(expected), atol=1e-8)
+
+    def test_triangulates_new_rows(self):
+        """The rows triangulated later keep their distances to the fitted rows."""
+        # pylint: disable=invalid-name
+        X = self.rng.standard_normal((3000, 2)) @ self.rng.standard_normal((2, 5))
+        model = mds.fit_landmarks(X[:2000], 2)
+        projection = np.vstack((mds.triangulate(X[:2000], model),
+                                mds.triangulate(X[2000:], model)))
+        self.assert_same_distances(projection[1500:], X[1500:])
+
+
+class TestPersistedMDS(AsyncHTTPTestCase):
+    """
+    The /projection/MDS endpoints with reducerId.
+    """
+
+    def get_app(self):
+        return Application([
+            (r'/projection/MDS', mds.Handler),
+            (r'/projection/MDS/transform', mds.Handler, {'transform_only': True}),
+        ])
+
+    def setUp(self):
+        executor.shutdown()
+        executor.configure(kind='thread')
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        executor.shutdown(wait=False)
+
+    def post(self, path: str, body: dict):
+        """Post a projection request and return the response."""
+        return self.fetch(path, method='POST', body=json.dumps(body))
+
+    def test_transform_appended_rows(self):
+        """The appended rows are triangulated with the persisted landmark MDS."""
+        # pylint: disable=invalid-name
+        X = np.random.RandomState(0).standard_normal((1200, 6))
+        reducer_id = str(ObjectId())
+        response = self.post('/projection/MDS/transform', {
+            'X': X[1000:].tolist(), 'nComponents': 2, 'reducerId': reducer_id,
+        })
+        self.assertEqual(response.code, 404)
+
+        response = self.post('/projection/MDS', {
+            'X': X[:1000].tolist(), 'nComponents': 2, 'reducerId': reducer_id,
+        })
+        fitted = np.asarray(json.loads(response.body)['projection'])
+        response = self.post('/projection/MDS/transform', {
+            'X': X[1000:].tolist(), 'nComponents': 2, 'reducerId': reducer_id,
+        })
+        appended = np.asarray(json.loads(response.body)['projection'])
+        expected = mds.fit_landmark_projection(X[:1000], 2)
+        np.testing.assert_allclose(fitted, expected, atol=1e-8)
+        np.testing.assert_allclose(
+            appended, mds.triangulate(X[1000:], mds.fit_landmarks(X[:1000], 2)), atol=1e-8)
+
+    def test_transform_without_reducer_id(self):
+        """The transform endpoint needs a reducerId."""
+        response = self.post('/projection/MDS/transform', {
+            'X': [[0, 1, 2], [1, 2, 0], [2, 0, 1]], 'nComponents': 2,
+        })
+        self.assertEqual(response.code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
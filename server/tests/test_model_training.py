@@ -0,0 +1,106 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The model updates on Retrain: the SGD model trained on the new labels only,
+the retraining from scratch, and the warm-started logistic regression.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import SGDClassifier
+
+from handlers import model_training_handler
+from handlers.model_training_handler import update_estimator
+from handlers.types import BuiltInModelType, StatusType
+
+
+N_SAMPLES = 200
+
+
+class TestModelUpdates(unittest.TestCase):
+    """
+    The update_estimator of the incrementally trained models.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.categories = rng.choice(['a', 'b', 'c'], N_SAMPLES)
+        offsets = {'a': 0., 'b': 3., 'c': 6.}
+        self.features = rng.standard_normal((N_SAMPLES, 4))\
+            + np.array([offsets[c] for c in self.categories])[:, None]
+        self.uuids = [f'{i}' for i in range(N_SAMPLES)]
+
+    def update(self, estimator_type: str, estimator, n_labeled: int, categories=None):
+        """Update the estimator with the leading n_labeled data objects labeled."""
+        categories = self.categories if categories is None else categories
+        labels = [{'category': str(c)} if i < n_labeled else None
+                  for i, c in enumerate(categories)]
+        statuses = np.array([StatusType.Labeled if i < n_labeled else StatusType.New
+                             for i in range(N_SAMPLES)], dtype=object)
+        return update_estimator(estimator_type, estimator, self.features,
+                                labels, statuses, self.uuids)
+
+    def test_sgd_fits_the_new_labels_only(self):
+        """The SGD model is updated with the rows labeled since the last update."""
+        estimator = self.update(BuiltInModelType.SGD, None, 100)
+        with mock.patch.object(SGDClassifier, 'partial_fit', autospec=True,
+                               side_effect=SGDClassifier.partial_fit) as partial_fit:
+            updated = self.update(BuiltInModelType.SGD, estimator, 120)
+        self.assertIs(updated, estimator)
+        self.assertEqual(len(partial_fit.call_args[0][1]), 20)
+        self.assertEqual(len(updated.seen_labels), 120)
+        self.assertGreater(np.mean(updated.predict(self.features) == self.categories), 0.9)
+
+    def test_sgd_retrains_on_edited_label(self):
+        """Editing a label the SGD model has learned from retrains it from scratch."""
+        estimator = self.update(BuiltInModelType.SGD, None, 100)
+        edited = self.categories.copy()
+        edited[0] = 'b' if edited[0] != 'b' else 'a'
+        updated = self.update(BuiltInModelType.SGD, estimator, 100, edited)
+        self.assertIsNot(updated, estimator)
+        self.assertEqual(updated.seen_labels['0'], edited[0])
+        self.assertEqual(len(updated.seen_labels), 100)
+
+    def test_sgd_retrains_on_new_category(self):
+        """A new category retrains the SGD model from scratch."""
+        two_categories = np.where(self.categories == 'c', 'b', self.categories)
+        estimator = self.update(BuiltInModelType.SGD, None, 100, two_categories)
+        updated = self.update(BuiltInModelType.SGD, estimator, 100)
+        self.assertIsNot(updated, estimator)
+        np.testing.assert_array_equal(updated.encoder.classes_, ['a', 'b', 'c'])
+
+    def test_sgd_one_class(self):
+        """A single category falls back to a DummyClassifier."""
+        estimator = self.update(BuiltInModelType.SGD, None, 100,
+                                np.full(N_SAMPLES, 'a'))
+        self.assertIsInstance(estimator.estimator, DummyClassifier)
+
+    def test_logistic_regression_warm_start(self):
+        """The logistic regression resumes from the coefficients of the last update."""
+        estimator = self.update(BuiltInModelType.LogisticRegression, None, 100)
+        pipeline = estimator.estimator
+        updated = self.update(BuiltInModelType.LogisticRegression, estimator, 120)
+        self.assertIs(updated.estimator, pipeline)
+        self.assertTrue(pipeline[-1].warm_start)
+
+    def test_unchanged_without_labels(self):
+        """The estimator is unchanged without labels or for the untrained models."""
+        estimator = object()
+        self.assertIs(self.update(BuiltInModelType.SGD, estimator, 0), estimator)
+        self.assertIs(self.update(BuiltInModelType.Null, estimator, 100), estimator)
+
+    def test_every_updater_fits(self):
+        """Every trained model type predicts the categories after an update."""
+        for estimator_type in model_training_handler.UPDATERS:
+            with self.subTest(estimator_type=estimator_type):
+                estimator = self.update(estimator_type, None, 100)
+                predictions = estimator.predict(self.features)
+                self.assertTrue(set(predictions) <= {'a', 'b', 'c'})
+
+
+if __name__ == '__main__':
+    unittest.main()
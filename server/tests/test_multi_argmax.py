@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The selection of the largest scores: among masked entries, and in status tiers.
+"""
+
+import unittest
+
+import numpy as np
+
+from handlers.data_object_selection.utils import masked_multi_argmax, tiered_multi_argmax
+from handlers.data_object_selection.utils.masked_multi_argmax import (
+    index_in_subset_to_index_in_all,
+)
+
+
+class TestMaskedMultiArgmax(unittest.TestCase):
+    """
+    The indices of masked_multi_argmax against a sort of the masked entries.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.values = rng.rand(1000)
+        self.mask = rng.rand(1000) < 0.3
+
+    def test_largest_masked_values(self):
+        """The largest masked values are selected in decreasing order, for every kind."""
+        expected = np.flatnonzero(self.mask)[np.argsort(-self.values[self.mask])[:20]]
+        for kind in ['fast', 'random', 'stable']:
+            indices = masked_multi_argmax(self.values, self.mask, n_instances=20,
+                                          kind=kind, random_state=0)
+            np.testing.assert_array_equal(indices, expected)
+
+    def test_ties_only_among_masked(self):
+        """The tied values are broken among the masked entries only."""
+        values = np.zeros(100)
+        mask = np.arange(100) % 2 == 1
+        for kind in ['fast', 'random', 'stable']:
+            indices = masked_multi_argmax(values, mask, n_instances=10,
+                                          kind=kind, random_state=0)
+            self.assertTrue(mask[indices].all())
+            self.assertEqual(len(set(indices)), 10)
+
+    def test_no_instance(self):
+        """Selecting no instance returns an empty integer array."""
+        indices = masked_multi_argmax(self.values, self.mask, n_instances=0)
+        self.assertEqual((indices.shape, indices.dtype.kind), ((0,), 'i'))
+
+    def test_index_in_subset(self):
+        """The indices in the subset are mapped to the indices in the whole set."""
+        mask_subset = np.array([True, False, True, False, True, False])
+        self.assertEqual(index_in_subset_to_index_in_all(2, mask_subset), 4)
+        np.testing.assert_array_equal(
+            index_in_subset_to_index_in_all(np.array([0, 1]), mask_subset), [0, 2])
+
+
+class TestTieredMultiArgmax(unittest.TestCase):
+    """
+    The New then Skipped tiers of tiered_multi_argmax.
+    """
+
+    def test_new_before_skipped(self):
+        """The New data objects are selected before the Skipped ones, never the others."""
+        values = np.array([0.9, 0.1, 0.8, 0.7, 0.95, 0.2])
+        statuses = np.array(['Skipped', 'New', 'Labeled', 'New', 'Viewed', 'Skipped'],
+                            dtype=object)
+        np.testing.assert_array_equal(
+            tiered_multi_argmax(values, statuses, n_instances=3), [3, 1, 0])
+        # fewer New and Skipped data objects than n_instances
+        np.testing.assert_array_equal(
+            tiered_multi_argmax(values, statuses, n_instances=6), [3, 1, 0, 5])
+
+    def test_no_selectable(self):
+        """Without New and Skipped data objects, nothing is selected."""
+        statuses = np.array(['Labeled', 'Viewed'], dtype=object)
+        indices = tiered_multi_argmax(np.array([0.5, 0.2]), statuses, n_instances=2)
+        self.assertEqual(len(indices), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
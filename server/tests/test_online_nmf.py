@@ -0,0 +1,94 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The online NMF of text features: the tf-idf of the kept buckets,
+the topics found in chunks, and the update with appended documents.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.decomposition import NMF
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from handlers.feature_extraction.utils import OnlineNMF, online_nmf
+
+
+def make_corpus(n_documents: int, topics, seed: int = 0):
+    """Documents of 30 words drawn from one topic of 40 words each."""
+    rng = np.random.RandomState(seed)
+    labels = rng.choice(topics, n_documents)
+    texts = [' '.join(f'topic{label}word{k}' for k in rng.randint(0, 40, 30))
+             for label in labels]
+    return texts, labels
+
+
+class TestOnlineNMF(unittest.TestCase):
+    """
+    The fit, partial_fit and transform of OnlineNMF.
+    """
+    # pylint: disable=invalid-name
+
+    def setUp(self):
+        patcher = mock.patch.object(online_nmf, 'BATCH_SIZE', 64)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.texts, self.labels = make_corpus(500, [0, 1, 2, 3])
+
+    def assert_topics_found(self, H: np.ndarray, labels: np.ndarray):
+        """Check that the documents of each topic share their largest component."""
+        for label in np.unique(labels):
+            largest = np.argmax(H[labels == label], axis=1)
+            self.assertGreater(np.mean(largest == np.bincount(largest).argmax()), 0.95)
+
+    def test_tfidf_of_kept_buckets(self):
+        """The chunked features are the tf-idf of TfidfVectorizer."""
+        # pylint: disable=protected-access
+        # a rare word and a word in every document are dropped
+        texts = [text + ' common' for text in self.texts] + ['rare']
+        model = OnlineNMF(4)
+        for start in range(0, len(texts), online_nmf.BATCH_SIZE):
+            model._count(model._hash(texts[start:start + online_nmf.BATCH_SIZE]))
+        columns, idf = model._get_idf()
+        X = model._vectorize(texts, columns, idf).toarray()
+        expected = TfidfVectorizer(min_df=online_nmf.MIN_DF, max_df=online_nmf.MAX_DF,
+                                   max_features=online_nmf.MAX_FEATURES,
+                                   stop_words='english').fit_transform(texts).toarray()
+        self.assertEqual(X.shape, expected.shape)
+        np.testing.assert_allclose(np.sort(X, axis=1), np.sort(expected, axis=1), atol=1e-6)
+
+    def test_fit_finds_topics(self):
+        """The codes separate the topics, with an error close to sklearn's NMF."""
+        # pylint: disable=protected-access
+        model = OnlineNMF(4).fit(self.texts)
+        H = model.transform(self.texts)
+        self.assertEqual(H.shape, (500, 4))
+        self.assertTrue(np.all(H >= 0))
+        self.assert_topics_found(H, self.labels)
+
+        columns, idf = model._get_idf()
+        X = model._vectorize(self.texts, columns, idf)
+        error = np.linalg.norm(X - H @ model.components_[:, columns])
+        expected = NMF(4, init='nndsvda', max_iter=500, random_state=0).fit(X)
+        self.assertLess(error, 1.01 * expected.reconstruction_err_)
+
+    def test_partial_fit_new_topic(self):
+        """The documents appended with new words update the components."""
+        model = OnlineNMF(5).fit(self.texts)
+        appended, labels = make_corpus(200, [0, 4], seed=1)
+        model.partial_fit(appended)
+        self.assertEqual(model.counts['n_documents'], 700)
+        H = model.transform(appended)
+        self.assertTrue(np.all(H[labels == 4].sum(axis=1) > 0))
+        self.assert_topics_found(H, labels)
+
+    def test_partial_fit_without_fit(self):
+        """Updating a model not fitted yet fits it."""
+        model = OnlineNMF(4).partial_fit(self.texts)
+        self.assert_topics_found(model.transform(self.texts), self.labels)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The parallel description of items: ordering and nested pools.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# the module, shadowed by the function of the same name in the package
+parallel_describe = importlib.import_module(
+    'handlers.feature_extraction.utils.parallel_describe')
+
+
+def describe_squares(items):
+    """Describe numbers by their squares."""
+    return {'square': np.array([[d * d] for d in items])}
+
+
+class TestParallelDescribe(unittest.TestCase):
+    """
+    The pool of parallel_describe.
+    """
+
+    def tearDown(self):
+        parallel_describe.shutdown_pool()
+
+    def test_ordered(self):
+        """The parallel descriptions keep the order of the items."""
+        items = list(range(100))
+        with mock.patch.object(parallel_describe, 'N_WORKERS', 2):
+            self.assertTrue(parallel_describe.can_parallelize(len(items)))
+            descriptors = parallel_describe.parallel_describe(describe_squares, items)
+        np.testing.assert_array_equal(descriptors['square'][:, 0],
+                                      np.arange(100) ** 2)
+
+    def test_no_pool_in_executor_worker(self):
+        """An executor worker describes the items without a pool."""
+        # the forked worker inherits N_WORKERS
+        with mock.patch.object(parallel_describe, 'N_WORKERS', 4),\
+                ProcessPoolExecutor(max_workers=1) as pool:
+            self.assertTrue(parallel_describe.can_parallelize(1000))
+            self.assertFalse(pool.submit(parallel_describe.can_parallelize, 1000).result())
+
+    def test_idle_pool_is_shut_down(self):
+        """The pool is shut down after being idle."""
+        with mock.patch.object(parallel_describe, 'POOL_IDLE_SECONDS', 0.1):
+            with parallel_describe.use_pool() as pool:
+                self.assertEqual(pool.submit(abs, -1).result(), 1)
+            time.sleep(0.5)
+        self.assertIsNone(parallel_describe._POOL)
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The persisted reducers: a supervised reducer is refitted when the labels change,
+and the reducers are fitted on a bounded number of data objects.
+"""
+
+from functools import partial
+from unittest import mock
+
+from bson.objectid import ObjectId
+import numpy as np
+from tornado.testing import AsyncTestCase, gen_test
+
+from handlers.feature_extraction import image_lda
+from handlers.feature_extraction.utils import get_labels_key, get_reducer
+from handlers.utils import executor
+
+
+def fit(data_objects, labels):
+    """Record the labels as the fitted reducer."""
+    return (len(data_objects), tuple(labels))
+
+
+class TestPersistedReducer(AsyncTestCase):
+    """
+    The reducers persisted under one reducerId across requests.
+    """
+
+    def setUp(self):
+        executor.shutdown()
+        executor.configure(kind='thread')
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        executor.shutdown(wait=False)
+
+    async def get_reducer(self, reducer_id, data_objects, labels, statuses):
+        """Get the reducer fitted on the labels of a request."""
+        return await get_reducer('/featureExtraction/imageLDA', reducer_id, False,
+                                 partial(fit, labels=labels), data_objects,
+                                 get_labels_key(data_objects, labels, statuses))
+
+    @gen_test(timeout=10)
+    async def test_refit_on_new_labels(self):
+        """A persisted supervised reducer is reused for the same labels only."""
+        reducer_id = str(ObjectId())
+        data_objects = [{'uuid': str(i), 'type': 'image', 'content': ''} for i in range(4)]
+        labels = np.array(['a', 'b', '', ''])
+        statuses = np.array(['Labeled', 'Labeled', 'New', 'New'])
+
+        first = await self.get_reducer(reducer_id, data_objects, labels, statuses)
+        # the same labels in another order reuse the persisted reducer
+        reused = await self.get_reducer(reducer_id, data_objects[::-1],
+                                        labels[::-1], statuses[::-1])
+        self.assertEqual(reused, first)
+
+        # a new label leads to a refit
+        labels[2], statuses[2] = 'a', 'Labeled'
+        refitted = await self.get_reducer(reducer_id, data_objects, labels, statuses)
+        self.assertEqual(refitted, (4, ('a', 'b', 'a', '')))
+
+    @gen_test(timeout=10)
+    async def test_fit_on_a_sample(self):
+        """The reducer is fitted on at most max_samples data objects."""
+        data_objects = [{'uuid': str(i), 'type': 'image', 'content': ''} for i in range(100)]
+        reducer = await get_reducer('/featureExtraction/imageSVD', str(ObjectId()), False,
+                                    lambda sample: [d['uuid'] for d in sample],
+                                    data_objects, max_samples=10)
+        self.assertEqual(len(reducer), 10)
+        self.assertEqual(len(set(reducer)), 10)
+
+    def test_lda_decodes_the_labeled_images(self):
+        """The LDA is fitted on the thumbnails of the labeled images only."""
+        data_objects = [{'uuid': str(i), 'type': 'image', 'content': ''} for i in range(50)]
+        labels = np.array(['a', 'b', 'a'] + [''] * 47)
+        statuses = np.array(['Labeled'] * 3 + ['New'] * 47)
+        rng = np.random.RandomState(0)
+
+        def describe(sample):
+            return {'raw': rng.rand(len(sample), 64)}
+
+        with mock.patch.object(image_lda, 'describe_thumbnails', wraps=describe) as described:
+            image_lda.fit_reducer(data_objects, labels, statuses)
+            self.assertEqual(len(described.call_args[0][0]), 3)
+            image_lda.fit_reducer(data_objects, labels, np.array(['New'] * 50))
+            self.assertEqual(len(described.call_args[0][0]), 1)
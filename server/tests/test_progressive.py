@@ -0,0 +1,47 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The registry of the progressive projection jobs.
+"""
+
+import unittest
+from unittest import mock
+
+from handlers.projection.utils import ProgressiveJob, cancel_job, progressive
+
+
+class TestProgressiveJob(unittest.TestCase):
+    """
+    The cancellation of the jobs and the cleanup of their registry.
+    """
+
+    def test_cancel_unknown_job(self):
+        """Cancelling an unknown job does nothing."""
+        cancel_job('unknown')
+        self.assertNotIn('unknown', progressive._GENERATIONS)
+
+    def test_newer_job_cancels(self):
+        """A newer job of the same kind cancels the older one."""
+        with ProgressiveJob(mock.Mock(), 'plot') as first:
+            with ProgressiveJob(mock.Mock(), 'plot') as second:
+                self.assertTrue(first.cancelled)
+                self.assertFalse(second.cancelled)
+            # the older job exiting last doesn't unregister a newer job
+            self.assertNotIn('plot', progressive._GENERATIONS)
+            with ProgressiveJob(mock.Mock(), 'plot') as third:
+                self.assertTrue(first.cancelled)
+                cancel_job('plot')
+                self.assertTrue(third.cancelled)
+        self.assertNotIn('plot', progressive._GENERATIONS)
+
+    def test_failed_job_is_unregistered(self):
+        """A job raising an exception is unregistered."""
+        with self.assertRaises(ValueError):
+            with ProgressiveJob(mock.Mock(), 'plot'):
+                raise ValueError()
+        self.assertNotIn('plot', progressive._GENERATIONS)
+
+
+if __name__ == '__main__':
+    unittest.main()
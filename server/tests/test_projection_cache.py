@@ -0,0 +1,59 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The projection cache: the keys computed off the IOLoop,
+and the projection of the leading rows found for appended rows.
+"""
+
+import threading
+from unittest import mock
+
+import numpy as np
+from tornado.testing import AsyncTestCase, gen_test
+
+from handlers.projection.utils import ProjectionCache
+from handlers.utils import executor
+
+
+class TestProjectionCache(AsyncTestCase):
+    """
+    The keys and the prefixes of ProjectionCache.
+    """
+
+    @gen_test
+    async def test_keys_are_computed_in_a_thread(self):
+        """The fingerprints of the features are not computed on the IOLoop."""
+        threads = []
+        get_key = ProjectionCache.get_key
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return get_key(*args)
+
+        with mock.patch.object(ProjectionCache, 'get_key', record_thread):
+            key = await ProjectionCache.compute_key(np.zeros((10, 2)), 'tsne-2')
+        self.assertEqual(key, get_key(np.zeros((10, 2)), 'tsne-2'))
+        self.assertNotIn(threading.main_thread(), threads)
+
+    @gen_test
+    async def test_find_prefix(self):
+        """The largest cached projection of leading rows is found."""
+        # pylint: disable=invalid-name
+        cache = ProjectionCache()
+        X = np.random.RandomState(0).rand(100, 3)
+        for n_rows in [50, 80]:
+            cache.put(cache.get_key(X[:n_rows], 'mds-2'), n_rows, n_rows)
+        self.assertEqual(await cache.find_prefix(X, 'mds-2'), (80, 80))
+        self.assertEqual(await cache.find_prefix(X[:70], 'mds-2'), (50, 50))
+        self.assertIsNone(await cache.find_prefix(X, 'tsne-2'))
+
+    def test_worker_threads(self):
+        """The processors are shared by the workers of the executor."""
+        with mock.patch('os.cpu_count', return_value=8):
+            with mock.patch.object(executor, 'MAX_WORKERS', 2):
+                self.assertEqual(executor.get_worker_threads(), 4)
+            with mock.patch.object(executor, 'MAX_WORKERS', None):
+                self.assertEqual(executor.get_worker_threads(), 1)
+            with mock.patch.object(executor, 'MAX_WORKERS', 16):
+                self.assertEqual(executor.get_worker_threads(), 1)
@@ -0,0 +1,44 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The coalescing of the training requests under a steady stream of requests.
+"""
+
+from tornado import gen
+from tornado.testing import AsyncTestCase, gen_test
+
+from handlers.utils import retrain_scheduler
+
+
+class TestRetrainScheduler(AsyncTestCase):
+    """
+    The scheduler of the training runs of a model.
+    """
+
+    @gen_test(timeout=10)
+    async def test_steady_requests_are_answered(self):
+        """The requests are answered while new ones keep coming."""
+        committed = []
+
+        def make_request(index: int):
+            async def train():
+                await gen.sleep(0.1)
+                return index
+            return retrain_scheduler.schedule('model', train, committed.append)
+
+        # a new request arrives every 20 ms, faster than a run
+        futures = []
+        for index in range(20):
+            futures.append(gen.convert_yielded(make_request(index)))
+            await gen.sleep(0.02)
+        # the first request is answered while the requests keep coming
+        self.assertTrue(futures[0].done())
+        results = await gen.multi(futures)
+
+        # every run is committed, in order, and resolves the requests before it
+        self.assertEqual(committed, sorted(set(results)))
+        self.assertEqual(committed[-1], 19)
+        self.assertLess(len(committed), 20)
+        for index, result in enumerate(results):
+            self.assertGreaterEqual(result, index)
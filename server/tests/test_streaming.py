@@ -0,0 +1,121 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The streamed feature extraction: with a fixed reducer,
+the rows of a chunk arrive before the next chunks are described.
+"""
+
+import json
+import threading
+from typing import Dict, List
+
+import numpy as np
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.web import Application
+
+from handlers.types import DataObject
+from handlers.utils import executor
+from handlers.utils.streaming import stream_features
+from handlers.utils.wire_format import CorsRequestHandler
+
+
+# pylint: disable=pointless-string-statement
+"""
+Set when the client has received the first rows.
+"""
+FIRST_ROWS_RECEIVED = threading.Event()
+
+"""
+Whether the first rows were received when the last chunk was described.
+"""
+RECEIVED_BEFORE_LAST_CHUNK: List[bool] = []
+
+
+def describe(data_objects: List[DataObject]) -> Dict[str, np.ndarray]:
+    """Describe the data objects by their index, waiting for the first rows at the end."""
+    if data_objects[-1]['uuid'] == 'last':
+        RECEIVED_BEFORE_LAST_CHUNK.append(FIRST_ROWS_RECEIVED.wait(2))
+    return {'index': np.array([[data_object['index']] for data_object in data_objects])}
+
+
+def reduce(descriptors: Dict[str, np.ndarray]):
+    """Reduce the descriptors with a fixed linear map."""
+    return 2. * descriptors['index'], ['twice']
+
+
+class StreamingHandler(CorsRequestHandler):
+    """
+    Stream the features of the posted data objects.
+    """
+
+    def initialize(self, reduce_chunks: bool):
+        """Set whether the chunks are reduced on their own."""
+        self.reduce_chunks = reduce_chunks
+
+    async def post(self):
+        """Stream the features in chunks of 4 data objects."""
+        data_objects = json.loads(self.request.body)['dataObjects']
+        await stream_features(self, data_objects, describe, reduce,
+                              chunk_size=4, reduce_chunks=self.reduce_chunks)
+
+
+class TestStreaming(AsyncHTTPTestCase):
+    """
+    The events of stream_features.
+    """
+
+    def get_app(self):
+        return Application([
+            (r'/chunks', StreamingHandler, {'reduce_chunks': True}),
+            (r'/pool', StreamingHandler, {'reduce_chunks': False}),
+        ])
+
+    def setUp(self):
+        FIRST_ROWS_RECEIVED.clear()
+        RECEIVED_BEFORE_LAST_CHUNK.clear()
+        executor.shutdown()
+        executor.configure(kind='thread')
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        executor.shutdown(wait=False)
+
+    async def stream(self, path: str):
+        """Post 10 data objects and return the events and the received rows."""
+        data_objects = [{'uuid': str(i), 'index': i} for i in range(9)]
+        data_objects.append({'uuid': 'last', 'index': 9})
+        events = []
+
+        def on_chunk(chunk: bytes):
+            for line in chunk.decode().splitlines():
+                events.append(json.loads(line))
+                if events[-1]['type'] == 'features':
+                    FIRST_ROWS_RECEIVED.set()
+
+        await self.http_client.fetch(self.get_url(path), method='POST',
+                                     body=json.dumps({'dataObjects': data_objects}),
+                                     streaming_callback=on_chunk)
+        features = np.vstack([event['features'] for event in events
+                              if event['type'] == 'features'])
+        return events, features
+
+    @gen_test(timeout=10)
+    async def test_rows_before_the_last_chunk(self):
+        """The first rows are received before the last chunk is described."""
+        events, features = await self.stream('/chunks')
+        self.assertEqual(RECEIVED_BEFORE_LAST_CHUNK, [True])
+        types = [event['type'] for event in events]
+        self.assertLess(types.index('featureNames'), types.index('features'))
+        self.assertEqual([event['start'] for event in events if event['type'] == 'features'],
+                         [0, 4, 8])
+        np.testing.assert_array_equal(features.ravel(), 2. * np.arange(10))
+
+    @gen_test(timeout=10)
+    async def test_same_rows_as_the_pool(self):
+        """Reducing the chunks or the pool streams the same rows."""
+        _, chunked = await self.stream('/chunks')
+        FIRST_ROWS_RECEIVED.set()
+        _, pooled = await self.stream('/pool')
+        np.testing.assert_array_equal(chunked, pooled)
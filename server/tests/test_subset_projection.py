@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The subset projection: bad subsets and parents of another session.
+"""
+
+import json
+
+import numpy as np
+from tornado.testing import AsyncHTTPTestCase
+from tornado.web import Application
+
+from handlers.projection import subset, tsne
+from handlers.utils import dataset_session
+
+
+class TestSubsetProjection(AsyncHTTPTestCase):
+    """
+    The /projection/subset endpoint.
+    """
+
+    def get_app(self):
+        return Application([(r'/projection/subset', subset.Handler)])
+
+    def setUp(self):
+        super().setUp()
+        data_objects = [{'uuid': f'{i}', 'features': [float(i), 0.]} for i in range(40)]
+        self.session_id = dataset_session.register_session(data_objects)
+
+    def post(self, body: dict):
+        """Post a subset request and return the response."""
+        return self.fetch('/projection/subset', method='POST', body=json.dumps({
+            'sessionId': self.session_id, 'method': 'PCA', 'nComponents': 1, **body,
+        }))
+
+    def test_unknown_uuid(self):
+        """An unknown uuid in the subset is a bad request."""
+        response = self.post({'uuids': ['0', 'unknown']})
+        self.assertEqual(response.code, 400)
+
+    def test_out_of_range_indices(self):
+        """An index past the session is a bad request."""
+        response = self.post({'indices': list(range(39)) + [40]})
+        self.assertEqual(response.code, 400)
+
+    def test_parent_of_another_session(self):
+        """The parent coordinates are shared only with the session that computed them."""
+        key = tsne.CACHE.get_key(np.zeros((40, 2)), 'tsne-2')
+        tsne.CACHE.put(key, 40, {'pca': None, 'embedding': np.ones((40, 2))})
+        tsne.CACHE.add_session(key, self.session_id)
+        indices = np.arange(32)
+        coordinates = subset.get_parent_coordinates(key, indices, self.session_id)
+        np.testing.assert_array_equal(coordinates, np.ones((32, 2)))
+        self.assertIsNone(subset.get_parent_coordinates(key, indices, 'another'))
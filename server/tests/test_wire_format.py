@@ -0,0 +1,67 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+The negotiation of the wire format and the CORS preflight.
+"""
+
+import json
+
+import msgpack
+import numpy as np
+from tornado.testing import AsyncHTTPTestCase
+from tornado.web import Application
+
+from handlers.utils.wire_format import _decode_ndarray, _encode_ndarray
+from url import url
+
+
+class TestWireFormat(AsyncHTTPTestCase):
+    """
+    The msgpack bodies of the numeric endpoints, requested cross-origin.
+    """
+
+    def get_app(self):
+        return Application(url)
+
+    def test_preflight(self):
+        """The preflight requests are answered with the CORS headers."""
+        for path in ['/projection/PCA', '/blobs/upload', '/session/register']:
+            response = self.fetch(path, method='OPTIONS', headers={
+                'Origin': 'http://localhost:8080',
+                'Access-Control-Request-Method': 'POST',
+                'Access-Control-Request-Headers': 'content-type',
+            })
+            self.assertEqual(response.code, 204)
+            self.assertEqual(response.headers['Access-Control-Allow-Origin'], '*')
+            self.assertIn('Content-Type', response.headers['Access-Control-Allow-Headers'])
+            self.assertIn('POST', response.headers['Access-Control-Allow-Methods'])
+
+    def test_error_has_cors_headers(self):
+        """The error responses have the CORS headers."""
+        response = self.fetch('/session/update', method='POST',
+                              body=json.dumps({'sessionId': 'unknown'}))
+        self.assertEqual(response.code, 404)
+        self.assertEqual(response.headers['Access-Control-Allow-Origin'], '*')
+
+    def test_msgpack_roundtrip(self):
+        """A msgpack request is answered in msgpack."""
+        X = np.random.RandomState(0).rand(20, 3)
+        body = msgpack.packb({'X': X, 'nComponents': 2},
+                             use_bin_type=True, default=_encode_ndarray)
+        response = self.fetch('/projection/PCA', method='POST', body=body, headers={
+            'Content-Type': 'application/msgpack',
+            'Accept': 'application/msgpack',
+        })
+        self.assertEqual(response.headers['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.body, raw=False, ext_hook=_decode_ndarray)
+        self.assertEqual(data['projection'].shape, (20, 2))
+
+    def test_refused_msgpack(self):
+        """A client refusing msgpack is answered in JSON."""
+        body = json.dumps({'X': [[0, 1, 2], [1, 2, 0], [2, 0, 1]], 'nComponents': 2})
+        response = self.fetch('/projection/PCA', method='POST', body=body, headers={
+            'Accept': 'application/json, application/msgpack;q=0',
+        })
+        self.assertTrue(response.headers['Content-Type'].startswith('application/json'))
+        self.assertEqual(len(json.loads(response.body)['projection']), 3)
@@ -1,8 +1,9 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from tornado.web import RequestHandler
-from handlers import (CompileHandler,
+from handlers import (BlobStoreHandler,
+                      CompileHandler,
+                      DatasetSessionHandler,
                       ModelTrainingHandler,
                       ImageProcessingHandler)
 
@@ -25,13 +26,21 @@ from handlers.feature_extraction.image_lda import Handler as FEImageLda
 from handlers.feature_extraction.image_svd import Handler as FEImageSvd
 from handlers.feature_extraction.text_nmf import Handler as FETextNmf
 # Projection handlers:
+from handlers.projection.cancel import Handler as ProjectionCancel
 from handlers.projection.mds import Handler as ProjectionMDS
 from handlers.projection.pca import Handler as ProjectionPCA
+from handlers.projection.subset import Handler as ProjectionSubset
 from handlers.projection.tsne import Handler as ProjectionTSNE
+from handlers.utils.wire_format import CorsRequestHandler
 
 
-class RoundtripHandler(RequestHandler):
+class RoundtripHandler(CorsRequestHandler):
+    """
+    The empty request for measuring the latency of the server.
+    """
+
     def post(self):
+        """Answer with an empty response."""
         self.set_header('Access-Control-Allow-Origin', '*')
 
 
@@ -39,6 +48,12 @@ url = [
     # request for compiled exe package
     (r'/compile/(.*)', CompileHandler),
 
+    # request for registering and updating datasets kept on the server
+    (r'/session/(.*)', DatasetSessionHandler),
+
+    # request for uploading blobs (e.g., images) referenced by data objects
+    (r'/blobs/(.*)', BlobStoreHandler),
+
     # request for image processing algorithms
     (r'/imgproc/(.*)', ImageProcessingHandler),
 
@@ -47,6 +62,13 @@ url = [
     (r'/features/image/LDA', FEImageLda),
     (r'/features/image/SVD', FEImageSvd),
     (r'/features/text/NMF', FETextNmf),
+    # request for refitting the persisted dataset-level reducers
+    (r'/features/image/BoW/refit', FEImageBow, {'refit': True}),
+    (r'/features/image/LDA/refit', FEImageLda, {'refit': True}),
+    (r'/features/image/SVD/refit', FEImageSvd, {'refit': True}),
+    (r'/features/text/NMF/refit', FETextNmf, {'refit': True}),
+    # request for updating the persisted reducers with appended data objects
+    (r'/features/text/NMF/append', FETextNmf, {'append': True}),
 
     # request for selection computed with data object selection algorithms
     (r'/selection/ClusterCentroids', DOSClusterCentroids),
@@ -67,6 +89,16 @@ url = [
     (r'/projection/MDS', ProjectionMDS),
     (r'/projection/PCA', ProjectionPCA),
     (r'/projection/TSNE', ProjectionTSNE),
+    # request for refitting the persisted PCA, and for transforming rows with it
+    (r'/projection/PCA/refit', ProjectionPCA, {'refit': True}),
+    (r'/projection/PCA/transform', ProjectionPCA, {'transform_only': True}),
+    # request for refitting the persisted landmark MDS, and for transforming rows with it
+    (r'/projection/MDS/refit', ProjectionMDS, {'refit': True}),
+    (r'/projection/MDS/transform', ProjectionMDS, {'transform_only': True}),
+    # request for the level-of-detail projection of a subset of a session
+    (r'/projection/subset', ProjectionSubset),
+    # request for cancelling a progressive projection
+    (r'/projection/cancel', ProjectionCancel),
 
     # request for updated model computed with interim model training algorithms
     (r'/modelUpdated/(.*)', ModelTrainingHandler),